@@ -75,3 +75,253 @@ class LRUMapping(collections.abc.MutableMapping):
 
     def __iter__(self):
         return iter(self._dict)
+
+
+class CacheStats:
+    """Counts the lookups and evictions of a cache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def hit(self):
+        self.hits += 1
+
+    def miss(self):
+        self.misses += 1
+
+    def evict(self):
+        self.evictions += 1
+
+
+# Halves every byte, see FrequencySketch._reset().
+_HALVE = bytes(i >> 1 for i in range(256))
+
+_MISSING = object()
+
+
+class FrequencySketch:
+    """Approximate access counts of keys in a count-min sketch.
+
+    Counts saturate at 15 and are all halved once ten times the
+    capacity accesses have been recorded, so that the sketch follows
+    the recent popularity of keys rather than their all-time one.
+    """
+
+    _SEEDS = (
+        0x9E3779B97F4A7C15,
+        0xC2B2AE3D27D4EB4F,
+        0x165667B19E3779F9,
+        0xD6E8FEB86659FD93,
+    )
+    _MAX_COUNT = 15
+
+    def __init__(self, capacity):
+        # Four counters per row for every cached key keep the
+        # collisions with the keys seen but not cached low.
+        width = 16
+        while width < 4 * capacity:
+            width <<= 1
+        self._width = width
+        self._table = bytearray(width * len(self._SEEDS))
+        self._sample_size = 10 * max(capacity, 1)
+        self._additions = 0
+
+    def _indexes(self, key):
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h ^= h >> 32
+        mask = self._width - 1
+        return [
+            row * self._width
+            + (((h * seed) & 0xFFFFFFFFFFFFFFFF) >> 40 & mask)
+            for row, seed in enumerate(self._SEEDS)
+        ]
+
+    def frequency(self, key):
+        table = self._table
+        return min(table[i] for i in self._indexes(key))
+
+    def increment(self, key):
+        table = self._table
+        indexes = self._indexes(key)
+        count = min(table[i] for i in indexes)
+        if count < self._MAX_COUNT:
+            # Only the smallest counters are incremented ("conservative
+            # update"), which limits the overestimation caused by
+            # collisions.
+            for i in indexes:
+                if table[i] == count:
+                    table[i] = count + 1
+
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._reset()
+
+    def _reset(self):
+        self._table = bytearray(self._table.translate(_HALVE))
+        self._additions //= 2
+
+
+class TinyLFUMapping(collections.abc.MutableMapping):
+
+    # A bounded mapping using the W-TinyLFU eviction policy.  Entries
+    # live in one of three OrderedDicts, each kept in LRU order like
+    # in LRUMapping:
+    #
+    # * `_window` receives the new entries and holds 1% of `maxsize`;
+    #
+    # * an entry pushed out of the window moves to `_probation`, but
+    #   when the cache is full it has to replace the least recently
+    #   used entry of the main space (probation first, then
+    #   protected), and only does so if it was looked up more often
+    #   according to a FrequencySketch; otherwise it is the one
+    #   evicted;
+    #
+    # * an entry hit while in probation is promoted to `_protected`,
+    #   which holds 80% of the main space and demotes its least
+    #   recently used entries back to probation.
+    #
+    # A burst of one-off keys thus only churns the window and the
+    # probation space, and leaves the frequently used entries cached.
+    # Accesses are recorded in the sketch on lookups, including those
+    # of missing keys, so that a key inserted after a miss competes
+    # with the frequency of its past lookups.
+
+    def __init__(self, *, maxsize, stats=None, on_evict=None):
+        self._window = collections.OrderedDict()
+        self._probation = collections.OrderedDict()
+        self._protected = collections.OrderedDict()
+        self._sketch = FrequencySketch(maxsize)
+        self._on_evict = on_evict
+        self.stats = stats if stats is not None else CacheStats()
+        self.resize(maxsize)
+
+    def resize(self, maxsize):
+        if maxsize <= 0:
+            raise ValueError(
+                f'maxsize is expected to be greater than 0, got {maxsize}')
+
+        self._maxsize = maxsize
+        self._window_maxsize = max(1, maxsize // 100)
+        self._main_maxsize = maxsize - self._window_maxsize
+        self._protected_maxsize = self._main_maxsize * 4 // 5
+
+        while len(self._protected) > self._protected_maxsize:
+            k, v = self._protected.popitem(last=False)
+            self._probation[k] = v
+        self._trim()
+
+    def get(self, key, default=None):
+        o = self._lookup(key)
+        return default if o is _MISSING else o
+
+    def __getitem__(self, key):
+        o = self._lookup(key)
+        if o is _MISSING:
+            raise KeyError(key)
+        return o
+
+    def __setitem__(self, key, o):
+        for segment in (self._window, self._probation, self._protected):
+            if key in segment:
+                segment[key] = o
+                segment.move_to_end(key, last=True)
+                return
+
+        self._window[key] = o
+        self._trim()
+
+    def __delitem__(self, key):
+        for segment in (self._window, self._probation, self._protected):
+            if key in segment:
+                del segment[key]
+                return
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return (
+            key in self._window
+            or key in self._probation
+            or key in self._protected
+        )
+
+    def __len__(self):
+        return len(self._window) + len(self._probation) + len(self._protected)
+
+    def __iter__(self):
+        yield from self._window
+        yield from self._probation
+        yield from self._protected
+
+    def items(self):
+        # The default implementation looks every key up, which would
+        # count as hits.
+        yield from self._window.items()
+        yield from self._probation.items()
+        yield from self._protected.items()
+
+    def clear(self):
+        self._window.clear()
+        self._probation.clear()
+        self._protected.clear()
+
+    def frequency(self, key):
+        # The estimated number of recent lookups of the key; unlike
+        # get(), this doesn't count as one.
+        return self._sketch.frequency(key)
+
+    def _lookup(self, key):
+        self._sketch.increment(key)
+
+        o = self._window.get(key, _MISSING)
+        if o is not _MISSING:
+            self._window.move_to_end(key, last=True)
+        else:
+            o = self._protected.get(key, _MISSING)
+            if o is not _MISSING:
+                self._protected.move_to_end(key, last=True)
+            else:
+                o = self._probation.pop(key, _MISSING)
+                if o is not _MISSING:
+                    self._protected[key] = o
+                    if len(self._protected) > self._protected_maxsize:
+                        k, v = self._protected.popitem(last=False)
+                        self._probation[k] = v
+
+        if o is _MISSING:
+            self.stats.miss()
+        else:
+            self.stats.hit()
+        return o
+
+    def _trim(self):
+        while len(self._window) > self._window_maxsize:
+            k, v = self._window.popitem(last=False)
+            self._admit(k, v)
+
+        # Shrinking the cache can leave the main space over capacity.
+        while len(self._probation) + len(self._protected) > self._main_maxsize:
+            victims = self._probation or self._protected
+            self._evict(*victims.popitem(last=False))
+
+    def _admit(self, key, o):
+        if len(self._probation) + len(self._protected) < self._main_maxsize:
+            self._probation[key] = o
+            return
+
+        victims = self._probation or self._protected
+        if victims:
+            victim = next(iter(victims))
+            sketch = self._sketch
+            if sketch.frequency(key) > sketch.frequency(victim):
+                self._evict(victim, victims.pop(victim))
+                self._probation[key] = o
+                return
+
+        self._evict(key, o)
+
+    def _evict(self, key, o):
+        self.stats.evict()
+        if self._on_evict is not None:
+            self._on_evict(key, o)
@@ -20,7 +20,7 @@
 from __future__ import annotations
 from typing import *
 
-import functools
+import collections
 
 from edb import graphql
 
@@ -29,20 +29,102 @@ from edb.schema import schema as s_schema
 from graphql.language import lexer as gql_lexer
 
 
-@functools.lru_cache()
+# The classes of the schema objects that never show in the GraphQL
+# reflection: user schemas that only differ in such objects reflect
+# into the same GraphQL schema.  The SchemaVersion changes with every
+# DDL command.
+#
+# Any change to anything else (object types, pointers, aliases,
+# modules...) still builds the whole GQLCoreSchema anew, once in every
+# compiler worker, on the first GraphQL query after it.
+_UNREFLECTED_CLASSES = frozenset({
+    'Cast',
+    'Function',
+    'FutureBehavior',
+    'Global',
+    'Migration',
+    'Operator',
+    'Parameter',
+    'SchemaVersion',
+})
+
+_GQLCORE_CACHE_SIZE = 128
+
+# How many of the most recently built GQLCoreSchemas a new user schema
+# is compared with, looking for one to reuse.
+_GQLCORE_REUSE_CANDIDATES = 8
+
+_gqlcores: collections.OrderedDict[
+    Tuple[s_schema.FlatSchema, s_schema.FlatSchema],
+    Tuple[s_schema.FlatSchema, graphql.GQLCoreSchema],
+] = collections.OrderedDict()
+
+
+def _same_reflection(
+    a: s_schema.FlatSchema,
+    b: s_schema.FlatSchema,
+) -> bool:
+    # Only the schemas derived from one another (with DDL or with the
+    # deltas sent to the compiler workers) can be found the same, but
+    # the comparison is cheap, and stops at the first change that
+    # matters.
+    return all(
+        cls_name in _UNREFLECTED_CLASSES
+        for cls_name in b.iter_changed_classes(a)
+    )
+
+
 def _get_gqlcore(
     std_schema: s_schema.FlatSchema,
     user_schema: s_schema.FlatSchema,
     global_schema: s_schema.FlatSchema,
 ) -> graphql.GQLCoreSchema:
-    return graphql.GQLCoreSchema(
-        s_schema.ChainedSchema(
-            std_schema,
-            user_schema,
-            global_schema
-        )
+    # The global schema holds roles, databases and the like, and is not
+    # reflected, so it is not a part of the cache key; the cached
+    # schema just gets rebound to the latest one.  Likewise, a DDL that
+    # doesn't touch anything reflected reuses the GraphQL types of the
+    # previous user schema instead of building them all over again.
+    key = (std_schema, user_schema)
+    entry = _gqlcores.get(key)
+    if entry is not None:
+        _gqlcores.move_to_end(key)
+        cached_global_schema, gqlcore = entry
+        if cached_global_schema is not global_schema:
+            gqlcore = gqlcore.with_edgedb_schema(
+                s_schema.ChainedSchema(
+                    std_schema,
+                    user_schema,
+                    global_schema
+                )
+            )
+            _gqlcores[key] = (global_schema, gqlcore)
+        return gqlcore
+
+    edb_schema = s_schema.ChainedSchema(
+        std_schema,
+        user_schema,
+        global_schema
     )
 
+    candidates = list(_gqlcores.items())[-_GQLCORE_REUSE_CANDIDATES:]
+    for (cached_std_schema, cached_user_schema), (_, cached) in reversed(
+        candidates
+    ):
+        if (
+            cached_std_schema is std_schema
+            and _same_reflection(cached_user_schema, user_schema)
+        ):
+            gqlcore = cached.with_edgedb_schema(edb_schema)
+            break
+    else:
+        gqlcore = graphql.GQLCoreSchema(edb_schema)
+
+    _gqlcores[key] = (global_schema, gqlcore)
+    if len(_gqlcores) > _GQLCORE_CACHE_SIZE:
+        _gqlcores.popitem(last=False)
+
+    return gqlcore
+
 
 def compile_graphql(
     std_schema: s_schema.FlatSchema,
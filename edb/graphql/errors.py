@@ -46,3 +46,7 @@ class GraphQLValidationError(GraphQLTranslationError):
 
 class GraphQLCoreError(GraphQLError):
     pass
+
+
+class PersistedQueryNotFound(GraphQLError):
+    pass
@@ -26,6 +26,7 @@ from typing import (
 )
 
 import cython
+import hashlib
 import http
 import json
 import logging
@@ -67,6 +68,17 @@ cdef class CacheRedirect:
         self.key_vars = key_vars
 
 
+@cython.final
+cdef class PersistedQuery:
+    cdef public str query
+    # The results of _graphql_rewrite.rewrite() per operation name.
+    cdef public dict rewrites
+
+    def __init__(self, query: str):
+        self.query = query
+        self.rewrites = {}
+
+
 CacheEntry = Union[
     CacheRedirect,
     Tuple[compiler.QueryUnitGroup, translator.TranspiledOperation],
@@ -96,6 +108,8 @@ async def handle_request(
     globals = None
     deprecated_globals = None
     query = None
+    extensions = None
+    persisted_hash = None
 
     try:
         if request.method == b'POST':
@@ -108,6 +122,7 @@ async def handle_request(
                 operation_name = body.get('operationName')
                 variables = body.get('variables')
                 deprecated_globals = body.get('globals')
+                extensions = body.get('extensions')
             elif request.content_type == 'application/graphql':
                 query = request.body.decode('utf-8')
             else:
@@ -143,10 +158,23 @@ async def handle_request(
                         raise TypeError(
                             '"globals" must be a JSON object')
 
+                extensions = qs.get('extensions')
+                if extensions is not None:
+                    try:
+                        extensions = json.loads(extensions[0])
+                    except Exception:
+                        raise TypeError(
+                            '"extensions" must be a JSON object')
+
         else:
             raise TypeError('expected a GET or a POST request')
 
-        if not query:
+        if extensions is not None:
+            if not isinstance(extensions, dict):
+                raise TypeError('"extensions" must be a JSON object')
+            persisted_hash = _get_persisted_hash(extensions)
+
+        if not query and persisted_hash is None:
             raise TypeError('invalid GraphQL request: query is missing')
 
         if (operation_name is not None and
@@ -195,7 +223,15 @@ async def handle_request(
     response.content_type = b'application/json'
     try:
         result = await _execute(
-            db, tenant, query, operation_name, variables, globals)
+            db, tenant, query, operation_name, variables, globals,
+            persisted_hash=persisted_hash)
+    except gql_errors.PersistedQueryNotFound:
+        # The client is expected to retry with the full query, see
+        # _get_persisted_query().
+        response.body = json.dumps({'errors': [{
+            'message': 'PersistedQueryNotFound',
+            'extensions': {'code': 'PERSISTED_QUERY_NOT_FOUND'},
+        }]}).encode()
     except Exception as ex:
         if debug.flags.server:
             markup.dump(ex)
@@ -223,6 +259,45 @@ async def handle_request(
         response.body = b'{"data":' + result + b'}'
 
 
+def _get_persisted_hash(dict extensions):
+    persisted = extensions.get('persistedQuery')
+    if persisted is None:
+        return None
+
+    if not isinstance(persisted, dict):
+        raise TypeError('"persistedQuery" must be a JSON object')
+    if persisted.get('version') != 1:
+        raise TypeError('unsupported "persistedQuery" version')
+
+    query_hash = persisted.get('sha256Hash')
+    if not isinstance(query_hash, str) or len(query_hash) != 64:
+        raise TypeError('"sha256Hash" must be a SHA-256 hex digest')
+    return query_hash.lower()
+
+
+def _get_persisted_query(tenant, query, str query_hash):
+    # Automatic persisted queries: clients first send the hash of the
+    # query alone, and only send the query along with the hash after
+    # getting a PersistedQueryNotFound error.  The registry keeps the
+    # results of the rewrite of the query as well, so that neither the
+    # query text nor its rewrite have to be processed again.
+    registry = tenant.server._graphql_persisted_queries
+    persisted = registry.get(query_hash)
+    if persisted is None:
+        if not query:
+            raise gql_errors.PersistedQueryNotFound(
+                'PersistedQueryNotFound')
+        if hashlib.sha256(query.encode()).hexdigest() != query_hash:
+            raise errors.QueryError(
+                'the "sha256Hash" of "persistedQuery" does not match '
+                'the query')
+        persisted = registry[query_hash] = PersistedQuery(query)
+    elif query and query != persisted.query:
+        raise errors.QueryError(
+            'the "sha256Hash" of "persistedQuery" does not match the query')
+    return persisted
+
+
 async def compile(
     dbview.Database db,
     tenant,
@@ -250,10 +325,19 @@ async def compile(
     )
 
 
-async def _execute(db, tenant, query, operation_name, variables, globals):
+async def _execute(
+    db, tenant, query, operation_name, variables, globals,
+    *, persisted_hash=None,
+):
+    cdef PersistedQuery persisted = None
+
     dbver = db.dbver
     query_cache = tenant.server._http_query_cache
 
+    if persisted_hash is not None:
+        persisted = _get_persisted_query(tenant, query, persisted_hash)
+        query = persisted.query
+
     if variables:
         for var_name in variables:
             if var_name.startswith('_edb_arg__'):
@@ -269,7 +353,13 @@ async def _execute(db, tenant, query, operation_name, variables, globals):
         print(f'variables: {variables}')
 
     try:
-        rewritten = _graphql_rewrite.rewrite(operation_name, query)
+        rewritten = None
+        if persisted is not None:
+            rewritten = persisted.rewrites.get(operation_name)
+        if rewritten is None:
+            rewritten = _graphql_rewrite.rewrite(operation_name, query)
+            if persisted is not None:
+                persisted.rewrites[operation_name] = rewritten
 
         vars = rewritten.variables().copy()
         if variables:
@@ -21,6 +21,7 @@ from __future__ import annotations
 from typing import *
 
 from functools import partial
+import copy
 from graphql import (
     GraphQLAbstractType,
     GraphQLSchema,
@@ -396,6 +397,18 @@ class GQLCoreSchema:
         # this map is used for GQL -> EQL translator needs
         self._type_map = {}
 
+    def with_edgedb_schema(self, edb_schema: s_schema.Schema) -> GQLCoreSchema:
+        '''Make a copy translating GraphQL against *edb_schema*.
+
+        The copy shares the GraphQL types with this schema, so
+        *edb_schema* must reflect into the same GraphQL schema as the
+        one this schema was built from.
+        '''
+        new = copy.copy(self)
+        new.edb_schema = edb_schema
+        new._type_map = {}
+        return new
+
     @property
     def edgedb_schema(self) -> s_schema.Schema:
         return self.edb_schema
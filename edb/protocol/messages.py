@@ -579,7 +579,7 @@ class RestoreReady(ServerMessage):
     mtype = MessageType('+')
     message_length = MessageLength
     annotations = Annotations
-    jobs = UInt16('Number of parallel jobs for restore, currently always "1"')
+    jobs = UInt16('Number of parallel jobs the server restores with.')
 
 
 class DataElement(Struct):
@@ -772,8 +772,7 @@ class Restore(ClientMessage):
     mtype = MessageType('<')
     message_length = MessageLength
     attributes = KeyValues
-    jobs = UInt16(
-        'Number of parallel jobs for restore (only "1" is supported)')
+    jobs = UInt16('Number of parallel jobs requested for restore.')
     header_data = Bytes(
         'Original DumpHeader packet data excluding mtype and message_length')
 
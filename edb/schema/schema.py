@@ -25,7 +25,9 @@ from typing import overload
 import abc
 import collections
 import functools
+import hashlib
 import itertools
+import pickle
 
 import immutables as immu
 
@@ -497,6 +499,30 @@ class Schema(abc.ABC):
         raise NotImplementedError
 
 
+_FLAT_SCHEMA_MAPS = (
+    '_id_to_data',
+    '_id_to_type',
+    '_name_to_id',
+    '_shortname_to_id',
+    '_globalname_to_id',
+    '_refs_to',
+)
+
+_MISSING = object()
+
+
+class FlatSchemaDelta(NamedTuple):
+    """The changes turning one FlatSchema into another.
+
+    See FlatSchema.get_delta() and FlatSchema.apply_delta().
+    """
+
+    # For each of the _FLAT_SCHEMA_MAPS, the updated (key, value)
+    # pairs and the deleted keys.
+    maps: Tuple[Tuple[Tuple[Tuple[Any, Any], ...], Tuple[Any, ...]], ...]
+    generation: int
+
+
 class FlatSchema(Schema):
 
     _id_to_data: immu.Map[uuid.UUID, Tuple[Any, ...]]
@@ -578,6 +604,95 @@ class FlatSchema(Schema):
 
         return new
 
+    def get_delta(self, base: FlatSchema) -> FlatSchemaDelta:
+        """Return the changes turning *base* into this schema.
+
+        Entries are compared by identity, which is cheap and gives
+        a small delta when this schema was derived from *base* in
+        the same process.
+        """
+        maps = []
+        for attr in _FLAT_SCHEMA_MAPS:
+            base_map = getattr(base, attr)
+            new_map = getattr(self, attr)
+            if base_map is new_map:
+                maps.append(((), ()))
+                continue
+            updated = tuple(
+                (k, v) for k, v in new_map.items()
+                if base_map.get(k, _MISSING) is not v
+            )
+            deleted = tuple(k for k in base_map.keys() if k not in new_map)
+            maps.append((updated, deleted))
+
+        return FlatSchemaDelta(
+            maps=tuple(maps),
+            generation=self._generation,
+        )
+
+    def iter_changed_classes(self, base: FlatSchema) -> Iterator[str]:
+        """Yield the class names of the objects changed since *base*.
+
+        Objects that were added, updated or deleted are all included,
+        and compared by identity like in get_delta(); a class name is
+        yielded for every such object.
+        """
+        base_data = base._id_to_data
+        for obj_id, data in self._id_to_data.items():
+            if base_data.get(obj_id) is not data:
+                yield self._id_to_type[obj_id]
+
+        for obj_id, cls_name in base._id_to_type.items():
+            if obj_id not in self._id_to_type:
+                yield cls_name
+
+    def apply_delta(self, delta: FlatSchemaDelta) -> FlatSchema:
+        new = FlatSchema.__new__(FlatSchema)
+
+        for attr, (updated, deleted) in zip(_FLAT_SCHEMA_MAPS, delta.maps):
+            m = getattr(self, attr)
+            if updated or deleted:
+                with m.mutate() as mm:
+                    for k in deleted:
+                        del mm[k]
+                    for k, v in updated:
+                        mm[k] = v
+                    m = mm.finish()
+            setattr(new, attr, m)
+
+        new._generation = delta.generation
+
+        return new
+
+    def get_fingerprint(
+        self,
+        *,
+        exclude: AbstractSet[uuid.UUID] = frozenset(),
+    ) -> bytes:
+        """Return a digest of the objects in this schema.
+
+        Unlike the pickle of the schema, the digest does not depend on
+        the order in which the objects were added, so schemas with the
+        same objects have the same fingerprint.  Objects are identified
+        by their ids, which are also how they refer to each other, so
+        schemas only match when their objects have the same ids: the
+        same DDL applied to two databases creates objects with different
+        ids.  Objects with ids in *exclude* are left out.
+        """
+        digest = hashlib.sha256()
+        for obj_id in sorted(self._id_to_type.keys()):
+            if obj_id in exclude:
+                continue
+            digest.update(pickle.dumps(
+                (
+                    obj_id,
+                    self._id_to_type[obj_id],
+                    self._id_to_data[obj_id],
+                ),
+                pickle.HIGHEST_PROTOCOL,
+            ))
+        return digest.digest()
+
     def _update_obj_name(
         self,
         obj_id: uuid.UUID,
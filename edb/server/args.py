@@ -212,6 +212,7 @@ class ServerConfig(NamedTuple):
     auto_shutdown_after: float
     readiness_state_file: Optional[str]
     disable_dynamic_system_config: bool
+    persistent_query_cache_dir: Optional[pathlib.Path]
 
     startup_script: Optional[StartupScript]
     status_sinks: List[Callable[[str], None]]
@@ -928,7 +929,14 @@ _server_options = [
         envvar="EDGEDB_SERVER_DISABLE_DYNAMIC_SYSTEM_CONFIG",
         cls=EnvvarResolver,
         help="Disable dynamic configuration of system config values",
-    )
+    ),
+    click.option(
+        '--persistent-query-cache-dir', type=PathPath(), default=None,
+        envvar="EDGEDB_SERVER_PERSISTENT_QUERY_CACHE_DIR",
+        help="Keep compiled queries in this directory, so that they "
+             "survive server restarts.  The directory must only be "
+             "writable by the server.",
+    ),
 ]
 
 
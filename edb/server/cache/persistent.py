@@ -0,0 +1,401 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2023-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from __future__ import annotations
+from typing import Any, Optional
+
+import asyncio
+import collections.abc
+import concurrent.futures
+import hashlib
+import hmac
+import logging
+import os
+import pathlib
+import pickle
+import secrets
+import sqlite3
+import struct
+
+from edb import buildmeta
+from edb.server import defines
+
+
+logger = logging.getLogger('edb.server')
+
+# Trim the store down to its maximum size every that many writes.
+_TRIM_INTERVAL = 100
+
+# Writes are buffered and committed by the I/O thread in batches, at the
+# latest that many seconds after they were made, or as soon as that many
+# entries are pending.
+_FLUSH_DELAY = 1.0
+_FLUSH_BATCH_SIZE = 100
+
+_KEY_SIZE = 32
+_DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+def _canonicalize(obj: Any) -> Any:
+    # Mappings (immutables.Map) and sets iterate in hash order, which
+    # changes between processes, so they are sorted to make the pickled
+    # keys stable across server restarts.
+    if isinstance(obj, collections.abc.Mapping):
+        return tuple(sorted(
+            ((_canonicalize(k), _canonicalize(v)) for k, v in obj.items()),
+            key=repr,
+        ))
+    elif isinstance(obj, (set, frozenset)):
+        return tuple(sorted((_canonicalize(v) for v in obj), key=repr))
+    elif isinstance(obj, (tuple, list)):
+        return tuple(_canonicalize(v) for v in obj)
+    else:
+        return obj
+
+
+def make_key(*parts: Any) -> Optional[bytes]:
+    """Return a digest of *parts* that is stable across server restarts.
+
+    Returns None if some part cannot be pickled, in which case the
+    entry should not be persisted.
+    """
+    try:
+        data = pickle.dumps(
+            _canonicalize(parts), protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+    return hashlib.sha256(data).digest()
+
+
+def load_or_create_key(path: pathlib.Path) -> bytes:
+    """Return the HMAC key of a persistent cache, creating it if needed.
+
+    The key is only readable by the server user: whoever can read it can
+    forge entries that the server will unpickle.
+    """
+    try:
+        with open(path, 'rb') as f:
+            key = f.read()
+    except FileNotFoundError:
+        key = secrets.token_bytes(_KEY_SIZE)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            # Created concurrently by another server.
+            return load_or_create_key(path)
+        with open(fd, 'wb') as f:
+            f.write(key)
+        return key
+
+    if len(key) != _KEY_SIZE:
+        raise RuntimeError(
+            f'invalid persistent query cache key file {path}: '
+            f'expected {_KEY_SIZE} bytes, got {len(key)}')
+    return key
+
+
+class PersistentQueryCache:
+    """An on-disk store of compiled queries.
+
+    Entries are grouped per database and per schema key, a digest of
+    everything the compilation depends on besides the query itself (see
+    make_schema_key()), so that after a restart the queries compiled
+    against an unchanged schema are found again.  When the schema of a
+    database changes, the entries of its previous schemas are dropped
+    with invalidate().
+
+    The SQLite file is only accessed by a dedicated I/O thread: get()
+    is a coroutine, and set() buffers the entries, which the thread
+    writes in batches.  Entries are signed with an HMAC keyed by a
+    per-instance secret (the *key_path* file next to the store by
+    default), so that an entry that was not written by this instance
+    is never unpickled.
+
+    The store is a cache: a failure to read or write it, or an entry
+    that fails verification, is logged and treated as a miss.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        *,
+        maxsize: int = defines._MAX_QUERIES_CACHE * 10,
+        key_path: Optional[pathlib.Path] = None,
+    ) -> None:
+        self._path = path
+        self._maxsize = maxsize
+        self._writes = 0
+        self._closed = False
+        self._build = (
+            buildmeta.EDGEDB_CATALOG_VERSION,
+            str(buildmeta.get_version()),
+        )
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if key_path is None:
+            key_path = path.with_suffix('.key')
+        self._key = load_or_create_key(key_path)
+
+        # (dbname, schema_key, query_key) -> value, written by the next
+        # flush
+        self._pending: dict[tuple[str, bytes, bytes], Any] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The connection is created and used by this thread only, and
+        # its tasks run in submission order, so a read sees all the
+        # writes flushed before it.
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='edb-query-cache')
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor.submit(self._io_open)
+
+    def make_schema_key(self, *parts: Any) -> Optional[bytes]:
+        # Compiled queries are only valid for the server build that
+        # compiled them.
+        return make_key(self._build, *parts)
+
+    async def get(
+        self,
+        dbname: str,
+        schema_key: bytes,
+        query_key: bytes,
+    ) -> Any:
+        if self._closed:
+            return None
+        key = (dbname, schema_key, query_key)
+        try:
+            return self._pending[key]
+        except KeyError:
+            pass
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._io_get, key)
+
+    def set(
+        self,
+        dbname: str,
+        schema_key: bytes,
+        query_key: bytes,
+        value: Any,
+    ) -> None:
+        if self._closed:
+            return
+        self._pending[(dbname, schema_key, query_key)] = value
+        if len(self._pending) >= _FLUSH_BATCH_SIZE:
+            self.flush()
+        elif self._flush_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.flush()
+            else:
+                self._flush_handle = loop.call_later(
+                    _FLUSH_DELAY, self.flush)
+
+    def flush(self) -> None:
+        """Hand the buffered entries over to the I/O thread."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._closed or not self._pending:
+            return
+        batch = self._pending
+        self._pending = {}
+        self._executor.submit(self._io_set_many, batch)
+
+    def invalidate(
+        self,
+        dbname: str,
+        *,
+        keep_schema_key: Optional[bytes] = None,
+    ) -> None:
+        """Drop the entries of *dbname* except those of *keep_schema_key*."""
+        if self._closed:
+            return
+        self._pending = {
+            key: value for key, value in self._pending.items()
+            if key[0] != dbname or key[1] == keep_schema_key
+        }
+        if keep_schema_key is None:
+            self._executor.submit(
+                self._io_execute,
+                'DELETE FROM compiled WHERE dbname = ?',
+                (dbname,),
+            )
+        else:
+            self._executor.submit(
+                self._io_execute,
+                'DELETE FROM compiled WHERE dbname = ? AND schema_key != ?',
+                (dbname, keep_schema_key),
+            )
+
+    def close(self) -> None:
+        # Connections still being served after the tenant has stopped
+        # see a store that is always empty.  This waits for the I/O
+        # thread to write the buffered entries.
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._executor.submit(self._io_close)
+        self._executor.shutdown(wait=True)
+
+    # The methods below run in the I/O thread.
+
+    def _io_open(self) -> None:
+        try:
+            conn = sqlite3.connect(self._path, isolation_level=None)
+            # Losing the most recent writes on a crash is fine for a
+            # cache.
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS compiled (
+                    dbname TEXT NOT NULL,
+                    schema_key BLOB NOT NULL,
+                    query_key BLOB NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (dbname, schema_key, query_key)
+                )
+            ''')
+        except sqlite3.Error as ex:
+            logger.warning('could not open the persistent query cache %s: '
+                           '%s', self._path, ex)
+        else:
+            self._conn = conn
+
+    def _io_close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _sign(self, key: tuple[str, bytes, bytes], data: bytes) -> bytes:
+        dbname, schema_key, query_key = key
+        dbname_bytes = dbname.encode()
+        mac = hmac.new(self._key, digestmod=hashlib.sha256)
+        # The entry is bound to its key, so that it cannot be moved to
+        # another query.
+        mac.update(struct.pack('!I', len(dbname_bytes)))
+        mac.update(dbname_bytes)
+        mac.update(schema_key)
+        mac.update(query_key)
+        mac.update(data)
+        return mac.digest()
+
+    def _io_get(self, key: tuple[str, bytes, bytes]) -> Any:
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute(
+                '''
+                    SELECT data FROM compiled
+                    WHERE dbname = ? AND schema_key = ? AND query_key = ?
+                ''',
+                key,
+            ).fetchone()
+        except sqlite3.Error as ex:
+            logger.warning('could not read the persistent query cache %s: %s',
+                           self._path, ex)
+            return None
+
+        if row is None:
+            return None
+
+        entry = row[0]
+        digest, data = entry[:_DIGEST_SIZE], entry[_DIGEST_SIZE:]
+        if not hmac.compare_digest(digest, self._sign(key, data)):
+            logger.warning('dropping persistent query cache entry with '
+                           'an invalid signature')
+            self._io_delete(key)
+            return None
+
+        try:
+            return pickle.loads(data)
+        except Exception as ex:
+            logger.warning('dropping corrupted persistent query cache entry: '
+                           '%s', ex)
+            self._io_delete(key)
+            return None
+
+    def _io_delete(self, key: tuple[str, bytes, bytes]) -> None:
+        self._io_execute(
+            '''
+                DELETE FROM compiled
+                WHERE dbname = ? AND schema_key = ? AND query_key = ?
+            ''',
+            key,
+        )
+
+    def _io_set_many(self, batch: dict[tuple[str, bytes, bytes], Any]) -> None:
+        if self._conn is None:
+            return
+
+        rows = []
+        for key, value in batch.items():
+            try:
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as ex:
+                logger.debug('cannot persist compiled query: %s', ex)
+                continue
+            rows.append((*key, self._sign(key, data) + data))
+
+        try:
+            with self._conn:
+                self._conn.execute('BEGIN')
+                # REPLACE assigns a new rowid, so rowids order the
+                # entries from the least recently written.
+                self._conn.executemany(
+                    '''
+                        INSERT OR REPLACE INTO compiled
+                            (dbname, schema_key, query_key, data)
+                        VALUES (?, ?, ?, ?)
+                    ''',
+                    rows,
+                )
+        except sqlite3.Error as ex:
+            logger.warning('could not update the persistent query cache %s: '
+                           '%s', self._path, ex)
+            return
+
+        trim = (
+            self._writes // _TRIM_INTERVAL
+            != (self._writes + len(rows)) // _TRIM_INTERVAL
+        )
+        self._writes += len(rows)
+        if trim:
+            self._io_trim()
+
+    def _io_trim(self) -> None:
+        # Everything up to the (maxsize + 1)-th most recent entry goes.
+        self._io_execute(
+            '''
+                DELETE FROM compiled WHERE rowid <= (
+                    SELECT rowid FROM compiled
+                    ORDER BY rowid DESC LIMIT 1 OFFSET ?
+                )
+            ''',
+            (self._maxsize,),
+        )
+
+    def _io_execute(self, query: str, args: tuple[Any, ...]) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(query, args)
+        except sqlite3.Error as ex:
+            logger.warning('could not update the persistent query cache %s: '
+                           '%s', self._path, ex)
@@ -20,10 +20,9 @@
 cdef class StatementsCache:
 
     cdef:
-        object _dict
-        int _maxsize
-        object _dict_move_to_end
-        object _dict_get
+        object _cache
+        object _cache_get
+        object _evicted
 
     cpdef get(self, key, default)
     cpdef needs_cleanup(self)
@@ -19,82 +19,69 @@
 
 import collections
 
-
-cdef object _LRU_MARKER = object()
+from edb.common import lru
 
 
 cdef class StatementsCache:
 
-    # We use an OrderedDict for LRU implementation.  Operations:
-    #
-    # * We use a simple `__setitem__` to push a new entry:
-    #       `entries[key] = new_entry`
-    #   That will push `new_entry` to the *end* of the entries dict.
-    #
-    # * When we have a cache hit, we call
-    #       `entries.move_to_end(key, last=True)`
-    #   to move the entry to the *end* of the entries dict.
-    #
-    # * When we need to remove entries to maintain `max_size`, we call
-    #       `entries.popitem(last=False)`
-    #   to remove an entry from the *beginning* of the entries dict.
+    # The entries are kept in a TinyLFUMapping, so a burst of one-off
+    # statements does not push the frequently used ones out.
     #
-    # So new entries and hits are always promoted to the end of the
-    # entries dict, whereas the unused one will group in the
-    # beginning of it.
+    # Evicting an entry requires closing the prepared statement on
+    # the backend, so the evicted keys are queued in `_evicted`
+    # until the connection collects them with `cleanup_one()`,
+    # before preparing the next statement.
+
+    def __init__(self, *, maxsize, stats=None):
+        self._evicted = collections.deque()
+        self._cache = lru.TinyLFUMapping(
+            maxsize=maxsize, stats=stats, on_evict=self._on_evict)
+        self._cache_get = self._cache.get
+
+    def _on_evict(self, key, o):
+        self._evicted.append(key)
+
+    @property
+    def stats(self):
+        return self._cache.stats
 
-    def __init__(self, *, maxsize):
-        self.resize(maxsize)
-        self._dict = collections.OrderedDict()
-        self._dict_move_to_end = self._dict.move_to_end
-        self._dict_get = self._dict.get
+    @stats.setter
+    def stats(self, stats):
+        self._cache.stats = stats
 
     cpdef get(self, key, default):
-        o = self._dict_get(key, _LRU_MARKER)
-        if o is _LRU_MARKER:
-            return default
-        self._dict_move_to_end(key)  # last=True
-        return o
+        return self._cache_get(key, default)
 
     cpdef needs_cleanup(self):
-        return len(self._dict) > self._maxsize
+        return bool(self._evicted)
 
     cpdef cleanup_one(self):
-        k, _ = self._dict.popitem(last=False)
-        return k
+        return self._evicted.popleft()
 
     cpdef resize(self, int maxsize):
-        if maxsize <= 0:
-            raise ValueError(
-                f'maxsize is expected to be greater than 0, got {maxsize}')
-        self._maxsize = maxsize
+        self._cache.resize(maxsize)
 
     def items(self):
-        return self._dict.items()
+        return self._cache.items()
 
     def clear(self):
-        self._dict.clear()
+        self._cache.clear()
+        self._evicted.clear()
 
     def __getitem__(self, key):
-        o = self._dict[key]
-        self._dict_move_to_end(key)  # last=True
-        return o
+        return self._cache[key]
 
     def __setitem__(self, key, o):
-        if key in self._dict:
-            self._dict[key] = o
-            self._dict_move_to_end(key)  # last=True
-        else:
-            self._dict[key] = o
+        self._cache[key] = o
 
     def __delitem__(self, key):
-        del self._dict[key]
+        del self._cache[key]
 
     def __contains__(self, key):
-        return key in self._dict
+        return key in self._cache
 
     def __len__(self):
-        return len(self._dict)
+        return len(self._cache)
 
     def __iter__(self):
-        return iter(self._dict)
+        return iter(self._cache)
@@ -24,6 +24,8 @@ from .compiler import CompileContext, CompilerDatabaseState
 from .compiler import compile_edgeql_script
 from .compiler import new_compiler, new_compiler_from_pg, new_compiler_context
 from .compiler import compile, compile_schema_storage_in_delta
+from .compiler import get_user_schema_fingerprint
+from .compiler import get_user_schema_version
 from .dbstate import QueryUnit, QueryUnitGroup
 from .enums import Capability, Cardinality
 from .enums import InputFormat, OutputFormat
@@ -48,5 +50,7 @@ __all__ = (
     'new_compiler_context',
     'compile',
     'compile_schema_storage_in_delta',
+    'get_user_schema_fingerprint',
+    'get_user_schema_version',
     'repair_schema',
 )
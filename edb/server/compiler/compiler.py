@@ -63,6 +63,7 @@ from edb.schema import reflection as s_refl
 from edb.schema import roles as s_role
 from edb.schema import schema as s_schema
 from edb.schema import types as s_types
+from edb.schema import version as s_ver
 
 from edb.pgsql import ast as pgast
 from edb.pgsql import compiler as pg_compiler
@@ -207,6 +208,8 @@ def new_compiler(
     local_intro_query: Optional[str] = None,
     global_intro_query: Optional[str] = None,
     config_spec: Optional[config.Spec] = None,
+    user_schema_deltas: bool = False,
+    user_schema_fingerprints: bool = False,
 ) -> Compiler:
     """Create and return a compiler instance."""
 
@@ -228,6 +231,8 @@ def new_compiler(
         config_spec=config_spec,
         local_intro_query=local_intro_query,
         global_intro_query=global_intro_query,
+        user_schema_deltas=user_schema_deltas,
+        user_schema_fingerprints=user_schema_fingerprints,
     ))
 
 
@@ -384,6 +389,13 @@ class CompilerState:
     local_intro_query: Optional[str]
     global_intro_query: Optional[str]
 
+    # Whether to attach a UserSchemaDelta to the units changing the
+    # user schema; only the compiler pools shipping deltas use them.
+    user_schema_deltas: bool = False
+    # Whether to fingerprint the user schemas for the compiled query
+    # cache shared by the tenants of a multi-tenant server.
+    user_schema_fingerprints: bool = False
+
     @functools.cached_property
     def state_serializer_factory(self) -> sertypes.StateSerializerFactory:
         # TODO: This factory will probably need to become per-db once
@@ -997,8 +1009,13 @@ class Compiler:
             global_schema,
             defines.CURRENT_PROTOCOL,
         )
+        if self.state.user_schema_fingerprints:
+            user_schema_fingerprint = get_user_schema_fingerprint(user_schema)
+        else:
+            user_schema_fingerprint = None
         return dbstate.ParsedDatabase(
             user_schema_pickle=pickle.dumps(user_schema, -1),
+            user_schema_fingerprint=user_schema_fingerprint,
             database_config=db_config,
             ext_config_settings=ext_config_settings,
             protocol_version=defines.CURRENT_PROTOCOL,
@@ -2323,6 +2340,9 @@ def _try_compile(
 
     rv = dbstate.QueryUnitGroup()
 
+    # The user schema the deltas of the units are computed against.
+    base_user_schema = ctx.state.current_tx().get_initial_user_schema()
+
     is_script = statements_len > 1
     script_info = None
     if is_script:
@@ -2427,6 +2447,12 @@ def _try_compile(
                 if comp.user_schema is not None:
                     final_user_schema = comp.user_schema
                     unit.user_schema = pickle.dumps(comp.user_schema, -1)
+                    if ctx.compiler_state.user_schema_deltas:
+                        unit.user_schema_delta = _make_user_schema_delta(
+                            base_user_schema, comp.user_schema)
+                    if ctx.compiler_state.user_schema_fingerprints:
+                        unit.user_schema_fingerprint = (
+                            get_user_schema_fingerprint(comp.user_schema))
                     unit.extensions, unit.ext_config_settings = (
                         _extract_extensions(ctx, comp.user_schema)
                     )
@@ -2452,6 +2478,12 @@ def _try_compile(
                 if comp.user_schema is not None:
                     final_user_schema = comp.user_schema
                     unit.user_schema = pickle.dumps(comp.user_schema, -1)
+                    if ctx.compiler_state.user_schema_deltas:
+                        unit.user_schema_delta = _make_user_schema_delta(
+                            base_user_schema, comp.user_schema)
+                    if ctx.compiler_state.user_schema_fingerprints:
+                        unit.user_schema_fingerprint = (
+                            get_user_schema_fingerprint(comp.user_schema))
                     unit.extensions, unit.ext_config_settings = (
                         _extract_extensions(ctx, comp.user_schema)
                     )
@@ -2490,6 +2522,12 @@ def _try_compile(
                 if comp.user_schema is not None:
                     final_user_schema = comp.user_schema
                     unit.user_schema = pickle.dumps(comp.user_schema, -1)
+                    if ctx.compiler_state.user_schema_deltas:
+                        unit.user_schema_delta = _make_user_schema_delta(
+                            base_user_schema, comp.user_schema)
+                    if ctx.compiler_state.user_schema_fingerprints:
+                        unit.user_schema_fingerprint = (
+                            get_user_schema_fingerprint(comp.user_schema))
                     unit.extensions, unit.ext_config_settings = (
                         _extract_extensions(ctx, comp.user_schema)
                     )
@@ -3016,6 +3054,52 @@ def _extract_extensions(
     return names, settings
 
 
+def get_user_schema_version(
+    user_schema: s_schema.FlatSchema,
+) -> Optional[uuid.UUID]:
+    # The std schema version object is copied into the user schema
+    # by the first DDL applied to it.
+    ver = user_schema.get_global(
+        s_ver.SchemaVersion, '__schema_version__', None)
+    if ver is None:
+        return None
+    return ver.get_version(user_schema)
+
+
+def get_user_schema_fingerprint(user_schema: s_schema.Schema) -> bytes:
+    """Return a digest identifying the contents of *user_schema*.
+
+    The schema version object is left out: it is bumped by every DDL,
+    so otherwise two databases restored from the same dump would stop
+    matching once the same change (that creates no objects) is applied
+    to both.  The other objects must have the same ids to match, see
+    FlatSchema.get_fingerprint().
+    """
+    assert isinstance(user_schema, s_schema.FlatSchema)
+    ver = user_schema.get_global(
+        s_ver.SchemaVersion, '__schema_version__', None)
+    exclude = frozenset() if ver is None else frozenset((ver.id,))
+    return user_schema.get_fingerprint(exclude=exclude)
+
+
+def _make_user_schema_delta(
+    base_schema: s_schema.FlatSchema,
+    user_schema: s_schema.Schema,
+) -> Optional[dbstate.UserSchemaDelta]:
+    assert isinstance(user_schema, s_schema.FlatSchema)
+    base_version = get_user_schema_version(base_schema)
+    version = get_user_schema_version(user_schema)
+    # The compiler pool identifies schemas by their version, so
+    # without distinct versions the whole schema has to be sent.
+    if base_version is None or version is None or base_version == version:
+        return None
+    return dbstate.UserSchemaDelta(
+        base_version=base_version,
+        version=version,
+        data=pickle.dumps(user_schema.get_delta(base_schema), -1),
+    )
+
+
 def _extract_roles(
     global_schema: s_schema.Schema
 ) -> immutables.Map[str, immutables.Map[str, Any]]:
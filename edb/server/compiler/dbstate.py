@@ -202,6 +202,16 @@ class Param:
     sub_params: Optional[tuple[list[Optional[uuid.UUID]], tuple[Any, ...]]]
 
 
+@dataclasses.dataclass(frozen=True)
+class UserSchemaDelta:
+    # The __schema_version__ of the user schema the delta applies to,
+    # and of the user schema it produces.
+    base_version: uuid.UUID
+    version: uuid.UUID
+    # The pickled s_schema.FlatSchemaDelta.
+    data: bytes
+
+
 #############################
 
 
@@ -313,6 +323,12 @@ class QueryUnit:
     # If present, represents the future schema state after
     # the command is run. The schema is pickled.
     user_schema: Optional[bytes] = None
+    # If present, the changes turning the user schema at the start
+    # of the transaction into user_schema.
+    user_schema_delta: Optional[UserSchemaDelta] = None
+    # If present, the digest of user_schema used to share compiled
+    # queries between databases with identical schemas.
+    user_schema_fingerprint: Optional[bytes] = None
     cached_reflection: Optional[bytes] = None
     extensions: Optional[set[str]] = None
     ext_config_settings: Optional[list[config.Setting]] = None
@@ -473,6 +489,7 @@ class SQLQueryUnit:
 @dataclasses.dataclass
 class ParsedDatabase:
     user_schema_pickle: bytes
+    user_schema_fingerprint: Optional[bytes]
     database_config: immutables.Map[str, config.SettingValue]
     ext_config_settings: list[config.Setting]
 
@@ -769,6 +786,9 @@ class Transaction:
     def get_user_schema(self) -> s_schema.FlatSchema:
         return self._current.user_schema
 
+    def get_initial_user_schema(self) -> s_schema.FlatSchema:
+        return self._state0.user_schema
+
     def get_user_schema_if_updated(self) -> Optional[s_schema.FlatSchema]:
         if self._current.user_schema is self._state0.user_schema:
             return None
@@ -79,6 +79,7 @@ def __init_worker__(
         schema_class_layout,
         backend_runtime_params=backend_runtime_params,
         config_spec=None,
+        user_schema_fingerprints=True,
     )
 
 
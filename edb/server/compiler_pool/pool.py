@@ -33,6 +33,7 @@ import signal
 import subprocess
 import sys
 import time
+import uuid
 
 import immutables
 
@@ -56,6 +57,14 @@ KILL_TIMEOUT: float = 10.0
 ADAPTIVE_SCALE_UP_WAIT_TIME: float = 3.0
 ADAPTIVE_SCALE_DOWN_WAIT_TIME: float = 60.0
 WORKER_PKG: str = __name__.rpartition('.')[0] + '.'
+# The number of recent user schema changes kept to bring compiler
+# workers up to date with deltas rather than full schema pickles.
+SCHEMA_DELTA_LOG_SIZE: int = 100
+# The total size of the user schema pickles kept to tell the versions
+# the workers have; the most recent pickle is kept regardless.
+SCHEMA_VERSION_LOG_BYTES: int = 16 * 1024 * 1024
+# Workers lagging more schema versions behind get the full schema.
+MAX_SCHEMA_DELTA_CHAIN: int = 10
 
 
 logger = logging.getLogger("edb.server")
@@ -174,9 +183,21 @@ class Worker(BaseWorker):
 
 class AbstractPool:
     _dbindex: dbview.DatabaseIndex | None = None
+    # Whether the workers accept user schema deltas in place of
+    # full schema pickles, see _get_user_schema_update().
+    _schema_deltas_supported: bool = False
 
     def __init__(self, *, loop, **kwargs):
         self._loop = loop
+        # The recent user schema deltas by the version they produce,
+        # and the known versions of the user schema pickles, keyed by
+        # id() like the identity checks of _compute_compile_preargs().
+        self._schema_deltas: collections.OrderedDict[uuid.UUID, Any] = (
+            collections.OrderedDict())
+        self._schema_versions: collections.OrderedDict[
+            int, tuple[bytes, uuid.UUID]
+        ] = collections.OrderedDict()
+        self._schema_versions_size = 0
         self._init_args = self._init(kwargs)
 
     def _init(self, kwargs: dict[str, Any]) -> None:
@@ -213,6 +234,78 @@ class AbstractPool:
     def get_template_pid(self):
         return None
 
+    def _remember_schema_version(self, user_schema_pickle, version):
+        key = id(user_schema_pickle)
+        if key in self._schema_versions:
+            self._schema_versions.move_to_end(key)
+            return
+        self._schema_versions[key] = (user_schema_pickle, version)
+        self._schema_versions_size += len(user_schema_pickle)
+        while (
+            self._schema_versions_size > SCHEMA_VERSION_LOG_BYTES
+            and len(self._schema_versions) > 1
+        ):
+            _, (evicted, _) = self._schema_versions.popitem(last=False)
+            self._schema_versions_size -= len(evicted)
+
+    def _get_schema_version(self, user_schema_pickle) -> uuid.UUID | None:
+        entry = self._schema_versions.get(id(user_schema_pickle))
+        if entry is None or entry[0] is not user_schema_pickle:
+            return None
+        return entry[1]
+
+    def _register_schema_deltas(self, base_schema_pickle, units):
+        # The deltas of the units are computed against the user schema
+        # at the start of the transaction, which is *base_schema_pickle*
+        # when compiling outside of a transaction.
+        if not self._schema_deltas_supported:
+            return
+        for unit in units:
+            delta = unit.user_schema_delta
+            if delta is None:
+                continue
+            self._schema_deltas[delta.version] = delta
+            self._schema_deltas.move_to_end(delta.version)
+            if len(self._schema_deltas) > SCHEMA_DELTA_LOG_SIZE:
+                self._schema_deltas.popitem(last=False)
+            if base_schema_pickle is not None:
+                self._remember_schema_version(
+                    base_schema_pickle, delta.base_version)
+            self._remember_schema_version(unit.user_schema, delta.version)
+
+    def _get_user_schema_update(
+        self,
+        worker_schema_pickle,
+        user_schema_pickle,
+    ):
+        """Return what a worker needs to switch to another user schema.
+
+        That is a tuple of the deltas turning the schema of the worker
+        into *user_schema_pickle*, or the pickle itself if the worker is
+        too far behind or the deltas are unknown.
+        """
+        if not self._schema_deltas_supported:
+            return user_schema_pickle
+
+        worker_version = self._get_schema_version(worker_schema_pickle)
+        version = self._get_schema_version(user_schema_pickle)
+        if worker_version is None or version is None:
+            return user_schema_pickle
+
+        deltas = []
+        size = 0
+        while version != worker_version:
+            delta = self._schema_deltas.get(version)
+            if delta is None or len(deltas) == MAX_SCHEMA_DELTA_CHAIN:
+                return user_schema_pickle
+            size += len(delta.data)
+            if size >= len(user_schema_pickle):
+                return user_schema_pickle
+            deltas.append(delta)
+            version = delta.base_version
+
+        return tuple(reversed(deltas))
+
     async def _compute_compile_preargs(
         self,
         method_name: str,
@@ -302,7 +395,8 @@ class AbstractPool:
             }
         else:
             if worker_db.user_schema_pickle is not user_schema_pickle:
-                preargs.append(user_schema_pickle)
+                preargs.append(self._get_user_schema_update(
+                    worker_db.user_schema_pickle, user_schema_pickle))
                 to_update['user_schema_pickle'] = user_schema_pickle
             else:
                 preargs.append(None)
@@ -381,6 +475,7 @@ class AbstractPool:
                 sync_state=sync_state
             )
             worker._last_pickled_state = result[1]
+            self._register_schema_deltas(user_schema_pickle, result[0])
             if len(result) == 2:
                 return *result, 0
             else:
@@ -432,6 +527,7 @@ class AbstractPool:
                 *compile_args
             )
             worker._last_pickled_state = new_pickled_state
+            self._register_schema_deltas(None, units)
             return units, new_pickled_state, 0
 
         finally:
@@ -661,6 +757,7 @@ class BaseLocalPool(
 
     _worker_class = Worker
     _worker_mod = "worker"
+    _schema_deltas_supported = True
     _workers_queue: queue.WorkerQueue[Worker]
     _workers: Dict[int, Worker]
 
@@ -1332,6 +1429,7 @@ class MultiTenantWorker(Worker):
 class MultiTenantPool(FixedPool):
     _worker_class = MultiTenantWorker  # type: ignore
     _worker_mod = "multitenant_worker"
+    _schema_deltas_supported = False
     _workers: Dict[int, MultiTenantWorker]  # type: ignore
 
     def __init__(self, *, cache_size, **kwargs):
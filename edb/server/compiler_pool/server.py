@@ -192,6 +192,7 @@ class MultiSchemaPool(pool_mod.FixedPool):
     _worker_mod = "multitenant_worker"
     _workers: typing.Dict[int, Worker]  # type: ignore
     _clients: typing.Dict[int, ClientSchema]
+    _schema_deltas_supported = False
 
     def __init__(self, cache_size, *, secret, **kwargs):
         super().__init__(**kwargs)
@@ -46,6 +46,10 @@ STD_SCHEMA: s_schema.FlatSchema
 GLOBAL_SCHEMA: s_schema.FlatSchema
 INSTANCE_CONFIG: immutables.Map[str, config.SettingValue]
 
+# The pickled user schema, or the deltas to apply to the current one.
+UserSchemaUpdate = Union[
+    bytes, Tuple[compiler.dbstate.UserSchemaDelta, ...]]
+
 
 def __init_worker__(
     init_args_pickled: bytes,
@@ -98,12 +102,27 @@ def __init_worker__(
         schema_class_layout,
         backend_runtime_params=BACKEND_RUNTIME_PARAMS,
         config_spec=None,
+        user_schema_deltas=True,
     )
 
 
+def _apply_user_schema_deltas(
+    user_schema: s_schema.FlatSchema,
+    deltas: Tuple[compiler.dbstate.UserSchemaDelta, ...],
+) -> s_schema.FlatSchema:
+    for delta in deltas:
+        version = compiler.get_user_schema_version(user_schema)
+        if version != delta.base_version:
+            raise AssertionError(
+                f'cannot apply a delta of user schema version '
+                f'{delta.base_version} to version {version}')
+        user_schema = user_schema.apply_delta(pickle.loads(delta.data))
+    return user_schema
+
+
 def __sync__(
     dbname: str,
-    user_schema: Optional[bytes],
+    user_schema: Optional[UserSchemaUpdate],
     reflection_cache: Optional[bytes],
     global_schema: Optional[bytes],
     database_config: Optional[bytes],
@@ -132,8 +151,11 @@ def __sync__(
         else:
             updates = {}
 
-            if user_schema is not None:
+            if isinstance(user_schema, bytes):
                 updates['user_schema'] = pickle.loads(user_schema)
+            elif user_schema is not None:
+                updates['user_schema'] = _apply_user_schema_deltas(
+                    db.user_schema, user_schema)
             if reflection_cache is not None:
                 updates['reflection_cache'] = pickle.loads(reflection_cache)
             if database_config is not None:
@@ -158,7 +180,7 @@ def __sync__(
 
 def compile(
     dbname: str,
-    user_schema: Optional[bytes],
+    user_schema: Optional[UserSchemaUpdate],
     reflection_cache: Optional[bytes],
     global_schema: Optional[bytes],
     database_config: Optional[bytes],
@@ -207,7 +229,7 @@ def compile_in_tx(cstate, *args, **kwargs):
 
 def compile_notebook(
     dbname: str,
-    user_schema: Optional[bytes],
+    user_schema: Optional[UserSchemaUpdate],
     reflection_cache: Optional[bytes],
     global_schema: Optional[bytes],
     database_config: Optional[bytes],
@@ -237,7 +259,7 @@ def compile_notebook(
 
 def compile_graphql(
     dbname: str,
-    user_schema: Optional[bytes],
+    user_schema: Optional[UserSchemaUpdate],
     reflection_cache: Optional[bytes],
     global_schema: Optional[bytes],
     database_config: Optional[bytes],
@@ -292,7 +314,7 @@ def compile_graphql(
 
 def compile_sql(
     dbname: str,
-    user_schema: Optional[bytes],
+    user_schema: Optional[UserSchemaUpdate],
     reflection_cache: Optional[bytes],
     global_schema: Optional[bytes],
     database_config: Optional[bytes],
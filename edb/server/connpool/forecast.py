@@ -0,0 +1,196 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2023-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from __future__ import annotations
+
+import dataclasses
+import itertools
+import typing
+
+if typing.TYPE_CHECKING:
+    from . import pool
+
+
+# Smoothing factors of the demand level and trend, see DemandForecast.
+# Replaying the snapshots of the pool simulation tests with tune()
+# favors following the demand closely; these are a bit more
+# conservative, so that noise doesn't open connections for nothing.
+DEFAULT_ALPHA = 0.7
+DEFAULT_BETA = 0.5
+
+
+class DemandForecast:
+
+    # Forecasts the connection demand of a block (the number of tasks
+    # holding or waiting for one of its connections, sampled on every
+    # pool tick) with Holt's linear exponential smoothing: `_level`
+    # follows the demand with a smoothing factor of `alpha`, while
+    # `_trend` follows its growth per tick with a smoothing factor of
+    # `beta`.  A growing demand is thus extrapolated, which lets the
+    # pool start connecting before the waiters show up.
+
+    __slots__ = ('_alpha', '_beta', '_level', '_trend', '_primed')
+
+    _alpha: float
+    _beta: float
+    _level: float
+    _trend: float
+    _primed: bool
+
+    def __init__(
+        self,
+        *,
+        alpha: float = DEFAULT_ALPHA,
+        beta: float = DEFAULT_BETA,
+    ):
+        if not (0 < alpha <= 1 and 0 <= beta <= 1):
+            raise ValueError(
+                f'invalid smoothing factors: alpha={alpha}, beta={beta}')
+        self._alpha = alpha
+        self._beta = beta
+        self._level = 0
+        self._trend = 0
+        self._primed = False
+
+    def add(self, n: float) -> None:
+        if not self._primed:
+            self._level = n
+            self._primed = True
+            return
+
+        prev_level = self._level
+        self._level = (
+            self._alpha * n
+            + (1 - self._alpha) * (prev_level + self._trend)
+        )
+        self._trend = (
+            self._beta * (self._level - prev_level)
+            + (1 - self._beta) * self._trend
+        )
+
+    def trend(self) -> float:
+        return self._trend
+
+    def forecast(self, steps: int = 1) -> float:
+        # The expected demand in `steps` ticks.
+        return max(self._level + self._trend * steps, 0)
+
+
+@dataclasses.dataclass
+class ForecastError:
+    # Errors of the forecasts of one block over a replay.
+    samples: int = 0
+    # Total demand that was not forecast, that is, that had to wait
+    # for connections.
+    under: float = 0
+    # Total forecast demand that did not come, that is, the spare
+    # connections.
+    over: float = 0
+
+    @property
+    def mean_abs_error(self) -> float:
+        return (self.under + self.over) / max(self.samples, 1)
+
+
+def block_demand(block: pool.BlockSnapshot) -> int:
+    # The demand as sampled by Pool._tick().
+    return block.nwaiters + block.nacquired
+
+
+def replay(
+    snapshots: typing.Iterable[pool.Snapshot],
+    *,
+    alpha: float = DEFAULT_ALPHA,
+    beta: float = DEFAULT_BETA,
+    horizon: int = 1,
+) -> typing.Dict[str, ForecastError]:
+    """Replay recorded pool snapshots through DemandForecast.
+
+    Every snapshot is taken on a pool tick; the demand of each block is
+    forecast *horizon* ticks ahead and compared with the demand recorded
+    in the snapshot that many ticks later.  Returns the errors per
+    database.
+    """
+    forecasts: typing.Dict[str, DemandForecast] = {}
+    # The pending forecasts per database, the oldest first.
+    pending: typing.Dict[str, typing.List[float]] = {}
+    errors: typing.Dict[str, ForecastError] = {}
+
+    for snapshot in snapshots:
+        seen = set()
+        for block in snapshot.blocks:
+            seen.add(block.dbname)
+            demand = block_demand(block)
+            fc = forecasts.get(block.dbname)
+            if fc is None:
+                fc = forecasts[block.dbname] = DemandForecast(
+                    alpha=alpha, beta=beta)
+                pending[block.dbname] = []
+                errors[block.dbname] = ForecastError()
+
+            queue = pending[block.dbname]
+            if len(queue) == horizon:
+                err = errors[block.dbname]
+                err.samples += 1
+                diff = demand - queue.pop(0)
+                if diff > 0:
+                    err.under += diff
+                else:
+                    err.over -= diff
+
+            fc.add(demand)
+            queue.append(fc.forecast(horizon))
+
+        # The pool drops the blocks it no longer needs; their history
+        # starts over if they come back.
+        for dbname in forecasts.keys() - seen:
+            del forecasts[dbname]
+            del pending[dbname]
+
+    return errors
+
+
+def tune(
+    snapshots: typing.Sequence[pool.Snapshot],
+    *,
+    alphas: typing.Iterable[float] = (0.2, 0.3, 0.5, 0.7, 0.9),
+    betas: typing.Iterable[float] = (0.0, 0.1, 0.3, 0.5, 0.7),
+    horizon: int = 1,
+    under_weight: float = 2.0,
+) -> typing.Tuple[float, float]:
+    """Find the smoothing factors that forecast *snapshots* the best.
+
+    Waiting for a connection costs more than keeping a spare one, so
+    the demand that was not forecast weighs *under_weight* times as
+    much as the spare connections.  Returns ``(alpha, beta)``.
+    """
+    best = None
+    best_cost = float('inf')
+    for alpha, beta in itertools.product(alphas, betas):
+        errors = replay(snapshots, alpha=alpha, beta=beta, horizon=horizon)
+        cost = sum(
+            err.under * under_weight + err.over for err in errors.values()
+        )
+        if cost < best_cost:
+            best_cost = cost
+            best = (alpha, beta)
+
+    if best is None:
+        raise ValueError('no smoothing factors to try')
+    return best
@@ -24,8 +24,10 @@ import typing
 import asyncio
 import collections
 import dataclasses
+import math
 import time
 
+from . import forecast
 from . import rolavg
 
 
@@ -34,6 +36,10 @@ MIN_QUERY_TIME_THRESHOLD = 0.001
 MIN_LOG_TIME_THRESHOLD = 1
 CONNECT_FAILURE_RETRIES = 3
 MIN_IDLE_TIME_BEFORE_GC = 120
+# How many ticks ahead the demand of the blocks is forecast.  Ticks are
+# about as long as it takes to connect, so connections started for the
+# forecast demand are ready when it comes.
+DEMAND_FORECAST_HORIZON = 1
 
 logger = logging.getLogger("edb.server")
 
@@ -68,6 +74,8 @@ class BlockSnapshot:
     npending: int
     nwaiters: int
     quota: int
+    # Added later; snapshots recorded before lack it.
+    nacquired: int = 0
 
 
 @dataclasses.dataclass
@@ -133,6 +141,7 @@ class Block(typing.Generic[C]):
 
     querytime_avg: rolavg.RollingAverage
     nwaiters_avg: rolavg.RollingAverage
+    demand_forecast: forecast.DemandForecast
 
     _cached_calibrated_demand: float
 
@@ -161,6 +170,7 @@ class Block(typing.Generic[C]):
 
         self.querytime_avg = rolavg.RollingAverage(history_size=20)
         self.nwaiters_avg = rolavg.RollingAverage(history_size=3)
+        self.demand_forecast = forecast.DemandForecast()
 
         self._is_log_batching = False
         self._last_log_timestamp = 0
@@ -414,6 +424,10 @@ class BasePool(typing.Generic[C]):
             block.count_pending_conns() for block in self._blocks.values()
         )
 
+    def count_waiters(self, dbname: str) -> int:
+        block = self._blocks.get(dbname)
+        return 0 if block is None else block.count_waiters()
+
     def _get_loop(self) -> asyncio.AbstractEventLoop:
         if self._loop is None:
             self._loop = asyncio.get_running_loop()
@@ -430,6 +444,7 @@ class BasePool(typing.Generic[C]):
                     npending=block.count_pending_conns(),
                     nwaiters=block.count_waiters(),
                     quota=block.quota,
+                    nacquired=block.conn_acquired_num,
                 )
             )
 
@@ -730,13 +745,19 @@ class Pool(BasePool[C]):
                 first_block = next(iter(self._blocks.values()))
                 first_block.quota = self._max_capacity
                 first_block.nwaiters_avg.add(first_block.count_waiters())
+                first_block.demand_forecast.add(
+                    first_block.count_waiters()
+                    + first_block.conn_acquired_num
+                )
+                self._maybe_preconnect(first_block)
             return
 
         # Go over all the blocks and calculate:
         #  - "nwaiters" - number of connection acquisitions
         #    (including pending and acquired, per block and total)
         #  - First round of per-block quota ( := nwaiters )
-        #  - Calibrated demand (per block and total)
+        #  - Calibrated demand (per block and total), anticipating the
+        #    demand forecast for the blocks whose demand is growing
         #  - If any block is starving / Mode D
         need_conns_at_least = 0
         total_nwaiters = 0
@@ -749,6 +770,7 @@ class Pool(BasePool[C]):
             total_nwaiters += nwaiters
             block.nwaiters_avg.add(nwaiters)
             nwaiters_avg = block.nwaiters_avg.avg()
+            block.demand_forecast.add(nwaiters)
             if nwaiters_avg:
                 # GOTCHA: this is a counter of blocks that need at least 1
                 # connection. If this number is greater than _max_capacity,
@@ -760,7 +782,11 @@ class Pool(BasePool[C]):
                     continue
 
             demand = (
-                max(nwaiters_avg, nwaiters) *
+                max(
+                    nwaiters_avg,
+                    nwaiters,
+                    block.demand_forecast.forecast(DEMAND_FORECAST_HORIZON),
+                ) *
                 max(block.querytime_avg.avg(), MIN_QUERY_TIME_THRESHOLD)
             )
             total_calibrated_demand += demand
@@ -795,8 +821,12 @@ class Pool(BasePool[C]):
                 # If we still have space for more connections (Mode B), don't
                 # actively rebalance the pool just yet - rebalance will kick in
                 # when the max capacity is hit; or we'll depend on the garbage
-                # collection to shrink the over-quota blocks.
-                pass
+                # collection to shrink the over-quota blocks.  We do
+                # connect ahead of the blocks whose demand is growing
+                # though, so that their new connections are ready when
+                # the demand comes.
+                for block in self._blocks.values():
+                    self._maybe_preconnect(block)
 
             return
 
@@ -871,6 +901,18 @@ class Pool(BasePool[C]):
 
             self._maybe_rebalance()
 
+    def _maybe_preconnect(self, block: Block[C]) -> None:
+        if block.demand_forecast.trend() <= 0:
+            return
+
+        expected = math.ceil(
+            block.demand_forecast.forecast(DEMAND_FORECAST_HORIZON))
+        while (
+            block.count_conns() < expected and
+            self._cur_capacity < self._max_capacity
+        ):
+            self._schedule_new_conn(block, 'pre-established')
+
     def _maybe_rebalance(self) -> None:
         if self._is_starving:
             return
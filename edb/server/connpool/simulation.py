@@ -0,0 +1,327 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2023-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Offline simulation of the connection pool.
+
+The pool is driven with fake connections under virtual time: the event
+loop jumps straight to its next timer instead of sleeping, so that
+minutes of traffic are simulated in seconds, and the results only
+depend on the trace and the random seed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import dataclasses
+import json
+import logging
+import math
+import random
+import selectors
+import types
+import typing
+
+from . import pool as pool_impl
+
+
+@dataclasses.dataclass(frozen=True)
+class Query:
+    # Time of the connection request, in seconds from the trace start.
+    at: float
+    dbname: str
+    # How long the connection is held.
+    duration: float
+
+
+@dataclasses.dataclass
+class Workload:
+    # Synthetic traffic of one database, see generate_trace().
+    dbname: str
+    qps: float
+    query_time: float
+    query_time_var: float = 0
+    start_at: float = 0
+    end_at: float = 10
+
+
+@dataclasses.dataclass
+class Backend:
+    # Costs of the fake backend connections, in seconds; the actual
+    # costs are spread over +/- the `_var` in a triangular distribution.
+    connect_time: float = 0.05
+    connect_time_var: float = 0.01
+    disconnect_time: float = 0.006
+    disconnect_time_var: float = 0.0015
+
+
+@dataclasses.dataclass
+class DatabaseReport:
+    dbname: str
+    queries: int
+    # Latencies of acquiring a connection, in seconds.
+    mean: float
+    p50: float
+    p99: float
+
+
+@dataclasses.dataclass
+class Report:
+    pool: str
+    # Virtual duration of the simulation, in seconds.
+    duration: float
+    queries: int
+    p50: float
+    p99: float
+    connects: int
+    disconnects: int
+    # Connects and disconnects per second.
+    churn: float
+    # Jain's fairness index of the mean acquire latencies of the
+    # databases: 1 when all of them wait as long, down to 1/n when one
+    # of the n databases does all the waiting.
+    fairness: float
+    databases: typing.List[DatabaseReport]
+
+    def asdict(self) -> typing.Dict[str, typing.Any]:
+        return dataclasses.asdict(self)
+
+
+def generate_trace(
+    workloads: typing.Iterable[Workload],
+    *,
+    seed: typing.Optional[int] = None,
+) -> typing.List[Query]:
+    """Generate the Poisson arrivals of the queries of *workloads*."""
+    rng = random.Random(seed)
+    trace = []
+    for wl in workloads:
+        if wl.qps <= 0:
+            continue
+        at = wl.start_at
+        while True:
+            at += rng.expovariate(wl.qps)
+            if at >= wl.end_at:
+                break
+            duration = wl.query_time + rng.triangular(
+                -wl.query_time_var, wl.query_time_var)
+            trace.append(Query(at, wl.dbname, max(duration, 0.001)))
+    trace.sort(key=lambda q: q.at)
+    return trace
+
+
+def load_trace(lines: typing.Iterable[str]) -> typing.List[Query]:
+    """Load a trace of JSON lines of ``{"at", "dbname", "duration"}``."""
+    trace = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            trace.append(Query(**json.loads(line)))
+    trace.sort(key=lambda q: q.at)
+    return trace
+
+
+def dump_trace(trace: typing.Iterable[Query], f: typing.TextIO) -> None:
+    for query in trace:
+        print(json.dumps(dataclasses.asdict(query)), file=f)
+
+
+class _VirtualSelector:
+    # Polls the wrapped selector without blocking, and advances the
+    # loop's clock by the timeout instead of waiting.
+
+    def __init__(self, loop: VirtualTimeLoop) -> None:
+        self._loop = loop
+        self._selector = selectors.DefaultSelector()
+
+    def select(self, timeout: typing.Optional[float] = None) -> typing.Any:
+        events = self._selector.select(0)
+        if not events:
+            if timeout is None:
+                # Nothing is scheduled, so nothing can ever happen.
+                raise RuntimeError('the pool simulation is stuck')
+            self._loop._now += timeout
+        return events
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self._selector, name)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+
+    _now: float
+
+    def __init__(self) -> None:
+        self._now = 0
+        super().__init__(_VirtualSelector(self))  # type: ignore
+
+    def time(self) -> float:
+        return self._now
+
+
+def _cancel_all_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    # The tasks the pool leaves behind, e.g. pending disconnects.
+    tasks = asyncio.all_tasks(loop)
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(
+        asyncio.gather(*tasks, return_exceptions=True))
+
+
+@contextlib.contextmanager
+def _virtual_pool_clock(
+    loop: VirtualTimeLoop,
+) -> typing.Iterator[None]:
+    # The pool measures time with time.monotonic() on its own.
+    orig_time = pool_impl.time
+    pool_impl.time = types.SimpleNamespace(  # type: ignore
+        monotonic=loop.time)
+    try:
+        yield
+    finally:
+        pool_impl.time = orig_time
+
+
+class _Connection:
+
+    __slots__ = ('dbname',)
+
+    def __init__(self, dbname: str) -> None:
+        self.dbname = dbname
+
+
+def _percentile(sorted_values: typing.Sequence[float], p: float) -> float:
+    if not sorted_values:
+        return 0
+    idx = math.ceil(len(sorted_values) * p / 100) - 1
+    return sorted_values[max(idx, 0)]
+
+
+def _jain_index(values: typing.Sequence[float]) -> float:
+    squares = sum(v * v for v in values)
+    if not squares:
+        return 1
+    return sum(values) ** 2 / (len(values) * squares)
+
+
+def simulate(
+    trace: typing.Sequence[Query],
+    *,
+    capacity: int,
+    backend: Backend = Backend(),
+    pool_cls: typing.Type[pool_impl.BasePool[typing.Any]] = pool_impl.Pool,
+    seed: typing.Optional[int] = None,
+    stats_collector: typing.Optional[pool_impl.StatsCollector] = None,
+) -> Report:
+    """Replay *trace* against a pool of *capacity* connections."""
+    rng = random.Random(seed)
+    latencies: typing.Dict[str, typing.List[float]] = (
+        collections.defaultdict(list))
+    counters = {'connects': 0, 'disconnects': 0}
+
+    async def connect(dbname: str) -> _Connection:
+        await asyncio.sleep(max(
+            backend.connect_time + rng.triangular(
+                -backend.connect_time_var, backend.connect_time_var),
+            0,
+        ))
+        counters['connects'] += 1
+        return _Connection(dbname)
+
+    async def disconnect(conn: _Connection) -> None:
+        await asyncio.sleep(max(
+            backend.disconnect_time + rng.triangular(
+                -backend.disconnect_time_var, backend.disconnect_time_var),
+            0,
+        ))
+        counters['disconnects'] += 1
+
+    async def run_query(pool: typing.Any, query: Query) -> None:
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        conn = await pool.acquire(query.dbname)
+        latencies[query.dbname].append(loop.time() - started_at)
+        if conn.dbname != query.dbname:
+            raise AssertionError(
+                f'got a connection to {conn.dbname!r} '
+                f'for {query.dbname!r}')
+        await asyncio.sleep(query.duration)
+        pool.release(query.dbname, conn)
+
+    async def run() -> float:
+        loop = asyncio.get_running_loop()
+        pool = pool_cls(
+            connect=connect,
+            disconnect=disconnect,
+            max_capacity=capacity,
+            stats_collector=stats_collector,
+        )
+        queries = []
+        for query in trace:
+            delay = query.at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            queries.append(loop.create_task(run_query(pool, query)))
+        await asyncio.gather(*queries)
+        return loop.time()
+
+    pool_logger = logging.getLogger('edb.server')
+    log_level = pool_logger.level
+    pool_logger.setLevel(logging.WARNING)
+    loop = VirtualTimeLoop()
+    asyncio.set_event_loop(loop)
+    try:
+        with _virtual_pool_clock(loop):
+            try:
+                duration = loop.run_until_complete(run())
+            finally:
+                _cancel_all_tasks(loop)
+                loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+        pool_logger.setLevel(log_level)
+
+    databases = []
+    all_latencies: typing.List[float] = []
+    for dbname, lats in sorted(latencies.items()):
+        lats.sort()
+        all_latencies.extend(lats)
+        databases.append(DatabaseReport(
+            dbname=dbname,
+            queries=len(lats),
+            mean=sum(lats) / len(lats),
+            p50=_percentile(lats, 50),
+            p99=_percentile(lats, 99),
+        ))
+    all_latencies.sort()
+
+    churn = counters['connects'] + counters['disconnects']
+    return Report(
+        pool=pool_cls.__name__,
+        duration=duration,
+        queries=len(all_latencies),
+        p50=_percentile(all_latencies, 50),
+        p99=_percentile(all_latencies, 99),
+        connects=counters['connects'],
+        disconnects=counters['disconnects'],
+        churn=churn / duration if duration else 0,
+        fairness=_jain_index([db.mean for db in databases]),
+        databases=databases,
+    )
@@ -68,6 +68,8 @@ cdef class DatabaseIndex:
         object _default_sysconfig
         object _sys_config_spec
         object _cached_compiler_args
+        object _persistent_cache
+        object _shared_cache
 
     cdef invalidate_caches(self)
 
@@ -77,6 +79,9 @@ cdef class Database:
     cdef:
         object _eql_to_compiled
         object _sql_to_compiled
+        object _persistent_cache_key
+        object _shared_cache_key
+        object _hot_statements
         DatabaseIndex _index
         object _views
         object _introspection_lock
@@ -87,6 +92,7 @@ cdef class Database:
         readonly object dbver
         readonly object db_config
         readonly bytes user_schema_pickle
+        readonly bytes user_schema_fingerprint
         readonly object reflection_cache
         readonly object backend_ids
         readonly object extensions
@@ -94,7 +100,15 @@ cdef class Database:
     cdef schedule_config_update(self)
 
     cdef _invalidate_caches(self)
+    cdef _get_persistent_cache_key(self)
+    cdef _invalidate_persistent_cache(self)
+    cdef _persist_compiled(self, kind, query_key, compiled)
+    cdef _get_shared_cache_key(self)
+    cdef _share_compiled(self, kind, query_key, compiled)
+    cdef _lookup_shared(self, kind, query_key)
     cdef _cache_compiled_query(self, key, query_unit)
+    cdef _lookup_compiled_query(self, key)
+    cdef _note_statement(self, bytes stmt_name, bytes sql)
     cdef _new_view(self, query_cache, protocol_version)
     cdef _remove_view(self, view)
     cdef _update_backend_ids(self, new_types)
@@ -106,6 +120,7 @@ cdef class Database:
         reflection_cache=?,
         backend_ids=?,
         db_config=?,
+        user_schema_fingerprint=?,
     )
     cdef get_state_serializer(self, protocol_version)
     cpdef set_state_serializer(self, protocol_version, serializer)
@@ -189,6 +204,7 @@ cdef class DatabaseConnectionView:
     cdef commit_implicit_tx(
         self,
         user_schema,
+        user_schema_fingerprint,
         extensions,
         ext_config_settings,
         global_schema,
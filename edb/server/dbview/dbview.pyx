@@ -38,6 +38,7 @@ from edb import edgeql
 from edb.edgeql import qltypes
 from edb.schema import schema as s_schema
 from edb.server import compiler, defines, config, metrics
+from edb.server.cache import persistent as persistent_cache
 from edb.server.compiler import dbstate, enums, sertypes
 from edb.pgsql import dbops
 from edb.server.compiler_pool import state as compiler_state_mod
@@ -115,6 +116,20 @@ cdef class QueryRequestInfo:
     def __hash__(self):
         return self.cached_hash
 
+    def persistent_cache_key(self):
+        # Unlike the hash, this is stable across server restarts.
+        return (
+            self.source.cache_key(),
+            self.protocol_version,
+            self.output_format,
+            self.input_format,
+            self.expect_one,
+            self.implicit_limit,
+            self.inline_typeids,
+            self.inline_typenames,
+            self.inline_objectids,
+        )
+
     def __eq__(self, other: QueryRequestInfo) -> bool:
         return (
             self.source.cache_key() == other.source.cache_key() and
@@ -156,6 +171,7 @@ cdef class Database:
         str name,
         *,
         bytes user_schema_pickle,
+        bytes user_schema_fingerprint,
         object db_config,
         object reflection_cache,
         object backend_ids,
@@ -172,13 +188,29 @@ cdef class Database:
 
         self._introspection_lock = asyncio.Lock()
 
-        self._eql_to_compiled = lru.LRUMapping(
-            maxsize=defines._MAX_QUERIES_CACHE)
-        self._sql_to_compiled = lru.LRUMapping(
-            maxsize=defines._MAX_QUERIES_CACHE)
+        tenant_label = (
+            'system' if index._tenant is None
+            else index._tenant.get_instance_name()
+        )
+        self._eql_to_compiled = lru.TinyLFUMapping(
+            maxsize=defines._MAX_QUERIES_CACHE,
+            stats=metrics.QueryCacheStats('edgeql', tenant_label),
+        )
+        self._sql_to_compiled = lru.TinyLFUMapping(
+            maxsize=defines._MAX_QUERIES_CACHE,
+            stats=metrics.QueryCacheStats('sql', tenant_label),
+        )
+        self._persistent_cache_key = DICTDEFAULT
+        self._shared_cache_key = DICTDEFAULT
+        # The backend statements executed the most in this database,
+        # which new backend connections prepare in advance.
+        self._hot_statements = lru.TinyLFUMapping(
+            maxsize=defines._MAX_HOT_STATEMENTS,
+        )
 
         self.db_config = db_config
         self.user_schema_pickle = user_schema_pickle
+        self.user_schema_fingerprint = user_schema_fingerprint
         if ext_config_settings is not None:
             self.user_config_spec = config.FlatSpec(*ext_config_settings)
         self.reflection_cache = reflection_cache
@@ -204,6 +236,7 @@ cdef class Database:
         reflection_cache=None,
         backend_ids=None,
         db_config=None,
+        user_schema_fingerprint=None,
     ):
         if new_schema_pickle is None:
             raise AssertionError('new_schema is not supposed to be None')
@@ -211,6 +244,7 @@ cdef class Database:
         self.dbver = next_dbver()
 
         self.user_schema_pickle = new_schema_pickle
+        self.user_schema_fingerprint = user_schema_fingerprint
         self.extensions = extensions
         self.user_config_spec = config.FlatSpec(*ext_config_settings)
 
@@ -221,15 +255,126 @@ cdef class Database:
         if db_config is not None:
             self.db_config = db_config
         self._invalidate_caches()
+        self._invalidate_persistent_cache()
 
     cdef _update_backend_ids(self, new_types):
         self.backend_ids.update(new_types)
 
+    cdef _note_statement(self, bytes stmt_name, bytes sql):
+        # The lookup records the use of the statement, so that the
+        # most used ones are kept.
+        if self._hot_statements.get(stmt_name) is None:
+            self._hot_statements[stmt_name] = sql
+
+    def get_hot_statements(self):
+        """Return the (name, SQL) of the most used backend statements.
+
+        The statements are valid for the current dbver, the most used
+        ones (by their recent lookups) come first.
+        """
+        hot = self._hot_statements
+        return sorted(
+            hot.items(),
+            key=lambda item: hot.frequency(item[0]),
+            reverse=True,
+        )
+
     cdef _invalidate_caches(self):
         self._eql_to_compiled.clear()
         self._sql_to_compiled.clear()
+        self._hot_statements.clear()
         self._index.invalidate_caches()
 
+    cdef _get_persistent_cache_key(self):
+        # The key of the persistent cache entries compiled against the
+        # current schema and config, recomputed whenever dbver is bumped.
+        cdef DatabaseIndex index = self._index
+
+        if index._persistent_cache is None or self.user_schema_pickle is None:
+            return None
+
+        key_dbver, key = self._persistent_cache_key
+        if key_dbver != self.dbver:
+            key = index._persistent_cache.make_schema_key(
+                self.user_schema_pickle,
+                index._global_schema_pickle,
+                self.db_config,
+                index._comp_sys_config,
+                self.backend_ids,
+            )
+            self._persistent_cache_key = (self.dbver, key)
+        return key
+
+    cdef _invalidate_persistent_cache(self):
+        cdef DatabaseIndex index = self._index
+
+        if index._persistent_cache is None:
+            return
+        schema_key = self._get_persistent_cache_key()
+        if schema_key is not None:
+            index._persistent_cache.invalidate(
+                self.name, keep_schema_key=schema_key)
+
+    cdef _persist_compiled(self, kind, query_key, compiled):
+        cdef DatabaseIndex index = self._index
+
+        schema_key = self._get_persistent_cache_key()
+        if schema_key is None:
+            return
+        query_key = persistent_cache.make_key(kind, query_key)
+        if query_key is not None:
+            index._persistent_cache.set(
+                self.name, schema_key, query_key, compiled)
+
+    async def _lookup_persisted(self, kind, query_key):
+        cdef DatabaseIndex index = self._index
+
+        if index._persistent_cache is None:
+            return None
+        schema_key = self._get_persistent_cache_key()
+        if schema_key is None:
+            return None
+        query_key = persistent_cache.make_key(kind, query_key)
+        if query_key is None:
+            return None
+        return await index._persistent_cache.get(
+            self.name, schema_key, query_key)
+
+    cdef _get_shared_cache_key(self):
+        # Queries compiled against the same user schema and config
+        # are shared with the databases of the other tenants.  Compiled
+        # queries refer to schema objects by id, and so does the
+        # fingerprint: only databases whose schema objects have the same
+        # ids share, e.g. ones restored from the same dump, not ones that
+        # ran the same migrations separately.  Like the persistent cache
+        # key, this is recomputed with dbver.
+        cdef DatabaseIndex index = self._index
+
+        if index._shared_cache is None or self.user_schema_fingerprint is None:
+            return None
+
+        key_dbver, key = self._shared_cache_key
+        if key_dbver != self.dbver:
+            key = persistent_cache.make_key(
+                self.user_schema_fingerprint,
+                self.db_config,
+                index._comp_sys_config,
+            )
+            self._shared_cache_key = (self.dbver, key)
+        return key
+
+    cdef _share_compiled(self, kind, query_key, compiled):
+        schema_key = self._get_shared_cache_key()
+        if schema_key is not None:
+            self._index._shared_cache[(schema_key, kind, query_key)] = (
+                compiled)
+
+    cdef _lookup_shared(self, kind, query_key):
+        schema_key = self._get_shared_cache_key()
+        if schema_key is None:
+            return None
+        return self._index._shared_cache.get((schema_key, kind, query_key))
+
     cdef _cache_compiled_query(self, key, compiled: dbstate.QueryUnitGroup):
         assert compiled.cacheable
 
@@ -239,6 +384,44 @@ cdef class Database:
             return
 
         self._eql_to_compiled[key] = compiled, self.dbver
+        self._share_compiled('edgeql', key, compiled)
+
+        query_req, modaliases, session_config = key
+        self._persist_compiled(
+            'edgeql',
+            (query_req.persistent_cache_key(), modaliases, session_config),
+            compiled,
+        )
+
+    cdef _lookup_compiled_query(self, key):
+        query_unit_group, qu_dbver = self._eql_to_compiled.get(
+            key, DICTDEFAULT)
+        if query_unit_group is not None and qu_dbver == self.dbver:
+            return query_unit_group
+
+        query_unit_group = self._lookup_shared('edgeql', key)
+        if query_unit_group is None:
+            return None
+
+        self._eql_to_compiled[key] = query_unit_group, self.dbver
+        return query_unit_group
+
+    async def _lookup_persisted_query(self, key):
+        # The persistent cache is only read on a miss of the in-memory
+        # caches, as a coroutine since the store is read by its I/O
+        # thread.
+        dbver = self.dbver
+        query_req, modaliases, session_config = key
+        query_unit_group = await self._lookup_persisted(
+            'edgeql',
+            (query_req.persistent_cache_key(), modaliases, session_config),
+        )
+        if query_unit_group is None or dbver != self.dbver:
+            return None
+
+        self._eql_to_compiled[key] = query_unit_group, self.dbver
+        self._share_compiled('edgeql', key, query_unit_group)
+        return query_unit_group
 
     def cache_compiled_sql(self, key, compiled: list[str]):
         existing, dbver = self._sql_to_compiled.get(key, DICTDEFAULT)
@@ -247,11 +430,31 @@ cdef class Database:
             return
 
         self._sql_to_compiled[key] = compiled, self.dbver
+        self._share_compiled('sql', key, compiled)
+        self._persist_compiled('sql', key, compiled)
 
     def lookup_compiled_sql(self, key):
         rv, cached_dbver = self._sql_to_compiled.get(key, DICTDEFAULT)
-        if rv is not None and cached_dbver != self.dbver:
-            rv = None
+        if rv is not None and cached_dbver == self.dbver:
+            return rv
+
+        rv = self._lookup_shared('sql', key)
+        if rv is None:
+            return None
+
+        self._sql_to_compiled[key] = rv, self.dbver
+        return rv
+
+    async def lookup_persisted_sql(self, key):
+        # Like _lookup_persisted_query(), for a miss of
+        # lookup_compiled_sql().
+        dbver = self.dbver
+        rv = await self._lookup_persisted('sql', key)
+        if rv is None or dbver != self.dbver:
+            return None
+
+        self._sql_to_compiled[key] = rv, self.dbver
+        self._share_compiled('sql', key, rv)
         return rv
 
     cdef _new_view(self, query_cache, protocol_version):
@@ -747,13 +950,20 @@ cdef class DatabaseConnectionView:
         if self._in_tx_with_ddl:
             query_unit_group = self._eql_to_compiled.get(key)
         else:
-            query_unit_group, qu_dbver = self._db._eql_to_compiled.get(
-                key, DICTDEFAULT)
-            if query_unit_group is not None and qu_dbver != self._db.dbver:
-                query_unit_group = None
+            query_unit_group = self._db._lookup_compiled_query(key)
 
         return query_unit_group
 
+    async def lookup_persisted_query(self, object key):
+        if (self._tx_error or
+                not self._query_cache_enabled or
+                self._in_tx_with_ddl or
+                self._db._index._persistent_cache is None):
+            return None
+
+        key = (key, self.get_modaliases(), self.get_session_config())
+        return await self._db._lookup_persisted_query(key)
+
     cdef tx_error(self):
         if self._in_tx:
             self._tx_error = True
@@ -817,6 +1027,11 @@ cdef class DatabaseConnectionView:
     cdef on_success(self, query_unit, new_types):
         side_effects = 0
 
+        if query_unit.sql_hash and self.dbver == self._db.dbver:
+            # Statements prepared against a schema that is only
+            # visible in this transaction are left out.
+            self._db._note_statement(query_unit.sql_hash, query_unit.sql[0])
+
         if query_unit.tx_savepoint_rollback:
             # Need to invalidate the cache in case there were
             # SET ALIAS or CONFIGURE or DDL commands.
@@ -833,7 +1048,10 @@ cdef class DatabaseConnectionView:
                     query_unit.ext_config_settings,
                     pickle.loads(query_unit.cached_reflection)
                         if query_unit.cached_reflection is not None
-                        else None
+                        else None,
+                    None,
+                    None,
+                    query_unit.user_schema_fingerprint,
                 )
                 side_effects |= SideEffects.SchemaChanges
             if query_unit.system_config:
@@ -875,7 +1093,10 @@ cdef class DatabaseConnectionView:
                     query_unit.ext_config_settings,
                     pickle.loads(query_unit.cached_reflection)
                         if query_unit.cached_reflection is not None
-                        else None
+                        else None,
+                    None,
+                    None,
+                    query_unit.user_schema_fingerprint,
                 )
                 side_effects |= SideEffects.SchemaChanges
             if self._in_tx_with_sysconfig:
@@ -905,6 +1126,7 @@ cdef class DatabaseConnectionView:
     cdef commit_implicit_tx(
         self,
         user_schema,
+        user_schema_fingerprint,
         extensions,
         ext_config_settings,
         global_schema,
@@ -927,7 +1149,10 @@ cdef class DatabaseConnectionView:
                 ext_config_settings,
                 pickle.loads(cached_reflection)
                     if cached_reflection is not None
-                    else None
+                    else None,
+                None,
+                None,
+                user_schema_fingerprint,
             )
             side_effects |= SideEffects.SchemaChanges
         if self._in_tx_with_sysconfig:
@@ -992,6 +1217,9 @@ cdef class DatabaseConnectionView:
             )
         else:
             query_unit_group = self.lookup_compiled_query(query_req)
+            if query_unit_group is None:
+                query_unit_group = await self.lookup_persisted_query(
+                    query_req)
         cached = True
         if query_unit_group is None:
             # Cache miss; need to compile this query.
@@ -1168,6 +1396,8 @@ cdef class DatabaseIndex:
         sys_config,
         default_sysconfig,  # system config without system override
         sys_config_spec,
+        persistent_cache=None,
+        shared_cache=None,
     ):
         self._dbs = {}
         self._server = tenant.server
@@ -1176,6 +1406,8 @@ cdef class DatabaseIndex:
         self._global_schema_pickle = global_schema_pickle
         self._default_sysconfig = default_sysconfig
         self._sys_config_spec = sys_config_spec
+        self._persistent_cache = persistent_cache
+        self._shared_cache = shared_cache
         self.update_sys_config(sys_config)
         self._cached_compiler_args = None
 
@@ -1236,6 +1468,7 @@ cdef class DatabaseIndex:
         backend_ids,
         extensions,
         ext_config_settings,
+        user_schema_fingerprint=None,
     ):
         cdef Database db
         db = self._dbs.get(dbname)
@@ -1247,12 +1480,14 @@ cdef class DatabaseIndex:
                 reflection_cache,
                 backend_ids,
                 db_config,
+                user_schema_fingerprint,
             )
         else:
             db = Database(
                 self,
                 dbname,
                 user_schema_pickle=user_schema_pickle,
+                user_schema_fingerprint=user_schema_fingerprint,
                 db_config=db_config,
                 reflection_cache=reflection_cache,
                 backend_ids=backend_ids,
@@ -1264,6 +1499,8 @@ cdef class DatabaseIndex:
 
     def unregister_db(self, dbname):
         self._dbs.pop(dbname)
+        if self._persistent_cache is not None:
+            self._persistent_cache.invalidate(dbname)
 
     def iter_dbs(self):
         return iter(self._dbs.values())
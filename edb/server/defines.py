@@ -53,6 +53,12 @@ BACKEND_COMPILER_POOL_SIZE_MIN = 1
 BACKEND_COMPILER_TEMPLATE_PROC_RESTART_INTERVAL = 1
 
 _MAX_QUERIES_CACHE = 1000
+# The compiled queries shared between the tenants of a multi-tenant
+# server, keyed by schema fingerprint.
+_MAX_SHARED_QUERIES_CACHE = _MAX_QUERIES_CACHE * 10
+# The number of the most used backend statements of each database that
+# new backend connections prepare before being used.
+_MAX_HOT_STATEMENTS = 50
 
 _QUERY_ROLLING_AVG_LEN = 10
 _QUERIES_ROLLING_AVG_LEN = 300
@@ -70,6 +76,9 @@ MAX_RUNSTATE_DIR_PATH = 104 - MAX_UNIX_SOCKET_PATH_LENGTH - 1
 
 HTTP_PORT_QUERY_CACHE_SIZE = 1000
 
+# The number of persisted GraphQL queries remembered by the server.
+GRAPHQL_PERSISTED_QUERIES_SIZE = 1000
+
 # The time in seconds the EdgeDB server shall wait between retries to connect
 # to the system database after the connection was broken during runtime.
 SYSTEM_DB_RECONNECT_INTERVAL = 1
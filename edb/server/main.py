@@ -236,6 +236,7 @@ async def _run_server(
             new_instance=new_instance,
             admin_ui=args.admin_ui,
             disable_dynamic_system_config=args.disable_dynamic_system_config,
+            persistent_query_cache_dir=args.persistent_query_cache_dir,
             compiler_state=compiler_state,
             tenant=tenant,
         )
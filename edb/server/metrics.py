@@ -17,6 +17,7 @@
 #
 
 
+from edb.common import lru
 from edb.common import prometheus as prom
 
 
@@ -63,6 +64,13 @@ backend_connection_aborted = registry.new_labeled_counter(
     labels=('tenant', 'pgcode')
 )
 
+backend_prepared_statements_warmed_up = registry.new_labeled_counter(
+    'backend_prepared_statements_warmed_up_total',
+    'Number of statements prepared on new backend connections '
+    'before their first use.',
+    labels=('tenant',),
+)
+
 backend_query_duration = registry.new_labeled_histogram(
     'backend_query_duration',
     'Time it takes to run a query on a backend connection.',
@@ -101,6 +109,31 @@ edgeql_query_compilation_duration = registry.new_labeled_histogram(
     labels=('tenant',),
 )
 
+pipelined_queries = registry.new_labeled_counter(
+    'edgeql_pipelined_queries_total',
+    'Number of queries sent to the backend along with the queries of '
+    'the following Execute messages.',
+    labels=('tenant',),
+)
+
+query_cache_hits = registry.new_labeled_counter(
+    'query_cache_hits_total',
+    'Number of lookups that found an entry in a query cache.',
+    labels=('tenant', 'cache'),
+)
+
+query_cache_misses = registry.new_labeled_counter(
+    'query_cache_misses_total',
+    'Number of lookups that did not find an entry in a query cache.',
+    labels=('tenant', 'cache'),
+)
+
+query_cache_evictions = registry.new_labeled_counter(
+    'query_cache_evictions_total',
+    'Number of entries evicted from, or not admitted to, a query cache.',
+    labels=('tenant', 'cache'),
+)
+
 background_errors = registry.new_labeled_counter(
     'background_errors_total',
     'Number of unhandled errors in background server routines.',
@@ -112,3 +145,23 @@ ha_events_total = registry.new_labeled_counter(
     "Number of each high-availability watch event.",
     labels=("dsn", "event"),
 )
+
+
+class QueryCacheStats(lru.CacheStats):
+    """Also reports the counts of a cache to the query_cache metrics."""
+
+    def __init__(self, cache: str, tenant: str = 'system'):
+        super().__init__()
+        self._labels = (tenant, cache)
+
+    def hit(self):
+        super().hit()
+        query_cache_hits.inc(1.0, *self._labels)
+
+    def miss(self):
+        super().miss()
+        query_cache_misses.inc(1.0, *self._labels)
+
+    def evict(self):
+        super().evict()
+        query_cache_evictions.inc(1.0, *self._labels)
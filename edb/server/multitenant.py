@@ -33,6 +33,7 @@ import setproctitle
 
 from edb import buildmeta
 from edb import errors
+from edb.common import lru
 from edb.common import retryloop
 from edb.common import signalctl
 from edb.common import taskgroup
@@ -42,6 +43,7 @@ from edb.server import compiler as edbcompiler
 from . import args as srvargs
 from . import config
 from . import defines
+from . import metrics
 from . import pgcluster
 from . import server
 from . import tenant as edbtenant
@@ -82,6 +84,8 @@ class MultiTenantServer(server.BaseServer):
     _task_group: taskgroup.TaskGroup | None
     _task_serial: int
 
+    _shared_compile_cache: lru.TinyLFUMapping
+
     def __init__(
         self,
         config_file: pathlib.Path,
@@ -109,6 +113,16 @@ class MultiTenantServer(server.BaseServer):
         self._task_group = taskgroup.TaskGroup()
         self._task_serial = 0
         self._sys_queries = sys_queries
+
+        # Tenants often run the same application, so queries are
+        # compiled once per schema across the tenants rather than once
+        # per database.  Entries are keyed by a fingerprint of the
+        # schema, which only matches for schema objects with the same
+        # ids, see dbview.Database._get_shared_cache_key().
+        self._shared_compile_cache = lru.TinyLFUMapping(
+            maxsize=defines._MAX_SHARED_QUERIES_CACHE,
+            stats=metrics.QueryCacheStats('shared'),
+        )
         self._report_config_typedesc = report_config_typedesc
 
     def _get_sys_config(self) -> Mapping[str, config.SettingValue]:
@@ -333,6 +347,9 @@ class MultiTenantServer(server.BaseServer):
         }
         return parent
 
+    def get_shared_compile_cache(self) -> lru.TinyLFUMapping:
+        return self._shared_compile_cache
+
     def _get_compiler_args(self) -> dict[str, Any]:
         args = super()._get_compiler_args()
         args["cache_size"] = self._compiler_pool_tenant_cache_size
@@ -375,6 +392,7 @@ async def run_server(
             testmode=args.testmode,
             admin_ui=args.admin_ui,
             disable_dynamic_system_config=args.disable_dynamic_system_config,
+            persistent_query_cache_dir=args.persistent_query_cache_dir,
             compiler_pool_size=args.compiler_pool_size,
             compiler_pool_mode=srvargs.CompilerPoolMode.MultiTenant,
             compiler_pool_addr=args.compiler_pool_addr,
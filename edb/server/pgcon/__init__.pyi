@@ -23,6 +23,7 @@ from typing import (
     Any,
     Callable,
     Dict,
+    Iterable,
     Optional,
 )
 
@@ -114,12 +115,25 @@ class PGConnection:
     def set_stmt_cache_size(self, size: int) -> None:
         ...
 
+    async def prepare_statements(
+        self,
+        statements: Iterable[tuple[bytes, bytes]],
+        dbver: int,
+    ) -> int:
+        ...
+
     def set_server(self, server: object) -> None:
         ...
 
     async def signal_sysevent(self, event: str, *, dbname: str) -> None:
         ...
 
+    def pause_reading(self) -> None:
+        ...
+
+    def resume_reading(self) -> None:
+        ...
+
     def abort(self) -> None:
         ...
 
@@ -163,6 +163,11 @@ cdef class PGConnection:
         object bind_datas, bytes state,
         ssize_t start, ssize_t end, int dbver, object parse_array
     )
+    cdef send_query_units(
+        self, object query_units, bint sync,
+        object bind_datas, bytes state,
+        int dbver, object parse_array, ssize_t idx
+    )
 
     cdef _rewrite_copy_data(
         self,
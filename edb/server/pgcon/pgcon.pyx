@@ -549,7 +549,10 @@ cdef class PGConnection:
         self.transport = None
         self.msg_waiter = None
 
-        self.prep_stmts = stmt_cache.StatementsCache(maxsize=PREP_STMTS_CACHE)
+        self.prep_stmts = stmt_cache.StatementsCache(
+            maxsize=PREP_STMTS_CACHE,
+            stats=metrics.QueryCacheStats('pg_prepared_statements'),
+        )
 
         self.connected_fut = loop.create_future()
         self.connected = False
@@ -628,6 +631,16 @@ cdef class PGConnection:
     def get_server_parameter_status(self, parameter: str) -> Optional[str]:
         return self.parameter_status.get(parameter)
 
+    def pause_reading(self):
+        # Lets the frontend apply backpressure on the results of the
+        # current command; the backend blocks once its socket is full.
+        if self.transport is not None:
+            self.transport.pause_reading()
+
+    def resume_reading(self):
+        if self.transport is not None:
+            self.transport.resume_reading()
+
     def abort(self):
         if not self.transport:
             return
@@ -657,6 +670,8 @@ cdef class PGConnection:
     def set_tenant(self, tenant):
         self.tenant = tenant
         self.server = tenant.server
+        self.prep_stmts.stats = metrics.QueryCacheStats(
+            'pg_prepared_statements', tenant.get_instance_name())
 
     def mark_as_system_db(self):
         if self.tenant.get_backend_runtime_params().has_create_database:
@@ -762,8 +777,10 @@ cdef class PGConnection:
             outbuf.write_buffer(
                 self.make_clean_stmt_message(stmt_name_to_clean))
 
-        if stmt_name in self.prep_stmts:
-            if self.prep_stmts[stmt_name] == dbver:
+        # A single lookup, so that misses are counted as well.
+        cached_dbver = self.prep_stmts.get(stmt_name, None)
+        if cached_dbver is not None:
+            if cached_dbver == dbver:
                 parse = 0
             else:
                 if self.debug:
@@ -912,21 +929,38 @@ cdef class PGConnection:
     ):
         # parse_array is an array of booleans for output with the same size as
         # the query_unit_group, indicating if each unit is freshly parsed
+        self.send_query_units(
+            query_unit_group.units[start:end],
+            sync,
+            bind_datas,
+            state if start == 0 else None,
+            dbver,
+            parse_array,
+            start,
+        )
+
+    cdef send_query_units(
+        self, object query_units, bint sync,
+        object bind_datas, bytes state,
+        int dbver, object parse_array, ssize_t idx
+    ):
+        # Sends the units in a single write, followed by a SYNC or a FLUSH;
+        # parse_array[idx:] is set for the units that are freshly parsed.
+        # The responses are read with wait_for_state_resp() and
+        # wait_for_command().
         cdef:
             WriteBuffer out
             WriteBuffer buf
             WriteBuffer bind_data
             bytes stmt_name
-            ssize_t idx = start
 
         out = WriteBuffer.new()
         parsed = set()
 
-        if state is not None and start == 0:
+        if state is not None:
             self._build_apply_state_req(state, out)
 
-        for query_unit, bind_data in zip(
-                query_unit_group.units[start:end], bind_datas):
+        for query_unit, bind_data in zip(query_units, bind_datas):
             if query_unit.system_config:
                 raise RuntimeError(
                     "CONFIGURE INSTANCE command is not allowed in scripts"
@@ -1605,6 +1639,77 @@ cdef class PGConnection:
         finally:
             await self.after_command()
 
+    async def prepare_statements(self, object statements, int dbver):
+        # Prepares the given (name, SQL) statements in a single round
+        # trip, so that the queries using them can bind them right away.
+        # Returns the number of statements prepared; if one of them
+        # fails to prepare, the following ones are not prepared either
+        # and the error is raised.
+        cdef:
+            WriteBuffer out
+            WriteBuffer buf
+            bytes stmt_name
+
+        self.before_command()
+        try:
+            out = WriteBuffer.new()
+            names = []
+            for stmt_name, sql in statements:
+                if stmt_name in names or not self.before_prepare(
+                    stmt_name, dbver, out
+                ):
+                    continue
+                buf = WriteBuffer.new_message(b'P')
+                buf.write_bytestring(stmt_name)
+                buf.write_bytestring(sql)
+                buf.write_int16(0)
+                out.write_buffer(buf.end_message())
+                names.append(stmt_name)
+
+            if not out.len():
+                return 0
+            self.write_sync(out)
+            self.write(out)
+
+            prepared = 0
+            error = None
+            while True:
+                if not self.buffer.take_message():
+                    await self.wait_for_message()
+                mtype = self.buffer.get_message_type()
+
+                try:
+                    if mtype == b'1':
+                        # ParseComplete
+                        self.buffer.discard_message()
+                        self.prep_stmts[names[prepared]] = dbver
+                        prepared += 1
+
+                    elif mtype == b'3':
+                        # CloseComplete
+                        self.buffer.discard_message()
+
+                    elif mtype == b'E':
+                        # ErrorResponse
+                        er_cls, er_fields = self.parse_error_message()
+                        error = er_cls(fields=er_fields)
+
+                    elif mtype == b'Z':
+                        self.parse_sync_message()
+                        break
+
+                    else:
+                        self.fallthrough()
+
+                finally:
+                    self.buffer.finish_message()
+
+            if error is not None:
+                raise error
+            return prepared
+        finally:
+            await self.after_command()
+
     async def sql_extended_query(
         self,
         actions: list[PGMessage],
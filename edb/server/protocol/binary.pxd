@@ -78,6 +78,13 @@ cdef class EdgeConnection(frontend.FrontendConnection):
     cdef inline dbview.DatabaseConnectionView get_dbview(self)
 
     cdef dbview.QueryRequestInfo parse_execute_request(self)
+    cdef bint _can_pipeline(self, dbview.CompiledQuery compiled)
+    cdef _make_pipelined(
+        self,
+        dbview.CompiledQuery compiled,
+        bytes args,
+        WriteBuffer prologue,
+    )
     cdef parse_output_format(self, bytes mode)
     cdef parse_cardinality(self, bytes card)
     cdef char render_cardinality(self, query_unit) except -1
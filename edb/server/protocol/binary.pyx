@@ -66,6 +66,7 @@ from edb.server.compiler import errormech
 from edb.server.compiler import enums
 from edb.server.compiler import sertypes
 
+from edb.server.protocol cimport args_ser
 from edb.server.protocol cimport auth_helpers
 from edb.server.protocol import execute
 from edb.server.protocol cimport frontend
@@ -75,6 +76,8 @@ from edb.server import metrics
 
 from edb.schema import objects as s_obj
 
+from edb.pgsql import common as pg_common
+
 from edb import errors
 from edb.errors import base as base_errors, EdgeQLSyntaxError
 from edb.common import debug, taskgroup
@@ -112,7 +115,14 @@ DEF QUERY_HEADER_IMPLICIT_TYPEIDS = 0xFF03
 DEF QUERY_HEADER_ALLOW_CAPABILITIES = 0xFF04
 DEF QUERY_HEADER_EXPLICIT_OBJECTIDS = 0xFF05
 
+# Headers of the Dump message, see docs/reference/protocol/messages.rst.
+# DUMP_SECRETS is b'\x01' to include the secrets.  DUMP_JOBS is the
+# number of backend connections reading the data (an int16, capped at
+# DUMP_MAX_JOBS): blocks of different objects may then interleave, but
+# the fragments of each block are always sent in DUMP_HEADER_BLOCK_NUM
+# order.
 DEF QUERY_HEADER_DUMP_SECRETS = 0xFF10
+DEF QUERY_HEADER_DUMP_JOBS = 0xFF11
 
 DEF SERVER_HEADER_CAPABILITIES = 0x1001
 
@@ -128,6 +138,19 @@ def parse_capabilities_header(value: bytes) -> uint64_t:
     return mask
 
 
+def parse_dump_jobs_header(value: bytes) -> int:
+    if len(value) != 2:
+        raise errors.BinaryProtocolError(
+            f'dump jobs header must be exactly 2 bytes (got {len(value)})'
+        )
+    cdef int16_t jobs = hton.unpack_int16(cpython.PyBytes_AS_STRING(value))
+    if jobs < 1:
+        raise errors.BinaryProtocolError(
+            f'dump jobs header must be a positive number (got {jobs})'
+        )
+    return min(jobs, DUMP_MAX_JOBS)
+
+
 def parse_catalog_version_header(value: bytes) -> uint64_t:
     if len(value) != 8:
         raise errors.BinaryProtocolError(
@@ -817,6 +840,21 @@ cdef class EdgeConnection(frontend.FrontendConnection):
         self.flush()
 
     async def execute(self):
+        compiled, args, prologue = await self._read_execute()
+        if (
+            self._can_pipeline(compiled)
+            and self.buffer.take_message_type(b'O')
+        ):
+            await self._execute_pipelined(compiled, args, prologue)
+        else:
+            await self._execute_compiled(compiled, args, prologue)
+        self.flush()
+
+    async def _read_execute(self):
+        # Reads an Execute message and looks up or compiles its query.
+        # Returns the compiled query, the arguments and the command data
+        # description to send before the results when the client's one
+        # is outdated.
         cdef:
             dbview.QueryRequestInfo query_req
             dbview.DatabaseConnectionView _dbview
@@ -884,14 +922,32 @@ cdef class EdgeConnection(frontend.FrontendConnection):
                 "types inferred from specified command(s)"
             )
 
+        prologue = None
         if query_unit_group.out_type_id != out_tid:
             # The client has no up-to-date information about the output,
             # so provide one.
-            self.write(self.make_command_data_description_msg(compiled))
+            prologue = self.make_command_data_description_msg(compiled)
 
         if self.debug:
             self.debug_print('EXECUTE', query_req.source.text())
 
+        return compiled, args, prologue
+
+    async def _execute_compiled(
+        self,
+        dbview.CompiledQuery compiled,
+        bytes args,
+        WriteBuffer prologue,
+    ):
+        cdef:
+            dbview.DatabaseConnectionView _dbview
+
+        _dbview = self.get_dbview()
+        query_unit_group = compiled.query_unit_group
+
+        if prologue is not None:
+            self.write(prologue)
+
         force_script = any(x.needs_readback for x in query_unit_group)
         if (
             _dbview.in_tx_error()
@@ -920,7 +976,146 @@ cdef class EdgeConnection(frontend.FrontendConnection):
                 compiled.query_unit_group[-1].status,
             )
         )
-        self.flush()
+
+    cdef bint _can_pipeline(self, dbview.CompiledQuery compiled):
+        # Pipelined queries are sent to the backend with a single SYNC,
+        # which makes them share one implicit transaction, so that an
+        # error in one of them rolls back the ones before it.  That is
+        # only the same as executing them one by one if they are
+        # read-only or run in an explicit transaction anyway, and if
+        # none of them changes the session state.
+        cdef:
+            dbview.DatabaseConnectionView _dbview
+
+        _dbview = self.get_dbview()
+        query_unit_group = compiled.query_unit_group
+        if len(query_unit_group) != 1 or _dbview.in_tx_error():
+            return False
+
+        query_unit = query_unit_group[0]
+        if (
+            not query_unit.sql
+            or query_unit.needs_readback
+            or query_unit.is_explain
+        ):
+            return False
+
+        if _dbview.in_tx():
+            allowed = enums.Capability.MODIFICATIONS
+        else:
+            allowed = 0
+        return not (query_unit_group.capabilities & ~allowed)
+
+    cdef _make_pipelined(
+        self,
+        dbview.CompiledQuery compiled,
+        bytes args,
+        WriteBuffer prologue,
+    ):
+        # The arguments (which include the globals) and the command
+        # complete message depend on the session state of the Execute
+        # message, so they are prepared before the next message replaces
+        # that state.
+        cdef:
+            dbview.DatabaseConnectionView _dbview
+            WriteBuffer epilogue
+
+        _dbview = self.get_dbview()
+        query_unit_group = compiled.query_unit_group
+
+        epilogue = WriteBuffer.new()
+        if _dbview.is_state_desc_changed():
+            epilogue.write_buffer(self.make_state_data_description_msg())
+        epilogue.write_buffer(
+            self.make_command_complete_msg(
+                query_unit_group.capabilities,
+                query_unit_group[-1].status,
+            )
+        )
+
+        return (
+            query_unit_group[0],
+            args_ser.recode_bind_args(_dbview, compiled, args),
+            prologue,
+            epilogue,
+        )
+
+    async def _execute_pipelined(
+        self,
+        dbview.CompiledQuery compiled,
+        bytes args,
+        WriteBuffer prologue,
+    ):
+        # Executes the query along with the queries of the Execute
+        # messages the client has already sent after it, as long as they
+        # can be pipelined, in a single round trip to the backend.
+        cdef:
+            dbview.DatabaseConnectionView _dbview
+            pgcon.PGConnection conn
+            WriteBuffer held
+            WriteBuffer error_output = None
+
+        _dbview = self.get_dbview()
+        # All of the pipelined queries run with this session state.
+        state = None if _dbview.in_tx() else _dbview.serialize_state()
+
+        pipeline = [self._make_pipelined(compiled, args, prologue)]
+        tail = None
+        error = None
+
+        while (
+            len(pipeline) < PIPELINE_MAX_QUERIES
+            and self.buffer.take_message_type(b'O')
+        ):
+            # Whatever is written while reading the message, like the
+            # description sent along with a parameter type mismatch,
+            # must follow the results of the queries before it.
+            held = self._write_buf
+            self._write_buf = None
+            try:
+                compiled, args, prologue = await self._read_execute()
+            except Exception as ex:
+                error = ex
+            finally:
+                error_output = self._write_buf
+                self._write_buf = held
+
+            if error is not None:
+                break
+            if (
+                not self._can_pipeline(compiled)
+                or (state is not None and _dbview.serialize_state() != state)
+            ):
+                tail = (compiled, args, prologue)
+                break
+            pipeline.append(self._make_pipelined(compiled, args, prologue))
+
+        if self._cancelled:
+            raise ConnectionAbortedError
+
+        metrics.pipelined_queries.inc(len(pipeline), self.get_tenant_label())
+
+        conn = await self.get_pgcon()
+        try:
+            await execute.execute_pipeline(
+                conn,
+                _dbview,
+                pipeline,
+                state=state,
+                fe_conn=self,
+            )
+        finally:
+            self.maybe_release_pgcon(conn)
+
+        if self._cancelled:
+            raise ConnectionAbortedError
+
+        if error is not None:
+            if error_output is not None:
+                self.write(error_output)
+            raise error
+        if tail is not None:
+            await self._execute_compiled(*tail)
 
     async def sync(self):
         self.buffer.consume_message()
@@ -1224,6 +1419,8 @@ cdef class EdgeConnection(frontend.FrontendConnection):
 
         headers = self.parse_headers()
         include_secrets = headers.get(QUERY_HEADER_DUMP_SECRETS) == b'\x01'
+        jobs_header = headers.get(QUERY_HEADER_DUMP_JOBS)
+        jobs = 1 if jobs_header is None else parse_dump_jobs_header(jobs_header)
 
         self.buffer.finish_message()
 
@@ -1248,8 +1445,9 @@ cdef class EdgeConnection(frontend.FrontendConnection):
             #   2. in the compiler process we connect to that transaction
             #      and re-introspect the schema in it.
             #
-            #   3. all dump worker pg connection would work on the same
-            #      connection.
+            #   3. export the snapshot of that transaction, so that the
+            #      additional dump worker pg connections requested by the
+            #      client (if any) import it.
             #
             # This guarantees that every pg connection and the compiler work
             # with the same DB state.
@@ -1330,14 +1528,37 @@ cdef class EdgeConnection(frontend.FrontendConnection):
             self.flush()
 
             blocks_queue = collections.deque(blocks)
-            output_queue = asyncio.Queue(maxsize=2)
+            # Each worker sends the fragments of one block at a time and
+            # in order, so while the fragments of different blocks may
+            # interleave, the fragments of a block are always numbered
+            # sequentially.
+            jobs = max(1, min(jobs, len(blocks)))
+            output_queue = asyncio.Queue(maxsize=2 * jobs)
+
+            if jobs > 1:
+                snapshot_id = await pgcon.sql_fetch_val(
+                    b'SELECT pg_export_snapshot()')
+            else:
+                snapshot_id = None
 
             async with taskgroup.TaskGroup() as g:
-                g.create_task(pgcon.dump(
+                main_worker_done = asyncio.Event()
+                for _ in range(jobs - 1):
+                    g.create_task(self._dump_worker(
+                        dbname,
+                        snapshot_id,
+                        blocks_queue,
+                        output_queue,
+                        main_worker_done,
+                    ))
+
+                main_worker = g.create_task(pgcon.dump(
                     blocks_queue,
                     output_queue,
                     DUMP_BLOCK_SIZE,
                 ))
+                main_worker.add_done_callback(
+                    lambda _: main_worker_done.set())
 
                 nstops = 0
                 while True:
@@ -1347,8 +1568,7 @@ cdef class EdgeConnection(frontend.FrontendConnection):
                     out = await output_queue.get()
                     if out is None:
                         nstops += 1
-                        if nstops == 1:
-                            # we only have one worker right now
+                        if nstops == jobs:
                             break
                     else:
                         block, block_num, data = out
@@ -1387,6 +1607,60 @@ cdef class EdgeConnection(frontend.FrontendConnection):
         self.write(msg_buf.end_message())
         self.flush()
 
+    async def _dump_worker(
+        self,
+        dbname,
+        snapshot_id,
+        blocks_queue,
+        output_queue,
+        main_worker_done,
+    ):
+        # An additional dump worker, dumping blocks on its own pg
+        # connection in a transaction that imports the snapshot of the
+        # main dump transaction.  It gives up if the main worker is done
+        # before a connection could be acquired, so that a busy pool
+        # never holds the dump back.
+        tenant = self.tenant
+        acquire = asyncio.ensure_future(tenant.acquire_pgcon(dbname))
+        main_done = asyncio.ensure_future(main_worker_done.wait())
+        try:
+            await asyncio.wait(
+                [acquire, main_done], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            main_done.cancel()
+            if not acquire.done():
+                acquire.cancel()
+
+        try:
+            pgcon = await acquire
+        except asyncio.CancelledError:
+            pgcon = None
+
+        if pgcon is None or not blocks_queue:
+            if pgcon is not None:
+                tenant.release_pgcon(dbname, pgcon)
+            await output_queue.put(None)
+            return
+
+        discard = False
+        try:
+            await pgcon.sql_execute(
+                b'START TRANSACTION ISOLATION LEVEL REPEATABLE READ '
+                b'READ ONLY;' +
+                b'SET TRANSACTION SNAPSHOT ' +
+                pg_common.quote_literal(snapshot_id.decode()).encode() +
+                b';' +
+                b'SET LOCAL idle_in_transaction_session_timeout = 0;' +
+                b'SET LOCAL statement_timeout = 0;'
+            )
+            await pgcon.dump(blocks_queue, output_queue, DUMP_BLOCK_SIZE)
+            await pgcon.sql_execute(b"ROLLBACK;")
+        except BaseException:
+            discard = True
+            raise
+        finally:
+            tenant.release_pgcon(dbname, pgcon, discard=discard)
+
     async def _execute_utility_stmt(self, eql: str, pgcon):
         cdef dbview.DatabaseConnectionView _dbview
 
@@ -1438,7 +1712,8 @@ cdef class EdgeConnection(frontend.FrontendConnection):
             await _dbview.reload_state_serializer()
 
         self.reject_headers()
-        self.buffer.read_int16()  # discard -j level
+        jobs = self.buffer.read_int16()  # -j level
+        jobs = max(1, min(jobs, DUMP_MAX_JOBS))
 
         # Now parse the embedded dump header message:
 
@@ -1495,6 +1770,7 @@ cdef class EdgeConnection(frontend.FrontendConnection):
         pgcon = await tenant.acquire_pgcon(dbname)
 
         self._in_dump_restore = True
+        schema_committed = False
         try:
             _dbview.decode_state(sertypes.NULL_TYPE_ID.bytes, b'')
             await self._execute_utility_stmt(
@@ -1567,69 +1843,104 @@ cdef class EdgeConnection(frontend.FrontendConnection):
 
             await pgcon.sql_execute(disable_trigger_q.encode())
 
+            if jobs > 1:
+                # Postgres connections cannot see the uncommitted schema
+                # of each other, so loading the data on several of them
+                # requires committing the schema first, with the triggers
+                # disabled.  No one else may use the database until they
+                # are enabled again, so fall back to a single job if
+                # other connections are open.  The schema is committed
+                # along with a marker that keeps the database from being
+                # connected to by other servers, or after a restart,
+                # until the restore is complete.
+                if not await tenant.block_database_connections(
+                    dbname, pgcon
+                ):
+                    jobs = 1
+                else:
+                    await pgcon.sql_execute(
+                        b'''
+                            INSERT INTO edgedbinstdata.instdata (key, json)
+                            VALUES ('restore_in_progress', 'null'::jsonb);
+                        ''',
+                    )
+                    await self._execute_utility_stmt('COMMIT', pgcon)
+                    schema_committed = True
+                    execute.signal_side_effects(
+                        _dbview, dbview.SideEffects.SchemaChanges)
+
             # Send "RestoreReadyMessage"
             msg = WriteBuffer.new_message(b'+')
             msg.write_int16(0)  # no headers
-            msg.write_int16(1)  # -j1
+            msg.write_int16(jobs)
             self.write(msg.end_message())
             self.flush()
 
-            while True:
-                if not self.buffer.take_message():
-                    # Don't report idling when restoring a dump.
-                    # This is an edge case and the client might be
-                    # legitimately slow.
-                    await self.wait_for_message(report_idling=False)
-                mtype = self.buffer.get_message_type()
-
-                if mtype == b'=':
-                    block_type = None
-                    block_id = None
-                    block_num = None
-                    block_data = None
-
-                    num_headers = self.buffer.read_int16()
-                    for _ in range(num_headers):
-                        header = self.buffer.read_int16()
-                        if header == DUMP_HEADER_BLOCK_TYPE:
-                            block_type = self.buffer.read_len_prefixed_bytes()
-                        elif header == DUMP_HEADER_BLOCK_ID:
-                            block_id = self.buffer.read_len_prefixed_bytes()
-                            block_id = pg_UUID(block_id)
-                        elif header == DUMP_HEADER_BLOCK_NUM:
-                            block_num = self.buffer.read_len_prefixed_bytes()
-                        elif header == DUMP_HEADER_BLOCK_DATA:
-                            block_data = self.buffer.read_len_prefixed_bytes()
-
-                    self.buffer.finish_message()
-
-                    if (block_type is None or block_id is None
-                            or block_num is None or block_data is None):
-                        raise errors.ProtocolError('incomplete data block')
-
-                    restore_block = restore_blocks[block_id]
-                    type_id_map = self._build_type_id_map_for_restore_mending(
-                        restore_block)
-                    self._transport.pause_reading()
-                    await pgcon.restore(restore_block, block_data, type_id_map)
-                    self._transport.resume_reading()
-
-                elif mtype == b'.':
-                    self.buffer.finish_message()
-                    break
-
-                else:
-                    self.fallthrough()
+            if jobs > 1:
+                # Triggers, and so the constraints they check, are
+                # disabled until all data is in, which leaves the workers
+                # free to load the blocks in any order.
+                data_queue = asyncio.Queue(maxsize=2 * jobs)
+                receiving_done = asyncio.Event()
+                async with taskgroup.TaskGroup() as g:
+                    g.create_task(self._restore_worker(
+                        dbname, pgcon, data_queue, receiving_done))
+                    for _ in range(jobs - 1):
+                        g.create_task(self._restore_worker(
+                            dbname, None, data_queue, receiving_done))
+
+                    await self._receive_restore_data(
+                        restore_blocks, None, data_queue)
+
+                    receiving_done.set()
+                    for _ in range(jobs):
+                        await data_queue.put(None)
+            else:
+                await self._receive_restore_data(restore_blocks, pgcon, None)
+
+            if schema_committed:
+                # Enabling the triggers and dropping the marker run in
+                # one implicit transaction: the database is never seen
+                # as restored with the triggers disabled.
+                await pgcon.sql_execute(
+                    enable_trigger_q.encode()
+                    + b"DELETE FROM edgedbinstdata.instdata"
+                    + b" WHERE key = 'restore_in_progress';"
+                )
+            else:
+                await pgcon.sql_execute(enable_trigger_q.encode())
 
-            await pgcon.sql_execute(enable_trigger_q.encode())
+        except Exception as ex:
+            if not schema_committed:
+                await pgcon.sql_execute(b'ROLLBACK')
+                _dbview.abort_tx()
+                raise
 
-        except Exception:
-            await pgcon.sql_execute(b'ROLLBACK')
-            _dbview.abort_tx()
-            raise
+            # The schema is committed, so the database is now partially
+            # restored: it keeps refusing new connections until dropped,
+            # here as well as on the other servers and after a restart,
+            # as the marker is not removed.
+            try:
+                if pgcon.in_tx():
+                    await pgcon.sql_execute(b'ROLLBACK')
+                await pgcon.sql_execute(enable_trigger_q.encode())
+            except Exception:
+                logger.exception(
+                    'could not re-enable triggers after a failed '
+                    'parallel restore of %r', dbname)
+                raise errors.ExecutionError(
+                    f'parallel restore of database {dbname!r} failed and '
+                    f'its triggers could not be re-enabled; the database '
+                    f'is unusable and must be dropped'
+                ) from ex
+            raise errors.ExecutionError(
+                f'parallel restore of database {dbname!r} failed: {ex}; '
+                f'the database is partially restored and must be dropped'
+            ) from ex
 
         else:
-            await self._execute_utility_stmt('COMMIT', pgcon)
+            if not schema_committed:
+                await self._execute_utility_stmt('COMMIT', pgcon)
 
         finally:
             self._transport.resume_reading()
@@ -1637,7 +1948,11 @@ cdef class EdgeConnection(frontend.FrontendConnection):
             tenant.release_pgcon(dbname, pgcon)
 
         execute.signal_side_effects(_dbview, dbview.SideEffects.SchemaChanges)
-        await tenant.introspect_db(dbname)
+        try:
+            await tenant.introspect_db(dbname)
+        finally:
+            if schema_committed:
+                tenant.allow_database_connections(dbname)
 
         if _dbview.is_state_desc_changed():
             self.write(self.make_state_data_description_msg())
@@ -1653,6 +1968,112 @@ cdef class EdgeConnection(frontend.FrontendConnection):
         self.write(msg.end_message())
         self.flush()
 
+    async def _receive_restore_data(self, restore_blocks, pgcon, data_queue):
+        # Restores the data blocks sent by the client on pgcon, or hands
+        # them over to the restore workers through data_queue.
+        while True:
+            if not self.buffer.take_message():
+                # Don't report idling when restoring a dump.
+                # This is an edge case and the client might be
+                # legitimately slow.
+                await self.wait_for_message(report_idling=False)
+            mtype = self.buffer.get_message_type()
+
+            if mtype == b'=':
+                block_type = None
+                block_id = None
+                block_num = None
+                block_data = None
+
+                num_headers = self.buffer.read_int16()
+                for _ in range(num_headers):
+                    header = self.buffer.read_int16()
+                    if header == DUMP_HEADER_BLOCK_TYPE:
+                        block_type = self.buffer.read_len_prefixed_bytes()
+                    elif header == DUMP_HEADER_BLOCK_ID:
+                        block_id = self.buffer.read_len_prefixed_bytes()
+                        block_id = pg_UUID(block_id)
+                    elif header == DUMP_HEADER_BLOCK_NUM:
+                        block_num = self.buffer.read_len_prefixed_bytes()
+                    elif header == DUMP_HEADER_BLOCK_DATA:
+                        block_data = self.buffer.read_len_prefixed_bytes()
+
+                self.buffer.finish_message()
+
+                if (block_type is None or block_id is None
+                        or block_num is None or block_data is None):
+                    raise errors.ProtocolError('incomplete data block')
+
+                restore_block = restore_blocks[block_id]
+                type_id_map = self._build_type_id_map_for_restore_mending(
+                    restore_block)
+                self._transport.pause_reading()
+                if data_queue is None:
+                    await pgcon.restore(
+                        restore_block, block_data, type_id_map)
+                else:
+                    await data_queue.put(
+                        (restore_block, block_data, type_id_map))
+                self._transport.resume_reading()
+
+            elif mtype == b'.':
+                self.buffer.finish_message()
+                break
+
+            else:
+                self.fallthrough()
+
+    async def _restore_worker(
+        self,
+        dbname,
+        pgcon,
+        data_queue,
+        receiving_done,
+    ):
+        # A parallel restore worker, loading data blocks in a transaction
+        # of its own on pgcon, or on a pooled connection if pgcon is None.
+        # The latter gives up if all data is received before a connection
+        # could be acquired.
+        tenant = self.tenant
+        own_pgcon = pgcon is None
+        if own_pgcon:
+            acquire = asyncio.ensure_future(tenant.acquire_pgcon(dbname))
+            done_wait = asyncio.ensure_future(receiving_done.wait())
+            try:
+                await asyncio.wait(
+                    [acquire, done_wait], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                done_wait.cancel()
+                if not acquire.done():
+                    acquire.cancel()
+            try:
+                pgcon = await acquire
+            except asyncio.CancelledError:
+                return
+
+        discard = False
+        try:
+            await pgcon.sql_execute(
+                b'''START TRANSACTION;
+
+                    SET LOCAL idle_in_transaction_session_timeout = 0;
+                    SET LOCAL statement_timeout = 0;
+                ''',
+            )
+            while True:
+                item = await data_queue.get()
+                if item is None:
+                    break
+                restore_block, block_data, type_id_map = item
+                await pgcon.restore(restore_block, block_data, type_id_map)
+            await pgcon.sql_execute(b'COMMIT')
+        except BaseException:
+            discard = own_pgcon
+            raise
+        finally:
+            if own_pgcon:
+                tenant.release_pgcon(dbname, pgcon, discard=discard)
+
     def _build_type_id_map_for_restore_mending(self, restore_block):
         type_map = {}
         descriptor_stack = []
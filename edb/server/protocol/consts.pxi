@@ -18,6 +18,9 @@
 
 
 DEF DUMP_BLOCK_SIZE = 1024 * 1024 * 10
+# The maximum number of backend connections a single dump or restore
+# can use.
+DEF DUMP_MAX_JOBS = 16
 
 DEF DUMP_HEADER_BLOCK_TYPE = 101
 DEF DUMP_HEADER_BLOCK_TYPE_INFO = b'I'
@@ -31,3 +34,7 @@ DEF DUMP_HEADER_SERVER_CATALOG_VERSION = 105
 DEF DUMP_HEADER_BLOCK_ID = 110
 DEF DUMP_HEADER_BLOCK_NUM = 111
 DEF DUMP_HEADER_BLOCK_DATA = 112
+
+# The maximum number of queries of consecutive Execute messages sent
+# to the backend in a single round trip.
+DEF PIPELINE_MAX_QUERIES = 64
@@ -8,3 +8,5 @@
 cdef extern from "Python.h":
     object PyLong_FromUnicodeObject(
         object u, int base)
+    int Py_EnterRecursiveCall(const char *where) except -1
+    void Py_LeaveRecursiveCall()
@@ -17,11 +17,15 @@
 #
 
 
+import asyncio
 import decimal
 import http
 import json
 import urllib.parse
 
+cimport cpython
+from libc.stdint cimport int32_t
+
 import immutables
 
 from edb import errors
@@ -40,7 +44,228 @@ from edb.server import compiler
 from edb.server import config
 from edb.server.compiler import enums
 from edb.server.dbview cimport dbview
-from edb.server.pgproto.pgproto cimport WriteBuffer
+from edb.server.protocol cimport frontend
+from edb.server.pgproto cimport hton
+from edb.server.pgproto.pgproto cimport (
+    WriteBuffer,
+
+    FRBuffer,
+    frb_init,
+    frb_read,
+    frb_get_len,
+)
+
+
+cdef bytes NDJSON_MIME = b'application/x-ndjson'
+
+# The most queries one batch request may run, see _execute_batch().
+MAX_BATCH_SIZE = 100
+
+
+cdef class StreamingConnection(frontend.AbstractFrontendConnection):
+
+    # Forwards the JSON_ELEMENTS results of a query to the client as
+    # they come from the backend, one element per line, in the chunks of
+    # an HTTP response.  Once the client falls behind, the backend
+    # connection stops being read until the response is drained, so
+    # that at most a few data buffers are ever held in memory.
+
+    def __init__(self, response):
+        self.response = response
+        self.pgcon = None
+        self.reading_paused = False
+
+    @property
+    def cancelled(self):
+        return self.response.is_closing()
+
+    cdef write(self, WriteBuffer buf):
+        cdef:
+            FRBuffer rbuf
+            bytes data = bytes(buf)
+            int32_t col_len
+            list lines = []
+
+        frb_init(
+            &rbuf,
+            cpython.PyBytes_AS_STRING(data),
+            cpython.Py_SIZE(data))
+
+        while frb_get_len(&rbuf):
+            # DataRow messages of a single column each.
+            frb_read(&rbuf, 5)  # message type and length
+            if hton.unpack_int16(frb_read(&rbuf, 2)) != 1:
+                raise errors.InternalServerError(
+                    'received incorrect response data for a JSON query')
+            col_len = hton.unpack_int32(frb_read(&rbuf, 4))
+            if col_len < 0:
+                raise errors.InternalServerError(
+                    'received NULL in response data for a JSON query')
+            lines.append(frb_read(&rbuf, col_len)[:col_len])
+            lines.append(b'\n')
+
+        self.response.write_chunk(b''.join(lines))
+
+        if (
+            not self.reading_paused
+            and self.pgcon is not None
+            and self.response.is_writing_paused()
+        ):
+            self.reading_paused = True
+            self.pgcon.pause_reading()
+            asyncio.get_running_loop().create_task(self._resume_reading())
+
+    cdef flush(self):
+        pass
+
+    async def _resume_reading(self):
+        await self.response.drain()
+        self.reading_paused = False
+        if self.pgcon is not None:
+            self.pgcon.resume_reading()
+
+
+def _wants_stream(object request):
+    # Chunked responses are only a thing since HTTP/1.1.
+    return (
+        request.version == b'1.1'
+        and request.accept is not None
+        and NDJSON_MIME in request.accept
+    )
+
+
+async def _execute_streaming(
+    dbview.Database db,
+    query,
+    response,
+    *,
+    variables,
+    globals_,
+):
+    cdef StreamingConnection fe_conn = StreamingConnection(response)
+
+    dbv, compiled = await execute.parse_json(
+        db,
+        query,
+        output_format=compiler.OutputFormat.JSON_ELEMENTS,
+    )
+
+    tenant = db.tenant
+    pgcon = await tenant.acquire_pgcon(db.name)
+    fe_conn.pgcon = pgcon
+    try:
+        await execute.execute_json(
+            pgcon,
+            dbv,
+            compiled,
+            variables=variables,
+            globals_=globals_,
+            fe_conn=fe_conn,
+        )
+    finally:
+        fe_conn.pgcon = None
+        if fe_conn.reading_paused:
+            pgcon.resume_reading()
+        # The connection is left in the middle of a command when the
+        # client goes away, release_pgcon() discards it then.
+        tenant.release_pgcon(
+            db.name, pgcon, discard=not pgcon.is_healthy())
+
+
+def _validate_query(query, variables, globals_):
+    if not query:
+        raise TypeError('invalid EdgeQL request: query is missing')
+
+    if variables is not None and not isinstance(variables, dict):
+        raise TypeError('"variables" must be a JSON object')
+
+    if globals_ is not None and not isinstance(globals_, dict):
+        raise TypeError('"globals" must be a JSON object')
+
+
+def _parse_batch(list body):
+    if not body:
+        raise TypeError('invalid EdgeQL request: the batch is empty')
+
+    if len(body) > MAX_BATCH_SIZE:
+        raise TypeError(
+            f'invalid EdgeQL request: the batch has more than '
+            f'{MAX_BATCH_SIZE} queries')
+
+    batch = []
+    for entry in body:
+        if not isinstance(entry, dict):
+            raise TypeError(
+                'the queries of a batch must be JSON objects')
+        query = entry.get('query')
+        variables = entry.get('variables')
+        globals_ = entry.get('globals')
+        _validate_query(query, variables, globals_)
+        batch.append((query, variables, globals_))
+
+    return batch
+
+
+async def _error_body(ex, dbview.Database db):
+    if debug.flags.server:
+        markup.dump(ex)
+
+    ex = await execute.interpret_error(ex, db)
+
+    err_dct = {
+        'message': str(ex),
+        'type': str(type(ex).__name__),
+        'code': ex.get_code(),
+    }
+
+    return json.dumps({'error': err_dct}).encode()
+
+
+async def _execute_batch(dbview.Database db, list batch):
+    # Runs independent queries on one backend connection.  All of them
+    # are compiled (or found in the cache) with one dbview before the
+    # connection is acquired; the failure of one doesn't affect the
+    # others, and each gets its own `data` or `error` in the response.
+    cdef list results = [None] * len(batch)
+
+    dbv = None
+    compiled = []
+    for i, (query, variables, globals_) in enumerate(batch):
+        try:
+            dbv, query_compiled = await execute.parse_json(
+                db, query, dbv=dbv)
+        except Exception as ex:
+            results[i] = await _error_body(ex, db)
+        else:
+            compiled.append((i, query_compiled, variables, globals_))
+
+    if compiled:
+        tenant = db.tenant
+        try:
+            pgcon = await tenant.acquire_pgcon(db.name)
+        except Exception as ex:
+            error = await _error_body(ex, db)
+            for i, *_ in compiled:
+                results[i] = error
+        else:
+            try:
+                for i, query_compiled, variables, globals_ in compiled:
+                    try:
+                        result = await execute.execute_json(
+                            pgcon,
+                            dbv,
+                            query_compiled,
+                            variables=variables or {},
+                            globals_=globals_,
+                        )
+                    except Exception as ex:
+                        results[i] = await _error_body(ex, db)
+                    else:
+                        results[i] = b'{"data":' + result + b'}'
+            finally:
+                tenant.release_pgcon(db.name, pgcon)
+
+    return b'[' + b','.join(results) + b']'
 
 
 async def handle_request(
@@ -59,17 +284,22 @@ async def handle_request(
     variables = None
     globals_ = None
     query = None
+    batch = None
 
     try:
         if request.method == b'POST':
             if request.content_type and b'json' in request.content_type:
                 body = json.loads(request.body, parse_float=decimal.Decimal)
-                if not isinstance(body, dict):
+                if isinstance(body, list):
+                    batch = _parse_batch(body)
+                elif isinstance(body, dict):
+                    query = body.get('query')
+                    variables = body.get('variables')
+                    globals_ = body.get('globals')
+                else:
                     raise TypeError(
-                        'the body of the request must be a JSON object')
-                query = body.get('query')
-                variables = body.get('variables')
-                globals_ = body.get('globals')
+                        'the body of the request must be a JSON object '
+                        'or an array of JSON objects')
             else:
                 raise TypeError(
                     'unable to interpret EdgeQL POST request')
@@ -102,14 +332,8 @@ async def handle_request(
         else:
             raise TypeError('expected a GET or a POST request')
 
-        if not query:
-            raise TypeError('invalid EdgeQL request: query is missing')
-
-        if variables is not None and not isinstance(variables, dict):
-            raise TypeError('"variables" must be a JSON object')
-
-        if globals_ is not None and not isinstance(globals_, dict):
-            raise TypeError('"globals" must be a JSON object')
+        if batch is None:
+            _validate_query(query, variables, globals_)
 
     except Exception as ex:
         if debug.flags.server:
@@ -122,25 +346,37 @@ async def handle_request(
 
     response.status = http.HTTPStatus.OK
     response.content_type = b'application/json'
-    try:
-        result = await execute.parse_execute_json(
-            db,
-            query,
-            variables=variables or {},
-            globals_=globals_,
-        )
-    except Exception as ex:
-        if debug.flags.server:
-            markup.dump(ex)
 
-        ex = await execute.interpret_error(ex, db)
+    if batch is not None:
+        response.body = await _execute_batch(db, batch)
+        return
 
-        err_dct = {
-            'message': str(ex),
-            'type': str(type(ex).__name__),
-            'code': ex.get_code(),
-        }
+    stream = _wants_stream(request)
+    try:
+        if stream:
+            response.content_type = NDJSON_MIME
+            await _execute_streaming(
+                db,
+                query,
+                response,
+                variables=variables or {},
+                globals_=globals_,
+            )
+        else:
+            result = await execute.parse_execute_json(
+                db,
+                query,
+                variables=variables or {},
+                globals_=globals_,
+            )
+    except Exception as ex:
+        if response.streaming:
+            # Part of the result is out already; let the protocol cut
+            # the response short.
+            raise
 
-        response.body = json.dumps({'error': err_dct}).encode()
+        response.content_type = b'application/json'
+        response.body = await _error_body(ex, db)
     else:
-        response.body = b'{"data":' + result + b'}'
+        if not stream:
+            response.body = b'{"data":' + result + b'}'
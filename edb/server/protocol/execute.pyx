@@ -20,6 +20,7 @@ from typing import (
     Any,
     Mapping,
     Optional,
+    Tuple,
 )
 
 from edgedb import scram
@@ -29,6 +30,7 @@ import base64
 import decimal
 import hashlib
 import json
+import json.encoder
 import logging
 
 import immutables
@@ -45,6 +47,7 @@ from edb.server import defines as edbdef
 from edb.server.compiler import errormech
 from edb.server.dbview cimport dbview
 from edb.server.protocol cimport args_ser
+from edb.server.protocol cimport cpythonx
 from edb.server.protocol cimport frontend
 from edb.server.pgproto.pgproto cimport WriteBuffer
 from edb.server.pgcon cimport pgcon
@@ -218,12 +221,14 @@ async def execute_script(
         ssize_t sent = 0
         bint in_tx, sync, no_sync
         object user_schema, extensions, ext_config_settings, cached_reflection
+        object user_schema_fingerprint
         object global_schema, roles
         WriteBuffer bind_data
         int dbver = dbv.dbver
         bint parse
 
     user_schema = extensions = ext_config_settings = cached_reflection = None
+    user_schema_fingerprint = None
     global_schema = roles = None
     unit_group = compiled.query_unit_group
 
@@ -297,6 +302,8 @@ async def execute_script(
 
                 if query_unit.user_schema:
                     user_schema = query_unit.user_schema
+                    user_schema_fingerprint = (
+                        query_unit.user_schema_fingerprint)
                     extensions = query_unit.extensions
                     ext_config_settings = query_unit.ext_config_settings
                     cached_reflection = query_unit.cached_reflection
@@ -364,6 +371,7 @@ async def execute_script(
         if not in_tx:
             side_effects = dbv.commit_implicit_tx(
                 user_schema,
+                user_schema_fingerprint,
                 extensions,
                 ext_config_settings,
                 global_schema,
@@ -385,6 +393,86 @@ async def execute_script(
     return data
 
 
+async def execute_pipeline(
+    be_conn: pgcon.PGConnection,
+    dbv: dbview.DatabaseConnectionView,
+    pipeline: list,
+    *,
+    state: Optional[bytes],
+    fe_conn: frontend.AbstractFrontendConnection,
+):
+    """Execute single-unit queries in one round trip to the backend.
+
+    Each item of *pipeline* is a ``(query_unit, bind_data, prologue,
+    epilogue)`` tuple, where *prologue* and *epilogue* are messages
+    (or None) written to *fe_conn* before and after the results of the
+    query.  The queries are sent with a single SYNC, so they must not
+    change the session state and, outside of a transaction, must be
+    read-only.  *state* is the session state they all run with, None
+    in a transaction.
+
+    The queries following a failed one are not executed.
+    """
+    cdef:
+        bytes orig_state = state
+        int dbver = dbv.dbver
+        ssize_t idx
+
+    if be_conn.last_state == state:
+        state = None
+
+    for query_unit, _, _, _ in pipeline:
+        dbv.start(query_unit)
+
+    try:
+        async with be_conn.parse_execute_script_context():
+            parse_array = [False] * len(pipeline)
+            be_conn.send_query_units(
+                [item[0] for item in pipeline],
+                True,
+                [item[1] for item in pipeline],
+                state,
+                dbver,
+                parse_array,
+                0,
+            )
+            if state is not None:
+                await be_conn.wait_for_state_resp(state, state_sync=0)
+
+            for idx, (query_unit, _, prologue, epilogue) in enumerate(
+                pipeline
+            ):
+                if fe_conn.cancelled:
+                    raise ConnectionAbortedError
+                if prologue is not None:
+                    fe_conn.write(prologue)
+                for sql in query_unit.sql:
+                    await be_conn.wait_for_command(
+                        query_unit,
+                        parse_array[idx],
+                        dbver,
+                        ignore_data=query_unit.output_format == FMT_NONE,
+                        fe_conn=fe_conn,
+                    )
+                dbv.on_success(query_unit, None)
+                if epilogue is not None:
+                    fe_conn.write(epilogue)
+
+    except Exception as e:
+        dbv.on_error()
+
+        # If something went wrong that is *not* on the backend side, force
+        # an error to occur on the SQL side.
+        if not isinstance(e, pgerror.BackendError):
+            await be_conn.force_error()
+
+        raise
+
+    else:
+        if orig_state is not None:
+            be_conn.last_state = orig_state
+
+
 async def execute_system_config(
     conn: pgcon.PGConnection,
     dbv: dbview.DatabaseConnectionView,
@@ -476,33 +564,30 @@ def signal_side_effects(dbv, side_effects):
         )
 
 
-async def parse_execute_json(
+async def parse_json(
     db: dbview.Database,
     query: str,
     *,
-    variables: Mapping[str, Any] = immutables.Map(),
-    globals_: Optional[Mapping[str, Any]] = None,
     output_format: compiler.OutputFormat = compiler.OutputFormat.JSON,
     query_cache_enabled: Optional[bool] = None,
     cached_globally: bool = False,
     use_metrics: bool = True,
-) -> bytes:
-    # WARNING: only set cached_globally to True when the query is
-    # strictly referring to only shared stable objects in user schema
-    # or anything from std schema, for example:
-    #     YES:  select ext::auth::UIConfig { ... }
-    #     NO:   select default::User { ... }
-
-    if query_cache_enabled is None:
-        query_cache_enabled = not (
-            debug.flags.disable_qcache or debug.flags.edgeql_compile)
-
-    tenant = db.tenant
-    dbv = await tenant.new_dbview(
-        dbname=db.name,
-        query_cache=query_cache_enabled,
-        protocol_version=edbdef.CURRENT_PROTOCOL,
-    )
+    dbv: Optional[dbview.DatabaseConnectionView] = None,
+) -> Tuple[dbview.DatabaseConnectionView, dbview.CompiledQuery]:
+    # The compilation half of parse_execute_json(), for the callers
+    # that need to hold on to the backend connection of execute_json().
+    # Pass the *dbv* returned by a previous call to compile several
+    # queries with one dbview.
+    if dbv is None:
+        if query_cache_enabled is None:
+            query_cache_enabled = not (
+                debug.flags.disable_qcache or debug.flags.edgeql_compile)
+
+        dbv = await db.tenant.new_dbview(
+            dbname=db.name,
+            query_cache=query_cache_enabled,
+            protocol_version=edbdef.CURRENT_PROTOCOL,
+        )
 
     query_req = dbview.QueryRequestInfo(
         edgeql.Source.from_string(query),
@@ -518,6 +603,36 @@ async def parse_execute_json(
         use_metrics=use_metrics,
     )
 
+    return dbv, compiled
+
+
+async def parse_execute_json(
+    db: dbview.Database,
+    query: str,
+    *,
+    variables: Mapping[str, Any] = immutables.Map(),
+    globals_: Optional[Mapping[str, Any]] = None,
+    output_format: compiler.OutputFormat = compiler.OutputFormat.JSON,
+    query_cache_enabled: Optional[bool] = None,
+    cached_globally: bool = False,
+    use_metrics: bool = True,
+) -> bytes:
+    # WARNING: only set cached_globally to True when the query is
+    # strictly referring to only shared stable objects in user schema
+    # or anything from std schema, for example:
+    #     YES:  select ext::auth::UIConfig { ... }
+    #     NO:   select default::User { ... }
+
+    dbv, compiled = await parse_json(
+        db,
+        query,
+        output_format=output_format,
+        query_cache_enabled=query_cache_enabled,
+        cached_globally=cached_globally,
+        use_metrics=use_metrics,
+    )
+
+    tenant = db.tenant
     pgcon = await tenant.acquire_pgcon(db.name)
     try:
         return await execute_json(
@@ -588,24 +703,100 @@ async def execute_json(
         return None
 
 
-class DecimalEncoder(json.JSONEncoder):
-    def encode(self, obj):
-        if isinstance(obj, dict):
-            return '{' + ', '.join(
-                    f'{self.encode(k)}: {self.encode(v)}'
-                    for (k, v) in obj.items()
-                ) + '}'
-        if isinstance(obj, list):
-            return '[' + ', '.join(map(self.encode, obj)) + ']'
-        if isinstance(obj, decimal.Decimal):
-            return f'{obj:f}'
-        return super().encode(obj)
+cdef object _encode_json_str = json.encoder.encode_basestring_ascii
+cdef object INF = float('inf')
+
+
+cdef _encode_json(object obj, list out):
+    # Appends the JSON of `obj` to `out` in one walk over it; the output
+    # is that of a compact json.dumps(), except that Decimals are written
+    # out with all of their digits, since JSON numbers are arbitrary
+    # precision.  The values come from json.loads() in most cases, so
+    # the common types are checked first.
+    if isinstance(obj, str):
+        out.append(_encode_json_str(obj))
+    elif obj is None:
+        out.append('null')
+    elif obj is True:
+        out.append('true')
+    elif obj is False:
+        out.append('false')
+    elif isinstance(obj, int):
+        out.append(int.__repr__(obj))
+    elif isinstance(obj, decimal.Decimal):
+        out.append(format(obj, 'f'))
+    elif isinstance(obj, float):
+        if obj != obj:
+            out.append('NaN')
+        elif obj == INF:
+            out.append('Infinity')
+        elif obj == -INF:
+            out.append('-Infinity')
+        else:
+            out.append(float.__repr__(obj))
+    elif isinstance(obj, dict):
+        if not obj:
+            out.append('{}')
+            return
+        cpythonx.Py_EnterRecursiveCall(' while encoding a JSON object')
+        try:
+            sep = '{'
+            for key, val in (<dict>obj).items():
+                out.append(sep)
+                out.append(_encode_json_key(key))
+                out.append(':')
+                _encode_json(val, out)
+                sep = ','
+            out.append('}')
+        finally:
+            cpythonx.Py_LeaveRecursiveCall()
+    elif isinstance(obj, (list, tuple)):
+        if not obj:
+            out.append('[]')
+            return
+        cpythonx.Py_EnterRecursiveCall(' while encoding a JSON array')
+        try:
+            sep = '['
+            for val in obj:
+                out.append(sep)
+                _encode_json(val, out)
+                sep = ','
+            out.append(']')
+        finally:
+            cpythonx.Py_LeaveRecursiveCall()
+    else:
+        # Let json reject the unsupported types.
+        out.append(json.dumps(obj))
 
 
-cdef bytes _encode_json_value(object val):
-    jarg = json.dumps(val, cls=DecimalEncoder)
+cdef str _encode_json_key(object key):
+    cdef list out
+
+    if isinstance(key, str):
+        return _encode_json_str(key)
+    elif key is None or isinstance(key, (int, float, decimal.Decimal)):
+        # Coerced to strings, as json.dumps() does.
+        out = []
+        _encode_json(key, out)
+        return _encode_json_str(out[0])
+    else:
+        raise TypeError(
+            f'keys must be str, int, float, bool or None, '
+            f'not {type(key).__name__}')
 
-    return b'\x01' + jarg.encode('utf-8')
+
+def encode_json(obj) -> str:
+    """Encode a JSON value, keeping the precision of Decimals."""
+    cdef list out = []
+    _encode_json(obj, out)
+    return ''.join(out)
+
+
+cdef bytes _encode_json_value(object val):
+    # The leading byte is the version of the jsonb binary format.
+    cdef list out = ['\x01']
+    _encode_json(val, out)
+    return ''.join(out).encode('utf-8')
 
 
 cdef bytes _encode_args(list args):
@@ -1425,6 +1425,8 @@ cdef class PgConnection(frontend.FrontendConnection):
         key = (hashlib.sha1(query_str.encode("utf-8")).digest(), fe_settings)
         if not ignore_cache:
             result = self.database.lookup_compiled_sql(key)
+            if result is None:
+                result = await self.database.lookup_persisted_sql(key)
             if result is not None:
                 return result
         compiler_pool = self.server.get_compiler_pool()
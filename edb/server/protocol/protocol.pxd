@@ -37,6 +37,9 @@ cdef class HttpRequest:
         public object cookies
 
 
+cdef class HttpProtocol
+
+
 cdef class HttpResponse:
 
     cdef:
@@ -46,6 +49,10 @@ cdef class HttpResponse:
         public dict custom_headers
         public bytes body
 
+        HttpProtocol protocol
+        bytes req_version
+        readonly bint streaming
+
 
 cdef class HttpProtocol:
 
@@ -63,6 +70,7 @@ cdef class HttpProtocol:
         bint external_auth
         bint respond_hsts
         bint is_tls
+        object write_waiter
         object binary_endpoint_security
         object http_endpoint_security
         object tenant
@@ -76,7 +84,8 @@ cdef class HttpProtocol:
     cdef _return_binary_error(self, binary.EdgeConnection proto)
     cdef _write(self, bytes req_version, bytes resp_status,
                 bytes content_type, dict custom_headers, bytes body,
-                bint close_connection)
+                bint close_connection, bint chunked=?)
+    cdef _write_chunk(self, bytes data)
 
     cdef write(self, HttpRequest request, HttpResponse response)
 
@@ -87,6 +87,49 @@ cdef class HttpResponse:
         self.custom_headers = {}
         self.body = b''
         self.close_connection = False
+        self.streaming = False
+
+    def write_chunk(self, bytes data):
+        """Send *data* to the client right away, as a part of the body.
+
+        The status and the headers are sent along with the first chunk,
+        and the body is then delimited with the chunked transfer encoding
+        instead of Content-Length, so this is only valid for HTTP/1.1
+        requests.  The handler should not set ``body`` afterwards.
+        """
+        if self.is_closing():
+            raise ConnectionAbortedError
+
+        if not self.streaming:
+            assert type(self.status) is HTTPStatus
+            self.streaming = True
+            self.protocol._write(
+                self.req_version,
+                f'{self.status.value} {self.status.phrase}'.encode(),
+                self.content_type,
+                self.custom_headers,
+                b'',
+                self.close_connection,
+                True)
+
+        if data:
+            self.protocol._write_chunk(data)
+
+    def is_closing(self):
+        return self.protocol is None or self.protocol.transport is None
+
+    def is_writing_paused(self):
+        return (
+            self.protocol is not None
+            and self.protocol.write_waiter is not None
+            and not self.protocol.write_waiter.done()
+        )
+
+    async def drain(self):
+        # Wait until the client catches up with the written chunks,
+        # or until the connection is lost.
+        if self.is_writing_paused():
+            await self.protocol.write_waiter
 
 
 cdef class HttpProtocol:
@@ -120,6 +163,7 @@ cdef class HttpProtocol:
         self.respond_hsts = False  # redirect non-TLS HTTP clients to TLS URL
 
         self.is_tls = False
+        self.write_waiter = None
 
     def connection_made(self, transport):
         self.transport = transport
@@ -127,12 +171,17 @@ cdef class HttpProtocol:
     def connection_lost(self, exc):
         self.transport = None
         self.unprocessed = None
+        self.resume_writing()
 
     def pause_writing(self):
-        pass
+        if self.write_waiter and not self.write_waiter.done():
+            return
+        self.write_waiter = self.loop.create_future()
 
     def resume_writing(self):
-        pass
+        if not self.write_waiter or self.write_waiter.done():
+            return
+        self.write_waiter.set_result(True)
 
     def eof_received(self):
         pass
@@ -316,14 +365,18 @@ cdef class HttpProtocol:
 
     cdef _write(self, bytes req_version, bytes resp_status,
                 bytes content_type, dict custom_headers, bytes body,
-                bint close_connection):
+                bint close_connection, bint chunked=False):
         if self.transport is None:
             return
         data = [
             b'HTTP/', req_version, b' ', resp_status, b'\r\n',
             b'Content-Type: ', content_type, b'\r\n',
-            b'Content-Length: ', f'{len(body)}'.encode(), b'\r\n',
         ]
+        if chunked:
+            data.append(b'Transfer-Encoding: chunked\r\n')
+        else:
+            data.extend(
+                (b'Content-Length: ', f'{len(body)}'.encode(), b'\r\n'))
 
         for key, value in custom_headers.items():
             data.append(f'{key}: {value}\r\n'.encode())
@@ -341,9 +394,19 @@ cdef class HttpProtocol:
             data.append(b'Connection: close\r\n')
         data.append(b'\r\n')
         if body:
-            data.append(body)
+            if chunked:
+                data.extend((f'{len(body):x}\r\n'.encode(), body, b'\r\n'))
+            else:
+                data.append(body)
         self.transport.write(b''.join(data))
 
+    cdef _write_chunk(self, bytes data):
+        # An empty chunk terminates the body.
+        if self.transport is None:
+            return
+        self.transport.write(
+            b''.join((f'{len(data):x}\r\n'.encode(), data, b'\r\n')))
+
     cdef write(self, HttpRequest request, HttpResponse response):
         assert type(response.status) is HTTPStatus
         self._write(
@@ -421,6 +484,9 @@ cdef class HttpProtocol:
         if self.transport is None:
             return
 
+        response.protocol = self
+        response.req_version = request.version
+
         if self.respond_hsts:
             if request.host:
                 path = request.url.path.lstrip(b'/')
@@ -463,17 +529,26 @@ cdef class HttpProtocol:
 
         try:
             await self.handle_request(request, response)
-        except errors.AvailabilityError as ex:
-            self._close_with_error(
-                b"503 Service Unavailable",
-                f'{type(ex).__name__}: {ex}'.encode(),
-            )
-            return
         except Exception as ex:
-            self.unhandled_exception(b"500 Internal Server Error", ex)
+            if response.streaming:
+                # The status is already sent, so all that is left is to
+                # cut the body short for the client to notice.
+                if debug.flags.server:
+                    markup.dump(ex)
+                self.close()
+            elif isinstance(ex, errors.AvailabilityError):
+                self._close_with_error(
+                    b"503 Service Unavailable",
+                    f'{type(ex).__name__}: {ex}'.encode(),
+                )
+            else:
+                self.unhandled_exception(b"500 Internal Server Error", ex)
             return
 
-        self.write(request, response)
+        if response.streaming:
+            self._write_chunk(b'')
+        else:
+            self.write(request, response)
         self.in_response = False
 
         if response.close_connection or not request.should_keep_alive:
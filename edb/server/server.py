@@ -51,7 +51,6 @@ from edb.schema import reflection as s_refl
 from edb.schema import schema as s_schema
 
 from edb.server import args as srvargs
-from edb.server import cache
 from edb.server import config
 from edb.server import compiler_pool
 from edb.server import daemon
@@ -144,6 +143,7 @@ class BaseServer:
             srvargs.DEFAULT_AUTH_METHODS),
         admin_ui: bool = False,
         disable_dynamic_system_config: bool = False,
+        persistent_query_cache_dir: Optional[pathlib.Path] = None,
         compiler_state: edbcompiler.CompilerState,
     ):
         self.__loop = asyncio.get_running_loop()
@@ -170,8 +170,9 @@ class BaseServer:
         self._compiler_pool_size = compiler_pool_size
         self._compiler_pool_mode = compiler_pool_mode
         self._compiler_pool_addr = compiler_pool_addr
-        self._system_compile_cache = lru.LRUMapping(
-            maxsize=defines._MAX_QUERIES_CACHE
+        self._system_compile_cache = lru.TinyLFUMapping(
+            maxsize=defines._MAX_QUERIES_CACHE,
+            stats=metrics.QueryCacheStats('system'),
         )
 
         self._listen_sockets = listen_sockets
@@ -202,8 +203,14 @@ class BaseServer:
 
         self._servers = {}
 
-        self._http_query_cache = cache.StatementsCache(
-            maxsize=defines.HTTP_PORT_QUERY_CACHE_SIZE)
+        self._http_query_cache = lru.TinyLFUMapping(
+            maxsize=defines.HTTP_PORT_QUERY_CACHE_SIZE,
+            stats=metrics.QueryCacheStats('graphql'),
+        )
+        self._graphql_persisted_queries = lru.TinyLFUMapping(
+            maxsize=defines.GRAPHQL_PERSISTED_QUERIES_SIZE,
+            stats=metrics.QueryCacheStats('graphql_persisted'),
+        )
 
         self._http_last_minute_requests = windowedsum.WindowedSum()
         self._http_request_logger = None
@@ -231,6 +238,7 @@ class BaseServer:
 
         self._disable_dynamic_system_config = disable_dynamic_system_config
         self._report_config_typedesc = {}
+        self._persistent_query_cache_dir = persistent_query_cache_dir
 
     async def _request_stats_logger(self):
         last_seen = -1
@@ -482,6 +490,14 @@ class BaseServer:
     def get_compiler_pool(self):
         return self._compiler_pool
 
+    def get_persistent_query_cache_dir(self) -> Optional[pathlib.Path]:
+        return self._persistent_query_cache_dir
+
+    def get_shared_compile_cache(self) -> Optional[lru.TinyLFUMapping]:
+        # The cache of compiled queries shared by the databases of all
+        # tenants, see MultiTenantServer.
+        return None
+
     async def introspect_global_schema_json(
         self, conn: pgcon.PGConnection
     ) -> bytes:
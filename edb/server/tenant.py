@@ -37,6 +37,7 @@ from edb.common import retryloop
 from edb.common import taskgroup
 
 from . import args as srvargs
+from . import cache
 from . import config
 from . import connpool
 from . import dbview
@@ -70,6 +71,7 @@ class Tenant(ha_base.ClusterProtocol):
     _instance_name: str
     _instance_data: Mapping[str, str]
     _dbindex: dbview.DatabaseIndex | None
+    _persistent_query_cache: cache.PersistentQueryCache | None
     _initing: bool
     _running: bool
     _accepting_connections: bool
@@ -96,6 +98,9 @@ class Tenant(ha_base.ClusterProtocol):
 
     # A set of databases that should not accept new connections.
     _block_new_connections: set[str]
+    # A set of databases whose parallel restore has not completed, as
+    # found by introspection.
+    _restoring_databases: set[str]
     _report_config_data: dict[defines.ProtocolVersion, bytes]
 
     _roles: Mapping[str, RoleDescriptor]
@@ -152,17 +157,19 @@ class Tenant(ha_base.ClusterProtocol):
             defines.MIN_SUGGESTED_CLIENT_POOL_SIZE,
         )
         self._pg_pool = connpool.Pool(
-            connect=self._pg_connect,
+            connect=self._pg_pool_connect,
             disconnect=self._pg_disconnect,
             # 1 connection is reserved for the system DB
             max_capacity=max_backend_connections - 1,
         )
         self._pg_unavailable_msg = None
         self._block_new_connections = set()
+        self._restoring_databases = set()
         self._report_config_data = {}
 
         # DB state will be initialized in init().
         self._dbindex = None
+        self._persistent_query_cache = None
 
         self._roles = immutables.Map()
         self._sys_auth = tuple()
@@ -336,6 +343,12 @@ class Tenant(ha_base.ClusterProtocol):
         default_sysconfig = await self._load_sys_config("sysconfig_default")
         await self._load_reported_config()
 
+        cache_dir = self._server.get_persistent_query_cache_dir()
+        if cache_dir is not None:
+            self._persistent_query_cache = cache.PersistentQueryCache(
+                cache_dir / f"{self._tenant_id}.sqlite"
+            )
+
         self._dbindex = dbview.DatabaseIndex(
             self,
             std_schema=self._server.get_std_schema(),
@@ -343,6 +356,8 @@ class Tenant(ha_base.ClusterProtocol):
             sys_config=sys_config,
             default_sysconfig=default_sysconfig,
             sys_config_spec=self._server.config_settings,
+            persistent_cache=self._persistent_query_cache,
+            shared_cache=self._server.get_shared_compile_cache(),
         )
 
         await self._introspect_dbs()
@@ -414,6 +429,9 @@ class Tenant(ha_base.ClusterProtocol):
         self._running = False
         self._accept_new_tasks = False
         self._cluster.stop_watching()
+        if self._persistent_query_cache is not None:
+            self._persistent_query_cache.close()
+            self._persistent_query_cache = None
 
     async def wait_stopped(self) -> None:
         if self._task_group is not None:
@@ -462,6 +480,48 @@ class Tenant(ha_base.ClusterProtocol):
             rv.terminate()
             raise ConnectionError("connected to outdated Postgres master")
 
+    async def _pg_pool_connect(self, dbname: str) -> pgcon.PGConnection:
+        conn = await self._pg_connect(dbname)
+        # Only warm up the connections no query is waiting for yet, like
+        # the pre-established ones, so that the warm-up never delays one.
+        if not self._pg_pool.count_waiters(dbname):
+            try:
+                await self._prepare_hot_statements(conn, dbname)
+            except Exception:
+                await self._pg_disconnect(conn)
+                raise
+        return conn
+
+    async def _prepare_hot_statements(
+        self,
+        conn: pgcon.PGConnection,
+        dbname: str,
+    ) -> None:
+        # Preparing the statements used the most in the database right
+        # away saves parsing them on first use, when a query is waiting
+        # for them.
+        if self._dbindex is None:
+            return
+        db = self._dbindex.maybe_get_db(dbname)
+        if db is None:
+            return
+        statements = db.get_hot_statements()
+        if not statements:
+            return
+        try:
+            prepared = await conn.prepare_statements(statements, db.dbver)
+        except pgcon_errors.BackendError as e:
+            # A concurrent schema change may have invalidated some of
+            # the statements; the connection is still usable.
+            logger.debug(
+                "could not prepare the statements of database %s: %s",
+                dbname, e,
+            )
+        else:
+            metrics.backend_prepared_statements_warmed_up.inc(
+                prepared, self._instance_name
+            )
+
     async def _pg_disconnect(self, conn: pgcon.PGConnection) -> None:
         metrics.current_backend_connections.dec(1.0, self._instance_name)
         conn.terminate()
@@ -699,10 +759,50 @@ class Tenant(ha_base.ClusterProtocol):
     def allow_database_connections(self, dbname: str) -> None:
         self._block_new_connections.discard(dbname)
 
+    async def block_database_connections(
+        self, dbname: str, conn: pgcon.PGConnection
+    ) -> bool:
+        """Block new connections to *dbname* if no one else uses it.
+
+        *conn* is a connection to the database, and the only one allowed
+        to be in use: if there are other EdgeDB connections to it on this
+        server, or backend connections running queries or transactions
+        in it on any server, the database is left unblocked and False is
+        returned.
+        """
+        assert self._dbindex is not None
+        self._block_new_connections.add(dbname)
+        if self._dbindex.count_connections(dbname) <= 1:
+            # The idle backend connections are just pooled, and the
+            # clients of the other servers get their connections from
+            # their pool for every query or transaction.
+            async with self.use_sys_pgcon() as syscon:
+                in_use = await syscon.sql_fetch_val(
+                    f"""
+                    SELECT EXISTS (
+                        SELECT
+                            pid
+                        FROM
+                            pg_stat_activity
+                        WHERE
+                            datname = $1
+                            AND pid != {conn.backend_pid}
+                            AND state IS DISTINCT FROM 'idle'
+                    )
+                    """.encode(),
+                    args=[self.get_pg_dbname(dbname).encode("utf-8")],
+                )
+            if in_use != b"\x01":
+                return True
+
+        self._block_new_connections.discard(dbname)
+        return False
+
     def is_database_connectable(self, dbname: str) -> bool:
         return (
             dbname != defines.EDGEDB_TEMPLATE_DB
             and dbname not in self._block_new_connections
+            and dbname not in self._restoring_databases
         )
 
     async def ensure_database_not_connected(self, dbname: str) -> None:
@@ -787,6 +887,30 @@ class Tenant(ha_base.ClusterProtocol):
 
         return extensions
 
+    async def _introspect_restoring(
+        self, dbname: str, conn: pgcon.PGConnection
+    ) -> None:
+        # A parallel restore commits the schema before loading the data,
+        # along with a marker that is only removed once all the data is
+        # in and the triggers are enabled again.  The marker outlives
+        # server restarts, and is seen by the other servers too.
+        restoring = await conn.sql_fetch_val(
+            b"""
+                SELECT EXISTS (
+                    SELECT
+                        key
+                    FROM
+                        edgedbinstdata.instdata
+                    WHERE
+                        key = 'restore_in_progress'
+                );
+            """,
+        )
+        if restoring == b"\x01":
+            self._restoring_databases.add(dbname)
+        else:
+            self._restoring_databases.discard(dbname)
+
     async def introspect_db(self, dbname: str) -> None:
         """Use this method to (re-)introspect a DB.
 
@@ -852,6 +976,8 @@ class Tenant(ha_base.ClusterProtocol):
             db_config_json = await self._server.introspect_db_config(conn)
 
             extensions = await self._introspect_extensions(conn)
+
+            await self._introspect_restoring(dbname, conn)
         finally:
             self.release_pgcon(dbname, conn)
 
@@ -863,6 +989,7 @@ class Tenant(ha_base.ClusterProtocol):
         db = self._dbindex.register_db(
             dbname,
             user_schema_pickle=parsed_db.user_schema_pickle,
+            user_schema_fingerprint=parsed_db.user_schema_fingerprint,
             db_config=parsed_db.database_config,
             reflection_cache=reflection_cache,
             backend_ids=backend_ids,
@@ -890,6 +1017,7 @@ class Tenant(ha_base.ClusterProtocol):
             assert self._dbindex is not None
             if not self._dbindex.has_db(dbname):
                 extensions = await self._introspect_extensions(conn)
+                await self._introspect_restoring(dbname, conn)
                 # Re-check in case we have a concurrent introspection task.
                 if not self._dbindex.has_db(dbname):
                     self._dbindex.register_db(
@@ -1144,6 +1272,7 @@ class Tenant(ha_base.ClusterProtocol):
             if self._dbindex.has_db(dbname):
                 self._dbindex.unregister_db(dbname)
             self._block_new_connections.discard(dbname)
+            self._restoring_databases.discard(dbname)
         except Exception:
             metrics.background_errors.inc(
                 1.0, self._instance_name, "on_after_drop_db"
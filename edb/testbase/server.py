@@ -994,7 +994,10 @@ class ConnectedTestCase(ClusterTestCase):
                     self.use_experimental_interpreter):
                 result = model.run_single_str_get_json(
                     self.experimental_interpreter_dbschema_and_db, query,
-                    print_asts=False)
+                    print_asts=False,
+                    evaluator=getattr(
+                        self, "experimental_interpreter_evaluator",
+                        model.TREE_WALKING_EVALUATOR))
                 res = result
                 # Uncomment this for debugging.
                 # Otherwise the error message is obscure.
@@ -0,0 +1,127 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2023-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, Tuple
+
+import decimal
+import functools
+import json
+import random
+import timeit
+
+import click
+
+from edb.server.protocol import execute
+from edb.tools.edb import edbcommands
+
+
+class _DecimalEncoder(json.JSONEncoder):
+    # The encoder of the HTTP protocols before execute.encode_json(),
+    # kept as the baseline.
+
+    def encode(self, obj):
+        if isinstance(obj, dict):
+            items = ', '.join(
+                f'{self.encode(k)}: {self.encode(v)}'
+                for (k, v) in obj.items()
+            )
+            return '{' + items + '}'
+        if isinstance(obj, list):
+            return '[' + ', '.join(map(self.encode, obj)) + ']'
+        if isinstance(obj, decimal.Decimal):
+            return f'{obj:f}'
+        return super().encode(obj)
+
+
+ENCODERS: Dict[str, Callable[[Any], str]] = {
+    'DecimalEncoder': lambda obj: json.dumps(obj, cls=_DecimalEncoder),
+    'encode_json': execute.encode_json,
+}
+
+
+def _make_payload(rows: int, *, seed: int) -> Dict[str, Any]:
+    # The variables of a bulk insert mutation, as decoded by the EdgeQL
+    # over HTTP endpoint, with Decimals for the fractional numbers.
+    rng = random.Random(seed)
+    return {
+        'items': [
+            {
+                'id': i,
+                'sku': f'SKU-{rng.randrange(10 ** 8):08d}',
+                'name': f'Product #{i} — {rng.choice("ABCDEF") * 8}',
+                'price': decimal.Decimal(
+                    f'{rng.randrange(10 ** 6)}.{rng.randrange(100):02d}'),
+                'weight': decimal.Decimal(str(rng.random())),
+                'serial': rng.getrandbits(96),
+                'in_stock': rng.random() < 0.8,
+                'discontinued_at': None,
+                'tags': [f'tag{rng.randrange(50)}' for _ in range(4)],
+                'dimensions': {
+                    'w': decimal.Decimal(str(rng.randrange(1, 10 ** 4) / 8)),
+                    'h': decimal.Decimal(str(rng.randrange(1, 10 ** 4) / 8)),
+                    'unit': 'cm',
+                },
+            }
+            for i in range(rows)
+        ],
+    }
+
+
+@edbcommands.command('bench-json-args')
+@click.option(
+    '--rows', type=int, multiple=True,
+    help='number of objects in the payload, may be specified '
+         'multiple times  [default: 1, 100, 10000]')
+@click.option(
+    '--seed', type=int, default=0, show_default=True,
+    help='random seed of the payloads')
+def bench_json_args(*, rows: Tuple[int, ...], seed: int):
+    """Benchmark the JSON encoding of EdgeQL over HTTP arguments.
+
+    Compares execute.encode_json(), which encodes the variables and the
+    globals of the HTTP protocols, with the DecimalEncoder it replaced,
+    on the variables of bulk inserts of various sizes.
+    """
+    for nrows in rows or [1, 100, 10000]:
+        payload = _make_payload(nrows, seed=seed)
+
+        outputs = {
+            name: encode(payload) for name, encode in ENCODERS.items()
+        }
+        decoded = [
+            json.loads(out, parse_float=decimal.Decimal)
+            for out in outputs.values()
+        ]
+        if any(d != decoded[0] for d in decoded):
+            raise click.ClickException(
+                f'the encoders disagree on a payload of {nrows} rows')
+
+        size = len(outputs['encode_json'])
+        print(f'{nrows} rows, {size / 1024:.1f} KiB:')
+        baseline = None
+        for name, encode in ENCODERS.items():
+            timer = timeit.Timer(functools.partial(encode, payload))
+            number, _ = timer.autorange()
+            best = min(timer.repeat(repeat=5, number=number)) / number
+            if baseline is None:
+                baseline = best
+            print(f'  {name}: {best * 1000:.3f}ms, '
+                  f'{size / best / 2 ** 20:.1f} MiB/s, '
+                  f'x{baseline / best:.2f}')
@@ -71,5 +71,7 @@ from . import gen_test_dumps  # noqa
 from . import gen_sql_introspection  # noqa
 from . import gen_rust_ast  # noqa
 from . import parser_demo  # noqa
+from . import pool_sim  # noqa
+from . import bench_json_args  # noqa
 from .profiling import cli as prof_cli  # noqa
 from .experimental_interpreter import edb_entry # noqa
@@ -0,0 +1,237 @@
+import ast
+import os
+import time
+from typing import *
+
+from .data import data_ops as e
+from .db_interface import EdgeDatabaseInterface
+from . import new_interpreter as model
+from .sqlite import sqlite_adapter
+
+
+tests_dir = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'tests')
+schemas_dir = os.path.join(tests_dir, 'schemas')
+default_test_file = os.path.join(
+    tests_dir, 'test_eval_model_new_interpreter.py')
+
+
+def find_test_datasets(names: Sequence[str]) -> List[Tuple[str, str, str]]:
+    """ returns (name, sdl file, setup file) for every test schema in
+    tests/schemas that has a setup file and whose name contains one of
+    names (case insensitive), or all of them if names is empty """
+    result: List[Tuple[str, str, str]] = []
+    for file in sorted(os.listdir(schemas_dir)):
+        if not file.endswith('.esdl'):
+            continue
+        name = file[:-len('.esdl')]
+        setup_file = os.path.join(schemas_dir, name + '_setup.edgeql')
+        if not os.path.exists(setup_file):
+            continue
+        if names and not any(n.lower() in name.lower() for n in names):
+            continue
+        result.append((name, os.path.join(schemas_dir, file), setup_file))
+    return result
+
+
+def default_module_object_types(dbschema: e.DBSchema) -> List[e.QualifiedName]:
+    return [e.QualifiedName(["default", name])
+            for (name, me) in dbschema.modules[("default",)].defs.items()
+            if isinstance(me, e.ModuleEntityTypeDef)
+            and isinstance(me.typedef, e.ObjectTp)]
+
+
+def materialize_all_objects(dbschema: e.DBSchema,
+                            db: EdgeDatabaseInterface) -> int:
+    """ loads every stored object of the default module,
+    returns the number of objects loaded """
+    count = 0
+    for tp in default_module_object_types(dbschema):
+        for id in db.query_ids_for_a_type(tp):
+            db.get_props_for_id(id)
+            count += 1
+    return count
+
+
+def project_all_properties(dbschema: e.DBSchema,
+                           db: EdgeDatabaseInterface) -> int:
+    """ projects every stored property of the default module one object
+    at a time, returns the number of projections """
+    count = 0
+    for tp in default_module_object_types(dbschema):
+        ids = db.query_ids_for_a_type(tp)
+        tp_def = dbschema.modules[("default",)].defs[tp.names[-1]]
+        assert isinstance(tp_def, e.ModuleEntityTypeDef)
+        assert isinstance(tp_def.typedef, e.ObjectTp)
+        for prop in tp_def.typedef.val.keys():
+            for id in ids:
+                if db.is_projectable(id, prop):
+                    db.project(id, prop)
+                    count += 1
+    return count
+
+
+def bench_sqlite_layout(
+    sdl_file: str, setup_file: str, layout: str, bulk_load: bool = False
+) -> Dict[str, float]:
+    with open(sdl_file) as f:
+        sdl = f.read()
+    with open(setup_file) as f:
+        setup = f.read()
+
+    start = time.perf_counter()
+    dbschema, db = model.dbschema_and_db_with_initial_schema_and_queries(
+        sdl, setup, ":memory:", sqlite_layout=layout, bulk_load=bulk_load)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    num_objects = materialize_all_objects(dbschema, db)
+    materialize_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    num_projections = project_all_properties(dbschema, db)
+    project_time = time.perf_counter() - start
+
+    db.close()
+    return {
+        "objects": num_objects,
+        "projections": num_projections,
+        "load (s)": load_time,
+        "materialize (s)": materialize_time,
+        "project (s)": project_time,
+    }
+
+
+def print_table(rows: List[Tuple[str, str, Dict[str, float]]]) -> None:
+    if not rows:
+        print("No benchmark results")
+        return
+    keys = list(rows[0][2].keys())
+    header = ["dataset", "variant", *keys]
+    print(" | ".join(f"{h:>16}" for h in header))
+    for (dataset, variant, result) in rows:
+        cols = [dataset, variant, *[
+            f"{result[k]:.4f}" if isinstance(result[k], float)
+            else str(result[k]) for k in keys]]
+        print(" | ".join(f"{c:>16}" for c in cols))
+
+
+def run_sqlite_layout_benchmark(names: Sequence[str], repeat: int = 1) -> None:
+    rows: List[Tuple[str, str, Dict[str, float]]] = []
+    for (name, sdl_file, setup_file) in find_test_datasets(names):
+        variants = [(layout, bulk_load)
+                    for layout in sqlite_adapter.STORAGE_LAYOUTS
+                    for bulk_load in (False, True)]
+        for (layout, bulk_load) in variants:
+            variant = layout + (" bulk" if bulk_load else "")
+            try:
+                results = [bench_sqlite_layout(sdl_file, setup_file, layout,
+                                               bulk_load=bulk_load)
+                           for _ in range(repeat)]
+            except Exception as ex:
+                print(f"{name} ({variant}) failed: {ex!r}")
+                continue
+            # report the best of the runs
+            rows.append((name, variant, {
+                k: min(r[k] for r in results) for k in results[0].keys()}))
+    print_table(rows)
+
+
+def find_test_queries(test_file: str) -> List[Tuple[str, str, str, List[str]]]:
+    """ returns (class name, sdl file, setup file, queries) for every test
+    class of test_file with a SCHEMA and SETUP, where queries are the literal
+    queries the tests send (e.g. through assert_query_result) """
+    with open(test_file) as f:
+        tree = ast.parse(f.read())
+    result: List[Tuple[str, str, str, List[str]]] = []
+    for cls in tree.body:
+        if not isinstance(cls, ast.ClassDef):
+            continue
+        files: Dict[str, str] = {}
+        queries: List[str] = []
+        for node in ast.walk(cls):
+            if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name)
+                    and node.targets[0].id in ("SCHEMA", "SETUP")):
+                # the file name is the last literal of os.path.join(...)
+                names = [c.value for c in ast.walk(node.value)
+                         if isinstance(c, ast.Constant)
+                         and isinstance(c.value, str)]
+                if names:
+                    files[node.targets[0].id] = os.path.join(
+                        schemas_dir, names[-1])
+            elif (isinstance(node, ast.Call)
+                    and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in ("assert_query_result", "query",
+                                           "query_single", "execute")
+                    and node.args
+                    and isinstance(node.args[0], ast.Constant)
+                    and isinstance(node.args[0].value, str)):
+                queries.append(node.args[0].value)
+        if "SCHEMA" in files and "SETUP" in files and queries:
+            result.append((cls.name, files["SCHEMA"], files["SETUP"], queries))
+    return result
+
+
+def bench_evaluator(sdl_file: str, setup_file: str, queries: Sequence[str],
+                    evaluator: str) -> Tuple[Dict[str, float], List[Any]]:
+    """ runs every query against a freshly set up in-memory database,
+    returns the timings and the result (or error class name) of each query """
+    with open(sdl_file) as f:
+        sdl = f.read()
+    with open(setup_file) as f:
+        setup = f.read()
+
+    start = time.perf_counter()
+    dbschema, db = model.dbschema_and_db_with_initial_schema_and_queries(
+        sdl, setup, evaluator=evaluator)
+    load_time = time.perf_counter() - start
+
+    state = db.dump_state()
+    outputs: List[Any] = []
+    failed = 0
+    start = time.perf_counter()
+    for query in queries:
+        try:
+            outputs.append(model.run_single_str_get_json(
+                (dbschema, db), query, evaluator=evaluator))
+        except Exception as ex:
+            outputs.append(type(ex).__name__)
+            failed += 1
+        db.restore_state(state)
+    query_time = time.perf_counter() - start
+
+    db.close()
+    return {
+        "queries": len(queries),
+        "failed": failed,
+        "load (s)": load_time,
+        "queries (s)": query_time,
+    }, outputs
+
+
+def run_evaluator_benchmark(test_file: str, repeat: int = 1) -> None:
+    rows: List[Tuple[str, str, Dict[str, float]]] = []
+    for (name, sdl_file, setup_file, queries) in find_test_queries(test_file):
+        outputs: Dict[str, List[Any]] = {}
+        for evaluator in model.EVALUATORS:
+            try:
+                runs = [
+                    bench_evaluator(sdl_file, setup_file, queries, evaluator)
+                    for _ in range(repeat)]
+            except Exception as ex:
+                print(f"{name} ({evaluator}) failed: {ex!r}")
+                continue
+            outputs[evaluator] = runs[0][1]
+            # report the best of the runs
+            rows.append((name, evaluator, {
+                k: min(r[0][k] for r in runs) for k in runs[0][0].keys()}))
+        # all evaluators must agree with the tree walking evaluator
+        reference = outputs.get(model.TREE_WALKING_EVALUATOR)
+        for (evaluator, output) in outputs.items():
+            if reference is None or evaluator == model.TREE_WALKING_EVALUATOR:
+                continue
+            for (query, expected, actual) in zip(queries, reference, output):
+                if expected != actual:
+                    print(f"{name} ({evaluator}) differs on {query.strip()!r}: "
+                          f"{actual!r} instead of {expected!r}")
+    print_table(rows)
@@ -0,0 +1,445 @@
+import itertools
+from typing import *
+
+from .data import data_ops as e
+from .data import expr_ops as eops
+from .data import module_ops as mops
+from .data import type_ops as tops
+from .data.data_ops import Expr, MultiSetVal, Val
+from .data.expr_ops import map_expand_multiset_val, val_is_ref_val
+from .data.type_ops import is_nominal_subtype_in_schema
+from .db_interface import EdgeDatabaseInterface
+from .evaluation import (
+    EvalEnv, do_conditional_dedup, eval_error, eval_order_by,
+    limit_vals, offset_vals, prefetch_projections, singular_proj)
+from .evaluation_tools.storage_coercion import coerce_to_storage
+
+# Compiles a type-checked expression into a tree of closures, so that
+# repeated evaluation (e.g. of filters and shapes for every element)
+# does not dispatch on the expression nor substitute into binder bodies.
+#
+# Instead of instantiating a binder with a fresh free variable as
+# eval_expr does, a compiled binder evaluates its body in the environment
+# extended with its bound variable, and BoundVarExpr looks the variable up.
+# The result of evaluation is identical to eval_expr.
+
+CompiledExpr = Callable[[EvalEnv, EdgeDatabaseInterface], MultiSetVal]
+CompiledBinding = Callable[
+    [EvalEnv, EdgeDatabaseInterface, MultiSetVal], MultiSetVal]
+
+
+def compile_binding(bnd: e.BindingExpr) -> CompiledBinding:
+    var = bnd.var
+    body = compile_expr(bnd.body)
+
+    def run(
+        env: EvalEnv, db: EdgeDatabaseInterface, val: MultiSetVal
+    ) -> MultiSetVal:
+        assert isinstance(val, MultiSetVal), "Expecting MultiSetVal"
+        return body({**env, var: val}, db)
+    return run
+
+
+def compile_shape(
+    shape: e.ShapeExpr,
+) -> Callable[[EvalEnv, EdgeDatabaseInterface, Val], Val]:
+    """ compiled version of evaluation.apply_shape """
+    shape_elems = [
+        (key, compile_binding(elem)) for (key, elem) in shape.shape.items()]
+
+    def run(env: EvalEnv, db: EdgeDatabaseInterface, value: Val) -> Val:
+        match value:
+            case e.RefVal(refid=id, val=dictval):
+                result: Dict[e.Label, Tuple[e.Marker, MultiSetVal]] = {}
+                for (key, (_, pval)) in dictval.val.items():
+                    if key not in shape.shape.keys():
+                        result[key] = (e.Invisible(), pval)
+                for (key, elem) in shape_elems:
+                    result[key] = (
+                        e.Visible(),
+                        elem(env, db, e.ResultMultiSetVal([value])))
+                return e.RefVal(refid=id, val=e.ObjectVal(result))
+            case _:
+                return eval_error(value, "Cannot apply shape to value")
+    return run
+
+
+def compile_expr_list(
+    exprs: Sequence[Expr],
+) -> Callable[[EvalEnv, EdgeDatabaseInterface], List[MultiSetVal]]:
+    compiled = [compile_expr(expr) for expr in exprs]
+
+    def run(env: EvalEnv, db: EdgeDatabaseInterface) -> List[MultiSetVal]:
+        return [c(env, db) for c in compiled]
+    return run
+
+
+def compile_fun_app(expr: e.FunAppExpr) -> CompiledExpr:
+    fname = expr.fun
+    idx = expr.overloading_index
+    assert idx is not None, "overloading index must be set in type checking"
+    assert isinstance(fname, e.QualifiedName), "Should resolve in type checking"
+    args = compile_expr_list(expr.args)
+    # the function (and the compiled body of a defined function)
+    # is looked up once per schema
+    resolved: List[Any] = [None, None, None]
+
+    def resolve(db: EdgeDatabaseInterface) -> Tuple[Any, Any]:
+        schema = db.get_schema()
+        if resolved[0] is not schema:
+            looked_up_fun = mops.resolve_func_name(schema, fname)[idx]
+            compiled_body = None
+            if isinstance(looked_up_fun, e.DefinedFuncDef):
+                # the body binds the arguments in order
+                vars: List[str] = []
+                body = looked_up_fun.impl
+                for _ in looked_up_fun.tp.args_mod:
+                    assert isinstance(body, e.BindingExpr)
+                    vars.append(body.var)
+                    body = body.body
+                compiled_body = (vars, compile_expr(body))
+            resolved[:] = [schema, looked_up_fun, compiled_body]
+        return resolved[1], resolved[2]
+
+    def run(env: EvalEnv, db: EdgeDatabaseInterface) -> MultiSetVal:
+        argsv = args(env, db)
+        looked_up_fun, compiled_body = resolve(db)
+        f_modifier = looked_up_fun.tp.args_mod
+        assert len(f_modifier) == len(argsv)
+        argv_final: List[List[Sequence[Val]]] = [[]]
+        for i in range(len(f_modifier)):
+            mod_i = f_modifier[i]
+            argv_i: Sequence[Val] = argsv[i].getVals()
+            match mod_i:
+                case e.ParamSingleton():
+                    argv_final = [
+                        [*cur, [new]]
+                        for cur in argv_final for new in argv_i]
+                case e.ParamOptional():
+                    if len(argv_i) == 0:
+                        argv_final = [[*cur, []] for cur in argv_final]
+                    else:
+                        argv_final = [
+                            [*cur, [new]]
+                            for cur in argv_final for new in argv_i]
+                case e.ParamSetOf():
+                    argv_final = [[*cur, argv_i] for cur in argv_final]
+                case _:
+                    raise ValueError()
+        after_fun_vals: List[Val] = []
+        if isinstance(looked_up_fun, e.BuiltinFuncDef):
+            for arg in argv_final:
+                after_fun_vals.extend(looked_up_fun.impl(arg))
+        elif isinstance(looked_up_fun, e.DefinedFuncDef):
+            (vars, body) = compiled_body
+            for vset in argv_final:
+                fun_env = dict(env)
+                for (var, arg) in zip(vars, vset, strict=True):
+                    fun_env[var] = e.ResultMultiSetVal(arg)
+                after_fun_vals.extend(body(fun_env, db).getVals())
+        else:
+            raise ValueError("Not implemented yet", looked_up_fun)
+        return e.ResultMultiSetVal(after_fun_vals)
+    return run
+
+
+def compile_filter_order(expr: e.FilterOrderExpr) -> CompiledExpr:
+    subject = compile_expr(expr.subject)
+    filter = compile_binding(expr.filter)
+    order = [(l, compile_binding(o)) for (l, o) in expr.order.items()]
+    # projections of the subject fetched in bulk, see
+    # prefetch_binder_projections
+    labels = {label for bnd in [expr.filter, *expr.order.values()]
+              for label in eops.get_binder_projection_labels(bnd)}
+
+    def run(env: EvalEnv, db: EdgeDatabaseInterface) -> MultiSetVal:
+        selected = subject(env, db)
+        batch_db = prefetch_projections(db, selected.getRawVals(), labels)
+        after_condition: List[Val] = [
+            select_i
+            for select_i in selected.getRawVals()
+            if e.BoolVal(True) in filter(
+                env, batch_db, e.ResultMultiSetVal([select_i])).getVals()]
+        orders: List[Dict[str, Val]] = [
+            {l: o(env, batch_db, e.ResultMultiSetVal([after_condition_i]))
+             for (l, o) in order}
+            for after_condition_i in after_condition]
+        after_order = eval_order_by(after_condition, orders)
+        if isinstance(selected, e.ResultMultiSetVal):
+            return e.ResultMultiSetVal(after_order)
+        else:
+            raise ValueError("Not Implemented", selected)
+    return run
+
+
+def compile_for(
+    bound_expr: Expr, next_bnd: e.BindingExpr, optional: bool
+) -> CompiledExpr:
+    bound = compile_expr(bound_expr)
+    next = compile_binding(next_bnd)
+
+    def run(env: EvalEnv, db: EdgeDatabaseInterface) -> MultiSetVal:
+        boundv = bound(env, db)
+        if optional and not boundv.getVals():
+            return next(env, db, e.ResultMultiSetVal([]))
+        result_list: List[Val] = []
+        for v in boundv.getVals():
+            result_list.extend(
+                next(env, db, e.ResultMultiSetVal([v])).getVals())
+        return e.ResultMultiSetVal(result_list)
+    return run
+
+
+def compile_expr(expr: Expr) -> CompiledExpr:
+    match expr:
+        case e.ScalarVal(_):
+            return lambda env, db: e.ResultMultiSetVal([expr])
+        case e.FreeObjectExpr():
+            return lambda env, db: e.ResultMultiSetVal(
+                [e.RefVal(e.next_id(), val=e.ObjectVal(val={}))])
+        case e.ConditionalDedupExpr(expr=inner):
+            inner_c = compile_expr(inner)
+            return lambda env, db: do_conditional_dedup(inner_c(env, db))
+        case e.InsertExpr(tname, arg):
+            assert isinstance(tname, e.QualifiedName), \
+                "Should be updated during tcking"
+            arg_c = [(k, compile_expr(v)) for (k, v) in arg.items()]
+
+            def run_insert(
+                env: EvalEnv, db: EdgeDatabaseInterface
+            ) -> MultiSetVal:
+                id = db.insert(tname, {})
+                arg_object = e.ObjectVal({
+                    e.StrLabel(k): (e.Visible(), v(env, db))
+                    for (k, v) in arg_c})
+                type_def = mops.resolve_type_name(db.get_schema(), tname)
+                if isinstance(type_def, e.ObjectTp):
+                    new_object = coerce_to_storage(
+                        arg_object, tops.get_storage_tp(type_def))
+                    db.update(id, {k: v for k, v in new_object.items()})
+                    return e.ResultMultiSetVal(
+                        [e.RefVal(id, e.ObjectVal({}))])
+                else:
+                    raise ValueError("Cannot insert into scalar types")
+            return run_insert
+        case e.FilterOrderExpr():
+            return compile_filter_order(expr)
+        case e.ShapedExprExpr(expr=subject, shape=shape):
+            subject_c = compile_expr(subject)
+            shape_c = compile_shape(shape)
+            return lambda env, db: e.ResultMultiSetVal(
+                [shape_c(env, db, v) for v in subject_c(env, db).getVals()])
+        case e.FreeVarExpr(var=name) | e.BoundVarExpr(var=name):
+            def run_var(env: EvalEnv, db: EdgeDatabaseInterface) -> MultiSetVal:
+                if name in env:
+                    return env[name]
+                else:
+                    raise ValueError("Variable not found", name)
+            return run_var
+        case e.QualifiedName(names=_):
+            return lambda env, db: e.ResultMultiSetVal(
+                [e.RefVal(id, e.ObjectVal({}))
+                 for id in db.query_ids_for_a_type(expr)])
+        case e.FunAppExpr():
+            return compile_fun_app(expr)
+        case (e.TupleProjExpr(subject=subject, label=label) |
+                e.ObjectProjExpr(subject=subject, label=label)):
+            subject_c = compile_expr(subject)
+            str_label = e.StrLabel(label)
+            return lambda env, db: e.ResultMultiSetVal(
+                [p
+                 for v in subject_c(env, db).getVals()
+                 for p in singular_proj(env, db, v, str_label).getRawVals()])
+        case e.BackLinkExpr(subject=subject, label=label):
+            subject_c = compile_expr(subject)
+
+            def run_backlink(
+                env: EvalEnv, db: EdgeDatabaseInterface
+            ) -> MultiSetVal:
+                subject_ids = [v.refid
+                               if isinstance(v, e.RefVal) else
+                               eval_error(v, "expecting references")
+                               for v in subject_c(env, db).getVals()]
+                return db.reverse_project(subject_ids, label)
+            return run_backlink
+        case e.TpIntersectExpr(subject=subject, tp=tp_name):
+            if not isinstance(tp_name, e.QualifiedName):
+                raise ValueError("Should be updated during tcking")
+            subject_c = compile_expr(subject)
+
+            def run_intersect(
+                env: EvalEnv, db: EdgeDatabaseInterface
+            ) -> MultiSetVal:
+                after_intersect: List[Val] = []
+                for v in subject_c(env, db).getVals():
+                    match v:
+                        case e.RefVal(refid=vid, val=_):
+                            if is_nominal_subtype_in_schema(
+                                db.get_schema(),
+                                db.get_type_for_an_id(vid),
+                                tp_name,
+                            ):
+                                after_intersect.append(v)
+                        case _:
+                            raise ValueError("Expecting References")
+                return e.ResultMultiSetVal(after_intersect)
+            return run_intersect
+        case e.CheckedTypeCastExpr(cast_tp=_, cast_spec=cast_spec, arg=arg):
+            arg_c = compile_expr(arg)
+            return lambda env, db: e.ResultMultiSetVal(
+                [cast_spec.cast_fun(v) for v in arg_c(env, db).getVals()])
+        case e.UnnamedTupleExpr(val=tuples):
+            tuples_c = compile_expr_list(tuples)
+            return lambda env, db: e.ResultMultiSetVal(
+                [e.UnnamedTupleVal(list(prod))
+                 for prod in itertools.product(
+                     *map_expand_multiset_val(tuples_c(env, db)))])
+        case e.NamedTupleExpr(val=tuples):
+            keys = list(tuples.keys())
+            tuples_c = compile_expr_list(list(tuples.values()))
+            return lambda env, db: e.ResultMultiSetVal(
+                [e.NamedTupleVal(
+                    {k: p for (k, p) in zip(keys, prod, strict=True)})
+                 for prod in itertools.product(
+                     *map_expand_multiset_val(tuples_c(env, db)))])
+        case e.UnionExpr(left=l, right=r):
+            l_c = compile_expr(l)
+            r_c = compile_expr(r)
+
+            def run_union(
+                env: EvalEnv, db: EdgeDatabaseInterface
+            ) -> MultiSetVal:
+                lvals = l_c(env, db)
+                rvals = r_c(env, db)
+                return e.ResultMultiSetVal(
+                    [*lvals.getVals(), *rvals.getVals()])
+            return run_union
+        case e.ArrExpr(elems=elems):
+            elems_c = compile_expr_list(elems)
+            return lambda env, db: e.ResultMultiSetVal(
+                [e.ArrVal(list(el))
+                 for el in itertools.product(
+                     *map_expand_multiset_val(elems_c(env, db)))])
+        case e.DeleteExpr(subject=subject):
+            subject_c = compile_expr(subject)
+
+            def run_delete(
+                env: EvalEnv, db: EdgeDatabaseInterface
+            ) -> MultiSetVal:
+                subjectv = subject_c(env, db)
+                if all([val_is_ref_val(v) for v in subjectv.getVals()]):
+                    for v in subjectv.getVals():
+                        db.delete(v.refid)
+                    return subjectv
+                else:
+                    return eval_error(expr, "expecting all references")
+            return run_delete
+        case e.UpdateExpr(subject=subject, shape=shape):
+            subject_c = compile_expr(subject)
+            shape_c = compile_shape(shape)
+
+            def run_update(
+                env: EvalEnv, db: EdgeDatabaseInterface
+            ) -> MultiSetVal:
+                subjectv = subject_c(env, db)
+                if all([val_is_ref_val(v) for v in subjectv.getVals()]):
+                    updated = [shape_c(env, db, v) for v in subjectv.getVals()]
+                    for u in cast(Sequence[e.RefVal], updated):
+                        full_tp = tops.dereference_var_tp(
+                            db.get_schema(), db.get_type_for_an_id(u.refid))
+                        cut_tp = {
+                            k: v for (k, v) in full_tp.val.items()
+                            if e.StrLabel(k) in u.val.val.keys()}
+                        db.update(
+                            u.refid,
+                            coerce_to_storage(u.val, e.ObjectTp(cut_tp))
+                        )
+                    return e.ResultMultiSetVal(updated)
+                else:
+                    return eval_error(expr, "expecting all references")
+            return run_update
+        case e.MultiSetExpr(expr=elems):
+            elems_c = compile_expr_list(elems)
+            return lambda env, db: e.ResultMultiSetVal(
+                [v for el in elems_c(env, db) for v in el.getVals()])
+        case e.WithExpr(bound=bound, next=next):
+            bound_c = compile_expr(bound)
+            next_c = compile_binding(next)
+            return lambda env, db: next_c(env, db, bound_c(env, db))
+        case e.OffsetLimitExpr(subject=subject, offset=offset, limit=limit):
+            subject_c = compile_expr(subject)
+            offset_c = compile_expr(offset)
+            limit_c = compile_expr(limit)
+
+            def run_offset_limit(
+                env: EvalEnv, db: EdgeDatabaseInterface
+            ) -> MultiSetVal:
+                subjectv = subject_c(env, db)
+                offsetv_m = offset_c(env, db)
+                assert len(offsetv_m.getVals()) <= 1
+                offsetv = (
+                    offsetv_m.getVals()[0]
+                    if len(offsetv_m.getVals()) == 1 else e.IntVal(0))
+                limitv_m = limit_c(env, db)
+                offseted_result = offset_vals(subjectv.getVals(), offsetv)
+                assert len(limitv_m.getVals()) <= 1
+                if len(limitv_m.getVals()) == 1:
+                    result_list = list(limit_vals(
+                        offseted_result, limitv_m.getVals()[0]))
+                else:
+                    result_list = offseted_result
+                return e.ResultMultiSetVal(result_list)
+            return run_offset_limit
+        case e.SubqueryExpr(expr=inner) | e.DetachedExpr(expr=inner):
+            return compile_expr(inner)
+        case e.LinkPropProjExpr(subject=subject, linkprop=label):
+            subject_c = compile_expr(subject)
+            link_prop_label = e.LinkPropLabel(label)
+
+            def run_link_prop_proj(
+                env: EvalEnv, db: EdgeDatabaseInterface
+            ) -> MultiSetVal:
+                subjectv = subject_c(env, db)
+                if isinstance(subjectv, e.ResultMultiSetVal):
+                    subject_vals = subjectv.getVals()
+                elif isinstance(subjectv, e.ConditionalDedupMultiSetVal):
+                    subject_vals = subjectv.getRawVals()
+                return e.ResultMultiSetVal(
+                    [p for v in subject_vals
+                     for p in singular_proj(
+                         env, db, v, link_prop_label).getVals()])
+            return run_link_prop_proj
+        case e.ForExpr(bound=bound, next=next):
+            return compile_for(bound, next, optional=False)
+        case e.IfElseExpr(then_branch=then_branch,
+                          condition=condition,
+                          else_branch=else_branch):
+            condition_c = compile_expr(condition)
+            then_c = compile_expr(then_branch)
+            else_c = compile_expr(else_branch)
+
+            def run_if_else(
+                env: EvalEnv, db: EdgeDatabaseInterface
+            ) -> MultiSetVal:
+                branches = [
+                    then_c if v == e.BoolVal(True) else
+                    else_c if v == e.BoolVal(False) else
+                    eval_error(condition, "condition must be a boolean")
+                    for v in condition_c(env, db).getVals()]
+                return e.ResultMultiSetVal(
+                    [p for branch in branches
+                     for p in branch(env, db).getVals()])
+            return run_if_else
+        case e.OptionalForExpr(bound=bound, next=next):
+            return compile_for(bound, next, optional=True)
+
+    raise ValueError("Not Implemented", expr)
+
+
+def eval_compiled_toplevel(
+    db: EdgeDatabaseInterface, compiled: CompiledExpr
+) -> MultiSetVal:
+    final_v = compiled({}, db)
+    # commit DML after evaluation
+    db.commit_dml()
+    return final_v
@@ -1,5 +1,7 @@
 from __future__ import annotations
-from typing import Dict, NamedTuple, Sequence, Tuple, Optional, Callable, List, Any
+from typing import (
+    Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple,
+)
 
 from dataclasses import dataclass
 
@@ -809,7 +811,7 @@ class DBEntry:
 
 @dataclass(frozen=True)
 class DB:
-    dbdata: Dict[int, DBEntry]
+    dbdata: Mapping[int, DBEntry]
     # subtp : Sequence[Tuple[TypeExpr, TypeExpr]]
 
 
@@ -871,6 +873,22 @@ class DBSchema:
     unchecked_subtyping_relations : Dict[QualifiedName, List[Tuple[Tuple[str, ...], RawName]]] # name -> current declared module and raw name
     casts: Dict[Tuple[Tp, Tp], TpCast] 
 
+
+# The functions that change a DBSchema in place (adding modules from SDL
+# or DDL) call schema_changed(), so that statements type checked against
+# an earlier state of a schema are not reused (see
+# new_interpreter.statement_cache).
+_schema_generation = 0
+
+
+def schema_changed() -> None:
+    global _schema_generation
+    _schema_generation += 1
+
+
+def schema_generation() -> int:
+    return _schema_generation
+
 # RT Stands for Run Time
 
 
@@ -399,6 +399,27 @@ def appears_in_expr(search: Expr, subject: Expr):
     return False
 
 
+def get_binder_projection_labels(bnd: BindingExpr) -> Sequence[str]:
+    """ returns the labels l such that the bound variable is
+    directly projected (i.e. x.l) somewhere in the body of bnd """
+    labels: List[str] = []
+
+    def map_func(candidate: Expr) -> Optional[Expr]:
+        if (isinstance(candidate, BindingExpr)
+                and candidate.var == bnd.var):
+            # the variable is shadowed, terminate search here
+            return candidate
+        match candidate:
+            case ObjectProjExpr(subject=BoundVarExpr(var=v), label=label):
+                if v == bnd.var and label not in labels:
+                    labels.append(label)
+                return candidate
+        return None
+
+    map_expr(map_func, bnd.body)
+    return labels
+
+
 def binding_is_unnamed(expr: BindingExpr) -> bool:
     return not appears_in_expr(BoundVarExpr(expr.var), expr.body)
 
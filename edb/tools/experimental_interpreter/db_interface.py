@@ -3,7 +3,8 @@ from typing import *
 from .data.expr_ops import *
 from .data.type_ops import *
 from .data.data_ops import *
-import copy
+
+import immutables
 # id class
 class EdgeDatabaseInterface:
 
@@ -26,15 +27,28 @@ class EdgeDatabaseInterface:
     def project(self, id: EdgeID, property: str) -> MultiSetVal:
         raise NotImplementedError()
 
+    # project a property/link from many objects at once
+    # ids for which the property is not projectable are omitted from the result
+    # backends should override this to fetch the projections in bulk
+    def project_many(
+        self, ids: Sequence[EdgeID], property: str
+    ) -> Dict[EdgeID, MultiSetVal]:
+        return {id: self.project(id, property)
+                for id in ids if self.is_projectable(id, property)}
+
     # get all reverse links for a given object in a set of 
     # objects, including its link properties
     # That is, return a list of ids which has a link (via the given property) 
     # to any object in the given set
-    def reverse_project(self, ids: Sequence[EdgeID], property: str) -> MultiSetVal:
+    def reverse_project(
+        self, ids: Sequence[EdgeID], property: str
+    ) -> MultiSetVal:
         raise NotImplementedError()
 
     # insert an object into the database, returns the inserted object id
-    def insert(self, tp: e.QualifiedName, props : Dict[str, MultiSetVal]) -> EdgeID:
+    def insert(
+        self, tp: e.QualifiedName, props : Dict[str, MultiSetVal]
+    ) -> EdgeID:
         raise NotImplementedError()
 
     # updates an object's properties in the database, unspecified properties are not changed
@@ -73,46 +87,75 @@ class EdgeDatabaseInterface:
     def restore_state(self, dumped_state: object) -> None:
         raise NotImplementedError()
 
+    # bulk loading: between begin_bulk_load and end_bulk_load the backend
+    # may buffer writes and defer index maintenance, as long as every read
+    # still observes all previous writes. Everything is durable after
+    # end_bulk_load.
+    # these are no-ops for backends that do not benefit from batching
+    def begin_bulk_load(self) -> None:
+        pass
+
+    def end_bulk_load(self) -> None:
+        pass
+
 
 class InMemoryEdgeDatabase(EdgeDatabaseInterface):
+    """ all state is kept in persistent maps, so that dump_state and
+    restore_state are O(1) and the dumped states share memory """
 
     def __init__(self, schema) -> None:
         super().__init__()
         self.schema = schema
-        self.db = DB({})
-        self.to_delete : List[EdgeID] = []
-        self.to_update : Dict[EdgeID, Dict[str, MultiSetVal]]= {}
-        self.to_insert = DB({})
+        self.db = DB(immutables.Map())
+        # the pending deletes are used as a set
+        self.to_delete : immutables.Map[EdgeID, None] = immutables.Map()
+        self.to_update : immutables.Map[
+            EdgeID, Dict[str, MultiSetVal]] = immutables.Map()
+        self.to_insert = DB(immutables.Map())
         self.next_id_to_return = 1
+        # indexes over the committed objects, maintained in commit_dml
+        # the inner maps are used as sets of ids
+        # type -> ids of that type
+        self.type_index : immutables.Map[
+            e.QualifiedName, immutables.Map[EdgeID, None]] = immutables.Map()
+        # (link name, target id) -> ids of the objects linking to the target
+        self.link_index : immutables.Map[
+            Tuple[str, EdgeID], immutables.Map[EdgeID, None]
+        ] = immutables.Map()
 
     def dump_state(self) -> object:
         return {
             "schema": self.schema, # assume schema is immutable
-            "db": copy.deepcopy(self.db.dbdata),
-            "to_delete": copy.deepcopy(self.to_delete),
-            "to_update": copy.deepcopy(self.to_update),
-            "to_insert": copy.deepcopy(self.to_insert),
+            "db": self.db,
+            "type_index": self.type_index,
+            "link_index": self.link_index,
+            "to_delete": self.to_delete,
+            "to_update": self.to_update,
+            "to_insert": self.to_insert,
             "next_id_to_return": self.next_id_to_return
         }
 
     def restore_state(self, dumped_state) -> None:
         self.schema = dumped_state["schema"]
-        self.db = DB(copy.copy(dumped_state["db"]))
-        self.to_delete = copy.copy(dumped_state["to_delete"])
-        self.to_update = copy.copy(dumped_state["to_update"])
-        self.to_insert = copy.copy(dumped_state["to_insert"])
+        self.db = dumped_state["db"]
+        self.type_index = dumped_state["type_index"]
+        self.link_index = dumped_state["link_index"]
+        self.to_delete = dumped_state["to_delete"]
+        self.to_update = dumped_state["to_update"]
+        self.to_insert = dumped_state["to_insert"]
         self.next_id_to_return = dumped_state["next_id_to_return"]
 
     def query_ids_for_a_type(self, tp: e.QualifiedName) -> List[EdgeID]:
-        return [id for id in self.db.dbdata.keys() if self.db.dbdata[id].tp == tp]
+        # ids are allocated in increasing order, so this is the insertion order
+        return sorted(self.type_index.get(tp, ()))
 
     def get_props_for_id(self, id: EdgeID) -> Dict[str, MultiSetVal]:
-        if id in self.db.dbdata.keys():
+        if id in self.db.dbdata:
             return self.db.dbdata[id].data
         # updates are queried before insert as we are able to update an inserted object
-        elif id in self.to_update.keys():
+        elif id in self.to_update:
             return self.to_update[id]
-        elif id in self.to_insert.dbdata.keys():
+        elif id in self.to_insert.dbdata:
             return self.to_insert.dbdata[id].data
         # updates and deletes are all in db.dbdata
         else:
@@ -120,9 +163,9 @@ class InMemoryEdgeDatabase(EdgeDatabaseInterface):
 
     
     def get_type_for_an_id(self, id: EdgeID) -> e.QualifiedName:
-        if id in self.db.dbdata.keys():
+        if id in self.db.dbdata:
             return self.db.dbdata[id].tp
-        elif id in self.to_insert.dbdata.keys():
+        elif id in self.to_insert.dbdata:
             return self.to_insert.dbdata[id].tp
         # updates and deletes are all in db or to_insert
         else:
@@ -138,60 +181,104 @@ class InMemoryEdgeDatabase(EdgeDatabaseInterface):
         else:
             raise ValueError(f"Property {prop} not found in object {id}")
 
-    def reverse_project(self, subject_ids: Sequence[EdgeID], prop: str) -> MultiSetVal:
+    def project_many(
+        self, ids: Sequence[EdgeID], prop: str
+    ) -> Dict[EdgeID, MultiSetVal]:
+        result: Dict[EdgeID, MultiSetVal] = {}
+        for id in ids:
+            props = self.get_props_for_id(id)
+            if prop in props:
+                result[id] = props[prop]
+        return result
+
+    def reverse_project(
+        self, subject_ids: Sequence[EdgeID], prop: str
+    ) -> MultiSetVal:
+        subject_id_set = set(subject_ids)
+        source_ids: Set[EdgeID] = set()
+        for subject_id in subject_id_set:
+            source_ids.update(self.link_index.get((prop, subject_id), ()))
+
         results: List[Val] = []
-        for (id, obj) in self.db.dbdata.items():
-            if prop in obj.data.keys():
-                object_vals = obj.data[prop].getVals()
-                if all(isinstance(object_val, RefVal)
-                        for object_val in object_vals):
-                    object_id_mapping = {
-                        object_val.refid: object_val.val
-                        for object_val in object_vals
-                        if isinstance(object_val, RefVal)}
-                    for (object_id,
-                            obj_linkprop_val) in object_id_mapping.items():
-                        if not all(isinstance(lbl, LinkPropLabel) for lbl in obj_linkprop_val.val.keys()):
-                            raise ValueError("Expecting only link prop vals in store")
-                        if object_id in subject_ids:
-                            results = [
-                                *results,
-                                RefVal(
-                                    refid=id,
-                                    val=obj_linkprop_val)]
+        for id in sorted(source_ids):
+            object_vals = self.db.dbdata[id].data[prop].getVals()
+            object_id_mapping = {
+                object_val.refid: object_val.val
+                for object_val in object_vals
+                if isinstance(object_val, RefVal)}
+            for (object_id,
+                    obj_linkprop_val) in object_id_mapping.items():
+                if not all(isinstance(lbl, LinkPropLabel) for lbl in obj_linkprop_val.val.keys()):
+                    raise ValueError("Expecting only link prop vals in store")
+                if object_id in subject_id_set:
+                    results.append(
+                        RefVal(
+                            refid=id,
+                            val=obj_linkprop_val))
         return e.ResultMultiSetVal(results)
 
     def delete(self, id: EdgeID) -> None:
-        self.to_delete.append(id)
+        self.to_delete = self.to_delete.set(id, None)
 
-    def insert(self, tp: e.QualifiedName, props : Dict[str, MultiSetVal]) -> EdgeID:
+    def insert(
+        self, tp: e.QualifiedName, props : Dict[str, MultiSetVal]
+    ) -> EdgeID:
         id = self.next_id()
-        self.to_insert.dbdata[id] = DBEntry(tp, props)
+        self.to_insert = DB(self.to_insert.dbdata.set(id, DBEntry(tp, props)))
         return id
 
     def update(self, id: EdgeID, props : Dict[str, MultiSetVal]) -> None:
-        self.to_update[id] = props
+        self.to_update = self.to_update.set(id, props)
     
     def commit_dml(self) -> None:
-        # updates must happen after insert because it may update inserted data
-        for (id, insert_obj) in self.to_insert.dbdata.items():
-            self.db.dbdata[id] = insert_obj
-        for (id, obj) in self.to_update.items():
-            if id not in self.db.dbdata.keys():
-                raise ValueError(f"ID {id} not found in database")
-            self.db.dbdata[id] = DBEntry(
-                tp=self.db.dbdata[id].tp,
-                data={
-                    **self.db.dbdata[id].data,
-                    **obj
-                }
-            )
-        # delete happens last, you may also delete an inserted object
-        for id in self.to_delete:
-            del self.db.dbdata[id]
-        self.to_delete = []
-        self.to_update = {}
-        self.to_insert = DB({})
+        changed_ids = {
+            *self.to_insert.dbdata.keys(),
+            *self.to_update.keys(),
+            *self.to_delete.keys(),
+        }
+        old_entries = {id: self.db.dbdata.get(id) for id in changed_ids}
+
+        # entries are never modified in place, as they are shared with
+        # dumped states
+        with self.db.dbdata.mutate() as dbdata:
+            # updates must happen after insert because it may update
+            # inserted data
+            for (id, insert_obj) in self.to_insert.dbdata.items():
+                dbdata[id] = insert_obj
+            for (id, obj) in self.to_update.items():
+                if id not in dbdata:
+                    raise ValueError(f"ID {id} not found in database")
+                dbdata[id] = DBEntry(
+                    tp=dbdata[id].tp,
+                    data={
+                        **dbdata[id].data,
+                        **obj
+                    }
+                )
+            # delete happens last, you may also delete an inserted object
+            for id in self.to_delete:
+                del dbdata[id]
+            self.db = DB(dbdata.finish())
+
+        with self.type_index.mutate() as type_index, \
+                self.link_index.mutate() as link_index:
+            for id in changed_ids:
+                old_entry = old_entries[id]
+                if old_entry is not None:
+                    index_remove(type_index, old_entry.tp, id)
+                    for key in link_index_keys(old_entry):
+                        index_remove(link_index, key, id)
+                new_entry = self.db.dbdata.get(id)
+                if new_entry is not None:
+                    index_add(type_index, new_entry.tp, id)
+                    for key in link_index_keys(new_entry):
+                        index_add(link_index, key, id)
+            self.type_index = type_index.finish()
+            self.link_index = link_index.finish()
+
+        self.to_delete = immutables.Map()
+        self.to_update = immutables.Map()
+        self.to_insert = DB(immutables.Map())
         
     def get_schema(self) -> DBSchema:
         return self.schema
@@ -203,4 +290,111 @@ class InMemoryEdgeDatabase(EdgeDatabaseInterface):
     
     def close(self) -> None:
         pass
-    
\ No newline at end of file
+    
+
+def link_index_keys(entry: DBEntry) -> Set[Tuple[str, EdgeID]]:
+    """ the (link name, target id) pairs of the links of an object,
+    a property is a link if all of its values are references """
+    keys: Set[Tuple[str, EdgeID]] = set()
+    for (prop, val) in entry.data.items():
+        vals = val.getVals()
+        if all(isinstance(v, RefVal) for v in vals):
+            keys.update((prop, v.refid) for v in vals if isinstance(v, RefVal))
+    return keys
+
+
+def index_add(index: immutables.MapMutation, key: Any, id: EdgeID) -> None:
+    index[key] = index.get(key, immutables.Map()).set(id, None)
+
+
+def index_remove(index: immutables.MapMutation, key: Any, id: EdgeID) -> None:
+    ids = index.get(key, immutables.Map())
+    if id in ids:
+        ids = ids.delete(id)
+        if len(ids) == 0:
+            del index[key]
+        else:
+            index[key] = ids
+
+
+class PrefetchedEdgeDatabase(EdgeDatabaseInterface):
+    """ A view of a database where some projections have been fetched
+    in bulk ahead of time (see project_many), all other operations are
+    forwarded to the underlying database.
+    prefetched : property -> id -> projection
+    """
+
+    def __init__(self, db: EdgeDatabaseInterface,
+                 prefetched: Dict[str, Dict[EdgeID, MultiSetVal]]) -> None:
+        super().__init__()
+        self.db = db
+        self.prefetched = prefetched
+
+    def query_ids_for_a_type(self, tp: e.QualifiedName) -> List[EdgeID]:
+        return self.db.query_ids_for_a_type(tp)
+
+    def get_type_for_an_id(self, id: EdgeID) -> e.QualifiedName:
+        return self.db.get_type_for_an_id(id)
+
+    def get_props_for_id(self, id: EdgeID) -> Dict[str, MultiSetVal]:
+        return self.db.get_props_for_id(id)
+
+    def is_projectable(self, id: EdgeID, prop: str) -> bool:
+        if id in self.prefetched.get(prop, {}):
+            return True
+        return self.db.is_projectable(id, prop)
+
+    def project(self, id: EdgeID, prop: str) -> MultiSetVal:
+        cached = self.prefetched.get(prop, {})
+        if id in cached:
+            return cached[id]
+        return self.db.project(id, prop)
+
+    def project_many(
+        self, ids: Sequence[EdgeID], prop: str
+    ) -> Dict[EdgeID, MultiSetVal]:
+        cached = self.prefetched.get(prop, {})
+        result = {id: cached[id] for id in ids if id in cached}
+        result.update(self.db.project_many(
+            [id for id in ids if id not in cached], prop))
+        return result
+
+    def reverse_project(
+        self, subject_ids: Sequence[EdgeID], prop: str
+    ) -> MultiSetVal:
+        return self.db.reverse_project(subject_ids, prop)
+
+    def insert(
+        self, tp: e.QualifiedName, props : Dict[str, MultiSetVal]
+    ) -> EdgeID:
+        return self.db.insert(tp, props)
+
+    def update(self, id: EdgeID, props : Dict[str, MultiSetVal]) -> None:
+        self.db.update(id, props)
+
+    def delete(self, id: EdgeID) -> None:
+        self.db.delete(id)
+
+    def commit_dml(self) -> None:
+        self.db.commit_dml()
+
+    def get_schema(self) -> DBSchema:
+        return self.db.get_schema()
+
+    def next_id(self) -> EdgeID:
+        return self.db.next_id()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def dump_state(self) -> object:
+        return self.db.dump_state()
+
+    def restore_state(self, dumped_state: object) -> None:
+        self.db.restore_state(dumped_state)
+
+    def begin_bulk_load(self) -> None:
+        self.db.begin_bulk_load()
+
+    def end_bulk_load(self) -> None:
+        self.db.end_bulk_load()
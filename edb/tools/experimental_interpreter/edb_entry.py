@@ -21,7 +21,21 @@ import os
               help="standard library files")
 @click.option("--trace-to-file", type=str, required=False)
 @click.option("--sqlite-file", type=str, required=False)
+@click.option("--sqlite-layout", type=click.Choice(["narrow", "wide"]),
+              required=False,
+              help="storage layout of a newly created sqlite file")
+@click.option("--bulk-load", default=False, required=False, is_flag=True,
+              help="buffer the writes of the init ql file and create the "
+              "sqlite indexes after loading it")
 @click.option("--skip-type-checking", default=False, required=False, is_flag=True)
+@click.option("--evaluator", type=click.Choice(["tree", "compiled"]),
+              default="tree",
+              help="evaluate queries by walking the expression (tree) or "
+              "by compiling it to closures first (compiled)")
+@click.option("--profile-to-file", type=str, required=False,
+              help="profile the tree evaluator, writing the per node time "
+              "in folded stack format to PATH.folded and flame graphs to "
+              "PATH.call_stack.svg and PATH.usage.svg")
 @click.option("--test", type=str, required=False, help="""specify a single name. Will search the test schema directory for esdl file containing the case insensitive specified esdl file.
 Will also load the corresponding ql file. Will turn on trace-to-file to a default html file. Will populate next ql file if it exists. 
               """
@@ -31,9 +45,12 @@ Will also load the corresponding ql file. Will turn on trace-to-file to a defaul
 @click.option("-v", "--verbose", default=False, required=False, is_flag=True)
 def interperter_entry(
         *, init_sdl_file=None, next_ql_file=None, init_ql_file=None, verbose=False,
-        trace_to_file=None, sqlite_file=None,
+        trace_to_file=None, sqlite_file=None, sqlite_layout=None,
+        bulk_load=False,
         library_ddl_files=None,
         skip_type_checking=False,
+        evaluator="tree",
+        profile_to_file=None,
         test=None, no_setup=False, 
         skip_test_confirm=False) -> None:
     
@@ -100,6 +117,10 @@ def interperter_entry(
 
 
     """ Run the experimental interpreter for EdgeQL """
+    if profile_to_file is not None and evaluator != "tree":
+        raise click.UsageError(
+            "--profile-to-file requires the tree evaluator")
+
     repl(init_sdl_file=init_sdl_file,
          init_ql_file=init_ql_file,
          next_ql_file=next_ql_file,
@@ -107,5 +128,39 @@ def interperter_entry(
          debug_print=verbose,
          trace_to_file_path=trace_to_file,
          sqlite_file=sqlite_file,
+         sqlite_layout=sqlite_layout,
          skip_type_checking=skip_type_checking,
+         evaluator=evaluator,
+         profile_to_file_path=profile_to_file,
+         bulk_load=bulk_load,
          )
+
+
+@edbcommands.command('exp-interp-bench',
+                     context_settings={
+                         "help_option_names":
+                         ["-h", "--help"]})
+@click.option("--dataset", "-d", multiple=True, type=str,
+              help="only benchmark test schemas whose name contains this "
+              "(case insensitive), may be repeated")
+@click.option("--repeat", type=int, default=1,
+              help="number of runs per variant, the best run is reported")
+@click.option("--compare", type=click.Choice(["layouts", "evaluators"]),
+              default="layouts",
+              help="compare the sqlite storage layouts on the tests/schemas "
+              "datasets, or the evaluators on the queries of a test file")
+@click.option("--test-file", type=str, required=False,
+              help="--compare evaluators only, the test file to take the "
+              "queries from "
+              "(default: tests/test_eval_model_new_interpreter.py)")
+def interpreter_bench_entry(*, dataset=(), repeat=1, compare="layouts",
+                            test_file=None) -> None:
+    """ Benchmark the experimental interpreter """
+    from . import benchmark
+    if compare == "layouts":
+        benchmark.run_sqlite_layout_benchmark(dataset, repeat=repeat)
+    else:
+        benchmark.run_evaluator_benchmark(
+            test_file if test_file is not None
+            else benchmark.default_test_file,
+            repeat=repeat)
@@ -303,8 +303,11 @@ def add_module_from_sdl_defs(
         schema: e.DBSchema,
         module_defs: str,
                          ) -> e.DBSchema:
-    name = elab_schema(schema, parse_sdl(module_defs))
-    checked_schema = tck.check_module_validity(schema, name)
+    try:
+        name = elab_schema(schema, parse_sdl(module_defs))
+        checked_schema = tck.check_module_validity(schema, name)
+    finally:
+        e.schema_changed()
     return checked_schema
 
 
@@ -26,6 +26,7 @@ from .data.expr_ops import (
 from .data.type_ops import is_nominal_subtype_in_schema
 from .db_interface import *
 from .evaluation_tools.storage_coercion import coerce_to_storage
+from .profiling import EvaluationProfile, ProfiledEdgeDatabase
 
 def eval_error(expr: Val | Expr | Sequence[Val], msg: str = "") -> Any:
     raise ValueError("Eval Error", msg, expr)
@@ -176,27 +177,81 @@ def make_invisible(val : MultiSetVal) -> MultiSetVal:
     return e.ResultMultiSetVal(result)
 
 
+def prefetch_binder_projections(
+        db: EdgeDatabaseInterface,
+        vals: Sequence[Val],
+        bnds: Sequence[BindingExpr]) -> EdgeDatabaseInterface:
+    """ Fetches, for all objects in vals at once, the properties that
+    the bodies of bnds project directly from their bound variable.
+    Returns a database that answers those projections without
+    further queries to db.
+    """
+    if len(vals) <= 1:
+        return db
+    labels = {label for bnd in bnds
+              for label in eops.get_binder_projection_labels(bnd)}
+    return prefetch_projections(db, vals, labels)
+
+
+def prefetch_projections(
+        db: EdgeDatabaseInterface,
+        vals: Sequence[Val],
+        labels: Iterable[str]) -> EdgeDatabaseInterface:
+    """ Fetches the given properties of all objects in vals at once """
+    if len(vals) <= 1:
+        return db
+    prefetched: Dict[str, Dict[EdgeID, MultiSetVal]] = {}
+    for label in labels:
+        if label == "id":
+            continue
+        ids = [v.refid for v in vals
+               if isinstance(v, RefVal)
+               and StrLabel(label) not in v.val.val.keys()]
+        if len(ids) > 1:
+            prefetched[label] = db.project_many(ids, label)
+    if len(prefetched) == 0:
+        return db
+    return PrefetchedEdgeDatabase(db, prefetched)
+
+
 class EvaluationLogsWrapper:
     def __init__(self):
         self.original_eval_expr = None
         self.reset_logs(None)
+        self.reset_profile(None)
 
     def reset_logs(self, logs: Optional[List[Any]]):
         self.logs = logs
         self.indexes: List[int] = []
 
+    def reset_profile(self, profile: Optional[EvaluationProfile]):
+        self.profile = profile
+
     def __call__(self, eval_expr: Callable[[EvalEnv, EdgeDatabaseInterface, Expr], MultiSetVal]):
         self.original_eval_expr = eval_expr
 
+        def profiled(
+            ctx: EvalEnv, db: EdgeDatabaseInterface, expr: Expr
+        ) -> MultiSetVal:
+            if self.profile is None:
+                return self.original_eval_expr(ctx, db, expr)
+            self.profile.enter(expr)
+            rt_val = None
+            try:
+                rt_val = self.original_eval_expr(ctx, db, expr)
+                return rt_val
+            finally:
+                self.profile.exit(rt_val)
+
         def wrapper(ctx: EvalEnv, db: EdgeDatabaseInterface, expr: Expr) -> MultiSetVal:
             if self.logs is None:
-                return self.original_eval_expr(ctx, db, expr)
+                return profiled(ctx, db, expr)
             else:
                 parent = self.logs
                 [parent := parent[i] for i in self.indexes]
                 self.indexes.append(len(parent))
                 parent.append([(expr, e.ResultMultiSetVal([StrVal("NOT AVAILABLE!!!")]))])
-                rt_val = self.original_eval_expr(ctx, db, expr)
+                rt_val = profiled(ctx, db, expr)
                 parent[self.indexes[-1]][0] = (parent[self.indexes[-1]][0][0],
                                                rt_val)
                 assert len(parent[self.indexes[-1]][0]) == 2
@@ -257,10 +312,13 @@ def eval_expr(ctx: EvalEnv,
         case FilterOrderExpr(subject=subject, filter=filter, order=order):
             selected = eval_expr(ctx, db, subject)
             # assume data unchaged throught the evaluation of conditions
+            # so that projections of the subject can be fetched in bulk
+            batch_db = prefetch_binder_projections(
+                db, selected.getRawVals(), [filter, *order.values()])
             conditions: Sequence[MultiSetVal] = [
                 eval_expr(
                         new_ctx,
-                        db, 
+                        batch_db,
                         filter_body)
                 for select_i in selected.getRawVals()
                 for new_ctx, filter_body in [ctx_extend(ctx, filter, e.ResultMultiSetVal([select_i]))]]
@@ -273,7 +331,8 @@ def eval_expr(ctx: EvalEnv,
                 current : Dict[str, Val] = {}
                 for (l, o) in order.items():
                     new_ctx, o_body = ctx_extend(ctx, o, e.ResultMultiSetVal([after_condition_i]))
-                    current = {**current, l: eval_expr(new_ctx, db, o_body)}
+                    current = {
+                        **current, l: eval_expr(new_ctx, batch_db, o_body)}
                 orders = [*orders, current]
             after_order = eval_order_by(after_condition, orders)
             if isinstance(selected, e.ResultMultiSetVal):
@@ -501,14 +560,25 @@ def eval_expr(ctx: EvalEnv,
     raise ValueError("Not Implemented", expr)
 
 
-def eval_expr_toplevel(db: EdgeDatabaseInterface, expr: Expr, logs: Optional[Any] = None) -> MultiSetVal:
+def eval_expr_toplevel(
+    db: EdgeDatabaseInterface,
+    expr: Expr,
+    logs: Optional[Any] = None,
+    profile: Optional[EvaluationProfile] = None,
+) -> MultiSetVal:
 
     # on exception, this is not none
     # assert eval_logs_wrapper.logs is None
     if logs is not None:
         eval_logs_wrapper.reset_logs(logs)
-
-    final_v = eval_expr({}, db, expr)
+    if profile is not None:
+        eval_logs_wrapper.reset_profile(profile)
+        db = ProfiledEdgeDatabase(db, profile)
+
+    try:
+        final_v = eval_expr({}, db, expr)
+    finally:
+        eval_logs_wrapper.reset_profile(None)
     # commit DML after evaluation
     db.commit_dml()
 
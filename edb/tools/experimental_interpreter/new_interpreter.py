@@ -8,9 +8,13 @@ import os
 from typing import *
 from typing import Tuple
 import readline
+import weakref
+from dataclasses import dataclass
 
 from edb.common import debug
+from edb.common import lru
 from edb.edgeql import ast as qlast
+from edb.edgeql import codegen as qlcodegen
 
 from .type_checking_tools import typechecking as tc
 from .back_to_ql import reverse_elab
@@ -27,8 +31,11 @@ from .data.val_to_json import (json_like, multi_set_val_to_json_like,
 from .elab_schema import add_module_from_sdl_defs, add_module_from_sdl_file
 from .elaboration import elab
 from .evaluation import RTExpr, eval_expr_toplevel
+from .compiled_evaluation import (
+    CompiledExpr, compile_expr, eval_compiled_toplevel)
 from .helper_funcs import parse_ql
 from .logs import write_logs_to_file
+from .profiling import EvaluationProfile
 from .sqlite import sqlite_adapter
 from .data import expr_to_str as pp
 from .db_interface import *
@@ -37,6 +44,36 @@ from .type_checking_tools import schema_checking as sck
 # CODE REVIEW: !!! CHECK IF THIS WILL BE SET ON EVERY RUN!!!
 # sys.setrecursionlimit(10000)
 
+# Evaluators
+# tree:     walk the expression with evaluation.eval_expr
+# compiled: compile the expression into closures once
+#           (see compiled_evaluation), evaluation logs are not recorded
+TREE_WALKING_EVALUATOR = "tree"
+COMPILED_EVALUATOR = "compiled"
+EVALUATORS = (TREE_WALKING_EVALUATOR, COMPILED_EVALUATOR)
+
+
+@dataclass
+class CompiledStatement:
+    """ the result of the front end (elaboration, type checking and
+    deduplication) for a statement, ready for evaluation """
+    # a weak reference, so that cached statements do not keep
+    # replaced schemas alive
+    dbschema: weakref.ReferenceType[DBSchema]
+    expr: Expr
+    tp: ResultTp
+    # the closures of expr, compiled on first use by the compiled evaluator
+    compiled: Optional[CompiledExpr] = None
+
+
+# like the server's compiled query cache, keyed on the normalized
+# statement text, the identity of the schema it was checked against and
+# the schema generation, which changes whenever a schema is changed in
+# place (see data_ops.schema_changed). The entry references the schema,
+# so that a reused id() is not a hit.
+STATEMENT_CACHE_SIZE = 1000
+statement_cache: lru.LRUMapping = lru.LRUMapping(maxsize=STATEMENT_CACHE_SIZE)
+
 
 
 
@@ -65,6 +102,33 @@ def default_dbschema() -> DBSchema:
     # return DBSchema({("std",): DBModule({k: e.ModuleEntityFuncDef(v) for (k,v) in all_builtin_funcs.items()})},{})
 
 
+def evaluate_toplevel(db: EdgeDatabaseInterface,
+                      expr: Expr,
+                      logs: Optional[List[Any]],
+                      evaluator: str = TREE_WALKING_EVALUATOR,
+                      profile: Optional[EvaluationProfile] = None,
+                      ) -> MultiSetVal:
+    if evaluator == TREE_WALKING_EVALUATOR:
+        return eval_expr_toplevel(db, expr, logs=logs, profile=profile)
+    elif profile is not None:
+        raise ValueError("Only the tree walking evaluator can be profiled")
+    elif evaluator == COMPILED_EVALUATOR:
+        return eval_compiled_toplevel(db, compile_expr(expr))
+    else:
+        raise ValueError(f"Unknown evaluator {evaluator}")
+
+
+def evaluate_statement(db: EdgeDatabaseInterface,
+                       stmt: CompiledStatement,
+                       logs: Optional[List[Any]],
+                       evaluator: str = TREE_WALKING_EVALUATOR,
+                       profile: Optional[EvaluationProfile] = None,
+                       ) -> MultiSetVal:
+    if evaluator == COMPILED_EVALUATOR and profile is None:
+        if stmt.compiled is None:
+            stmt.compiled = compile_expr(stmt.expr)
+        return eval_compiled_toplevel(db, stmt.compiled)
+    return evaluate_toplevel(db, stmt.expr, logs, evaluator, profile)
 
 
 def run_statement(db: EdgeDatabaseInterface,
@@ -72,8 +136,21 @@ def run_statement(db: EdgeDatabaseInterface,
                   should_print: bool,
                   logs: Optional[List[Any]],
                   skip_type_checking: bool = False,
+                  evaluator: str = TREE_WALKING_EVALUATOR,
+                  profile: Optional[EvaluationProfile] = None,
                   ) -> Tuple[MultiSetVal, e.ResultTp]:
 
+    # the front end is skipped for statements seen before, unless
+    # the intermediate steps are to be printed
+    use_cache = not should_print and not skip_type_checking
+    if use_cache:
+        cache_key = (qlcodegen.generate_source(stmt), id(dbschema),
+                     e.schema_generation())
+        cached = statement_cache.get(cache_key)
+        if cached is not None and cached.dbschema() is dbschema:
+            return (evaluate_statement(db, cached, logs, evaluator, profile),
+                    cached.tp)
+
     dbschema_ctx = e.TcCtx(dbschema, ("default",), {})
 
     if should_print:
@@ -100,7 +177,7 @@ def run_statement(db: EdgeDatabaseInterface,
     if skip_type_checking:
         if should_print:
             print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>> Running")
-        result = eval_expr_toplevel(db, factored, logs=logs)
+        result = evaluate_toplevel(db, factored, logs, evaluator, profile)
         if should_print:
             print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>> Result")
             debug.print(result)
@@ -128,7 +205,11 @@ def run_statement(db: EdgeDatabaseInterface,
         debug.dump_edgeql(reverse_elabed)
         print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>> Running")
 
-    result = eval_expr_toplevel(db, deduped, logs=logs)
+    compiled_stmt = CompiledStatement(weakref.ref(dbschema), deduped, tp)
+    if use_cache:
+        statement_cache[cache_key] = compiled_stmt
+
+    result = evaluate_statement(db, compiled_stmt, logs, evaluator, profile)
     if should_print:
         print(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>> Result")
         debug.print(pp.show_multiset_val(result))
@@ -144,17 +225,31 @@ def run_stmts(db: EdgeDatabaseInterface, stmts: Sequence[qlast.Expr],
               dbschema: DBSchema, debug_print: bool,
               logs: Optional[List[Any]],
               skip_type_checking: bool = False,
+              bulk_load: bool = False,
+              evaluator: str = TREE_WALKING_EVALUATOR,
+              profile: Optional[EvaluationProfile] = None,
               ) -> Sequence[MultiSetVal]:
+    # bulk loading lets the database batch the writes of all statements
+    if bulk_load:
+        db.begin_bulk_load()
+        try:
+            return run_stmts(db, stmts, dbschema, debug_print, logs,
+                             skip_type_checking=skip_type_checking,
+                             evaluator=evaluator, profile=profile)
+        finally:
+            db.end_bulk_load()
     match stmts:
         case []:
             return []
         case current, *rest:
             (cur_val, _) = run_statement(
                 db, current, dbschema, should_print=debug_print,
-                logs=logs, skip_type_checking=skip_type_checking)
+                logs=logs, skip_type_checking=skip_type_checking,
+                evaluator=evaluator, profile=profile)
             rest_val = run_stmts(
                 db, rest, dbschema, debug_print,
-                logs=logs, skip_type_checking=skip_type_checking)
+                logs=logs, skip_type_checking=skip_type_checking,
+                evaluator=evaluator, profile=profile)
             return [cur_val, *rest_val]
     raise ValueError("Not Possible")
 
@@ -173,12 +268,17 @@ def run_str(
     print_asts: bool = False,
     logs: Optional[List[str]] = None,
     skip_type_checking: bool = False,
+    bulk_load: bool = False,
+    evaluator: str = TREE_WALKING_EVALUATOR,
+    profile: Optional[EvaluationProfile] = None,
 ) -> Sequence[MultiSetVal]:
 
     q = parse_ql(s)
     # if print_asts:
     #     debug.dump(q)
-    res = run_stmts(db, q, dbschema, print_asts, logs, skip_type_checking=skip_type_checking)
+    res = run_stmts(db, q, dbschema, print_asts, logs,
+                    skip_type_checking=skip_type_checking, bulk_load=bulk_load,
+                    evaluator=evaluator, profile=profile)
     # if output_mode == 'pprint':
     #     pprint.pprint(res)
     # elif output_mode == 'json':
@@ -191,7 +291,8 @@ def run_str(
 def run_single_str(
     dbschema_and_db: Tuple[DBSchema, EdgeDatabaseInterface],
     s: str,
-    print_asts: bool = False
+    print_asts: bool = False,
+    evaluator: str = TREE_WALKING_EVALUATOR,
 ) -> Tuple[MultiSetVal, ResultTp]:
     q = parse_ql(s)
     if len(q) != 1:
@@ -199,17 +300,19 @@ def run_single_str(
     dbschema, db = dbschema_and_db
     (res, tp) = run_statement(
         db, q[0], dbschema, print_asts,
-        logs=None)
+        logs=None, evaluator=evaluator)
     return (res, tp)
 
 
 def run_single_str_get_json(
     dbschema_and_db: Tuple[DBSchema, EdgeDatabaseInterface],
     s: str,
-    print_asts: bool = False
+    print_asts: bool = False,
+    evaluator: str = TREE_WALKING_EVALUATOR,
 ) -> json_like:
     (res, tp) = run_single_str(dbschema_and_db,
-                                        s, print_asts=print_asts)
+                               s, print_asts=print_asts,
+                               evaluator=evaluator)
     return typed_multi_set_val_to_json_like(
                 tp, res, dbschema_and_db[0], top_level=True)
 
@@ -221,7 +324,11 @@ def repl(*, init_sdl_file=None,
          debug_print=False,
          trace_to_file_path=None,
          sqlite_file=None,
+         sqlite_layout=None,
          skip_type_checking=False,
+         evaluator=TREE_WALKING_EVALUATOR,
+         profile_to_file_path=None,
+         bulk_load=False,
          ) -> None:
     # if init_sdl_file is not None and read_sqlite_file is not None:
     #     raise ValueError("Init SDL file and Read SQLite file cannot"
@@ -232,6 +339,9 @@ def repl(*, init_sdl_file=None,
     dbschema: DBSchema 
     db: EdgeDatabaseInterface
     logs: List[Any] = []  # type: ignore[var]
+    profile: Optional[EvaluationProfile] = None
+    if profile_to_file_path is not None:
+        profile = EvaluationProfile()
 
     dbschema = default_dbschema()
     if library_ddl_files:
@@ -245,7 +355,8 @@ def repl(*, init_sdl_file=None,
                 init_sdl_file_content = f.read()
         else:
             init_sdl_file_content = None
-        (dbschema, db) = sqlite_adapter.schema_and_db_from_sqlite(init_sdl_file_content, sqlite_file)
+        (dbschema, db) = sqlite_adapter.schema_and_db_from_sqlite(
+            init_sdl_file_content, sqlite_file, dbschema, layout=sqlite_layout)
     else:
         if init_sdl_file is not None:
             dbschema = add_module_from_sdl_file(dbschema, init_sdl_file_path=init_sdl_file)
@@ -260,14 +371,16 @@ def repl(*, init_sdl_file=None,
     if init_ql_file is not None:
         initial_queries = open(init_ql_file).read()
         run_str(db, dbschema, initial_queries,
-                          print_asts=debug_print, logs=logs)
+                print_asts=debug_print, logs=logs, bulk_load=bulk_load,
+                evaluator=evaluator)
 
 
     try:
         if next_ql_file is not None:
             next_queries = open(next_ql_file).read()
             run_str(db, dbschema, next_queries,
-                            print_asts=debug_print, logs=logs)
+                    print_asts=debug_print, logs=logs,
+                    evaluator=evaluator, profile=profile)
     except Exception:
         traceback.print_exception(*sys.exc_info())
 
@@ -280,6 +393,8 @@ def repl(*, init_sdl_file=None,
     while True:
         if trace_to_file_path is not None:
             write_logs_to_file(logs, trace_to_file_path)
+        if profile is not None:
+            profile.write(profile_to_file_path)
         s = ""
         def reset_s():
             nonlocal s
@@ -306,7 +421,11 @@ def repl(*, init_sdl_file=None,
                 run_meta_cmd(db, dbschema, s)
             else:
                 res = run_str(db, dbschema, s, print_asts=debug_print,
-                                    logs=logs, skip_type_checking=skip_type_checking)
+                              logs=logs,
+                              skip_type_checking=skip_type_checking,
+                              evaluator=evaluator, profile=profile)
+                if profile is not None:
+                    profile.print_hotspots()
                 # print("\n".join(json.dumps(multi_set_val_to_json_like(v))
                 #                 for v in res))
         except Exception:
@@ -319,14 +438,21 @@ def dbschema_and_db_with_initial_schema_and_queries(
         initial_queries: str,
         sqlite_file_name: Optional[str] = None,
         debug_print=False,
-        logs: Optional[List[Any]] = None) -> Tuple[DBSchema, EdgeDatabaseInterface]:
+        logs: Optional[List[Any]] = None,
+        sqlite_layout: Optional[str] = None,
+        bulk_load: bool = False,
+        evaluator: str = TREE_WALKING_EVALUATOR,
+) -> Tuple[DBSchema, EdgeDatabaseInterface]:
     if sqlite_file_name is not None:
-        dbschema, db = sqlite_adapter.schema_and_db_from_sqlite(initial_schema_defs, sqlite_file_name)
+        dbschema, db = sqlite_adapter.schema_and_db_from_sqlite(
+            initial_schema_defs, sqlite_file_name, default_dbschema(),
+            layout=sqlite_layout)
     else:
         dbschema = add_module_from_sdl_defs(default_dbschema(), initial_schema_defs)
         db = empty_db(dbschema)
     run_str(db, dbschema, initial_queries,
-                      print_asts=debug_print, logs=logs)
+            print_asts=debug_print, logs=logs, bulk_load=bulk_load,
+            evaluator=evaluator)
     return dbschema, db
 
 
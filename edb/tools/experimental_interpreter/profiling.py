@@ -0,0 +1,242 @@
+import collections
+import pathlib
+import time
+from dataclasses import dataclass, field
+from typing import *
+
+from .data import data_ops as e
+from .data.data_ops import Expr, MultiSetVal
+from .db_interface import EdgeDatabaseInterface, EdgeID
+
+# Profiling of the tree walking evaluator. While a profile is set on the
+# evaluation logs wrapper (see evaluation.EvaluationLogsWrapper), every
+# eval_expr call records its wall time, result cardinality and the database
+# calls it made, aggregated per stack of expression nodes.
+
+# database calls counted per node
+PROFILED_DB_CALLS = ("query_ids_for_a_type", "project", "project_many",
+                     "reverse_project")
+
+
+def show_name(name: e.RawName) -> str:
+    match name:
+        case e.QualifiedName(names=names):
+            return "::".join(names)
+        case e.UnqualifiedName(name=n):
+            return n
+    raise ValueError("Unknown name", name)
+
+
+def node_label(expr: Expr) -> str:
+    """ names an expression node, flame graph tools split stacks on
+    semicolons and the count on the last space, so neither may appear """
+    match expr:
+        case e.FunAppExpr(fun=fname):
+            label = f"FunAppExpr({show_name(fname)})"
+        case e.ObjectProjExpr(label=label) | e.TupleProjExpr(label=label):
+            label = f"{type(expr).__name__}(.{label})"
+        case e.LinkPropProjExpr(linkprop=label):
+            label = f"LinkPropProjExpr(@{label})"
+        case e.BackLinkExpr(label=label):
+            label = f"BackLinkExpr(.<{label})"
+        case e.QualifiedName():
+            label = f"QualifiedName({show_name(expr)})"
+        case e.InsertExpr(name=tname):
+            label = f"InsertExpr({show_name(tname)})"
+        case _:
+            label = type(expr).__name__
+    return label.replace(";", ",").replace(" ", "")
+
+
+@dataclass
+class ProfileFrame:
+    label: str
+    start: float
+    child_time: float = 0.0
+    db_calls: Counter[str] = field(default_factory=collections.Counter)
+
+
+@dataclass
+class ProfileStats:
+    calls: int = 0
+    # including the time of the nodes below
+    total_time: float = 0.0
+    self_time: float = 0.0
+    cardinality: int = 0
+    # only the calls made by the node itself
+    db_calls: Counter[str] = field(default_factory=collections.Counter)
+
+
+class EvaluationProfile:
+
+    def __init__(self) -> None:
+        # stack of node labels (outermost first) -> stats
+        self.stacks: Dict[Tuple[str, ...], ProfileStats] = {}
+        self.frames: List[ProfileFrame] = []
+
+    def enter(self, expr: Expr) -> None:
+        self.frames.append(ProfileFrame(node_label(expr), time.perf_counter()))
+
+    def exit(self, val: Optional[MultiSetVal]) -> None:
+        """ val is None if the evaluation raised """
+        elapsed = time.perf_counter() - self.frames[-1].start
+        frame = self.frames.pop()
+        stack = (*(f.label for f in self.frames), frame.label)
+        stats = self.stacks.setdefault(stack, ProfileStats())
+        stats.calls += 1
+        stats.total_time += elapsed
+        stats.self_time += elapsed - frame.child_time
+        if val is not None:
+            stats.cardinality += len(val.getRawVals())
+        stats.db_calls.update(frame.db_calls)
+        if self.frames:
+            self.frames[-1].child_time += elapsed
+
+    def count_db_call(self, method: str) -> None:
+        if self.frames:
+            self.frames[-1].db_calls[method] += 1
+
+    def folded_stacks(self) -> List[str]:
+        """ the self time of every stack in microseconds, in the folded
+        format of flamegraph.pl, speedscope and similar tools """
+        return [f"{';'.join(stack)} {round(stats.self_time * 1e6)}"
+                for (stack, stats) in sorted(self.stacks.items())]
+
+    def hotspots(self) -> List[Tuple[str, ProfileStats]]:
+        """ the stats per node label, by decreasing self time.
+        The total time of a node evaluated inside a node with the same
+        label is only counted for the outer one """
+        by_label: Dict[str, ProfileStats] = {}
+        for (stack, stats) in self.stacks.items():
+            label = stack[-1]
+            result = by_label.setdefault(label, ProfileStats())
+            result.calls += stats.calls
+            result.self_time += stats.self_time
+            if label not in stack[:-1]:
+                result.total_time += stats.total_time
+            result.cardinality += stats.cardinality
+            result.db_calls.update(stats.db_calls)
+        return sorted(by_label.items(), key=lambda kv: kv[1].self_time,
+                      reverse=True)
+
+    def print_hotspots(self, limit: int = 20) -> None:
+        header = ["node", "calls", "self (s)", "total (s)", "cardinality",
+                  *PROFILED_DB_CALLS]
+        print(" | ".join(header))
+        for (label, stats) in self.hotspots()[:limit]:
+            print(" | ".join([
+                label, str(stats.calls), f"{stats.self_time:.4f}",
+                f"{stats.total_time:.4f}", str(stats.cardinality),
+                *[str(stats.db_calls[m]) for m in PROFILED_DB_CALLS]]))
+
+    def write_folded(self, path: Union[pathlib.Path, str]) -> None:
+        with open(path, "w") as f:
+            f.write("\n".join(self.folded_stacks()) + "\n")
+
+    def write_svg(self,
+                  call_out: Union[pathlib.Path, str],
+                  usage_out: Union[pathlib.Path, str]) -> None:
+        """ renders the flame graphs of edb perfviz, with expression
+        nodes in place of functions """
+        from edb.tools.profiling import profiler
+
+        stats: Dict[Any, Any] = {}
+        for label, node_stats in self.hotspots():
+            stats[("~", 0, label)] = [
+                node_stats.calls, node_stats.calls,
+                node_stats.self_time, node_stats.total_time, {}]
+        for (stack, node_stats) in self.stacks.items():
+            if len(stack) < 2:
+                continue
+            callers = stats[("~", 0, stack[-1])][4]
+            (cc, nc, tt, ct) = callers.get(
+                ("~", 0, stack[-2]), (0, 0, 0.0, 0.0))
+            callers[("~", 0, stack[-2])] = (
+                cc + node_stats.calls, nc + node_stats.calls,
+                tt + node_stats.self_time, ct + node_stats.total_time)
+        profiler.render_svg(
+            {k: tuple(v) for (k, v) in stats.items()}, call_out, usage_out)
+
+    def write(self, path: str) -> None:
+        """ writes path.folded, and the flame graphs
+        path.call_stack.svg and path.usage.svg when they can be rendered """
+        self.write_folded(path + ".folded")
+        try:
+            self.write_svg(path + ".call_stack.svg", path + ".usage.svg")
+        except ValueError as ve:
+            print(f"Cannot display flame graph: {ve}")
+
+
+class ProfiledEdgeDatabase(EdgeDatabaseInterface):
+    """ forwards everything to db, counting the calls of
+    PROFILED_DB_CALLS in the current node of the profile """
+
+    def __init__(self, db: EdgeDatabaseInterface,
+                 profile: EvaluationProfile) -> None:
+        super().__init__()
+        self.db = db
+        self.profile = profile
+
+    def query_ids_for_a_type(self, tp: e.QualifiedName) -> List[EdgeID]:
+        self.profile.count_db_call("query_ids_for_a_type")
+        return self.db.query_ids_for_a_type(tp)
+
+    def get_type_for_an_id(self, id: EdgeID) -> e.QualifiedName:
+        return self.db.get_type_for_an_id(id)
+
+    def get_props_for_id(self, id: EdgeID) -> Dict[str, MultiSetVal]:
+        return self.db.get_props_for_id(id)
+
+    def is_projectable(self, id: EdgeID, property: str) -> bool:
+        return self.db.is_projectable(id, property)
+
+    def project(self, id: EdgeID, property: str) -> MultiSetVal:
+        self.profile.count_db_call("project")
+        return self.db.project(id, property)
+
+    def project_many(
+        self, ids: Sequence[EdgeID], property: str
+    ) -> Dict[EdgeID, MultiSetVal]:
+        self.profile.count_db_call("project_many")
+        return self.db.project_many(ids, property)
+
+    def reverse_project(
+        self, ids: Sequence[EdgeID], property: str
+    ) -> MultiSetVal:
+        self.profile.count_db_call("reverse_project")
+        return self.db.reverse_project(ids, property)
+
+    def insert(
+        self, tp: e.QualifiedName, props : Dict[str, MultiSetVal]
+    ) -> EdgeID:
+        return self.db.insert(tp, props)
+
+    def update(self, id: EdgeID, props : Dict[str, MultiSetVal]) -> None:
+        self.db.update(id, props)
+
+    def delete(self, id: EdgeID) -> None:
+        self.db.delete(id)
+
+    def commit_dml(self) -> None:
+        self.db.commit_dml()
+
+    def get_schema(self) -> e.DBSchema:
+        return self.db.get_schema()
+
+    def next_id(self) -> EdgeID:
+        return self.db.next_id()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def dump_state(self) -> object:
+        return self.db.dump_state()
+
+    def restore_state(self, dumped_state: object) -> None:
+        self.db.restore_state(dumped_state)
+
+    def begin_bulk_load(self) -> None:
+        self.db.begin_bulk_load()
+
+    def end_bulk_load(self) -> None:
+        self.db.end_bulk_load()
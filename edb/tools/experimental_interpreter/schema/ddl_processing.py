@@ -144,5 +144,8 @@ def process_ddl(
 def process_ddls(
     schema: e.DBSchema, 
     ddls: List[qlast.DDLOperation]) -> None:
-    for ddl in ddls:
-        process_ddl(schema, ddl)
\ No newline at end of file
+    try:
+        for ddl in ddls:
+            process_ddl(schema, ddl)
+    finally:
+        e.schema_changed()
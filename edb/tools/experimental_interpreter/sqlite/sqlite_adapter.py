@@ -1,4 +1,3 @@
-
 import sqlite3
 import pickle
 from typing import List
@@ -6,6 +5,8 @@ from typing import List
 from ..db_interface import EdgeID
 
 from ..data.data_ops import *
+from ..data import data_ops as e
+from ..data import module_ops as mops
 from typing import *
 # from ..basis.built_ins import all_builtin_funcs
 from ..db_interface import EdgeDatabaseInterface
@@ -17,64 +18,240 @@ import copy
 #     return DBSchema(sqlite_dbschema, all_builtin_funcs)
 
 
+# Storage layouts
+# narrow: every property/link is stored in its own "Type.prop" table
+#         with an (id, value) layout
+# wide:   single-cardinality scalar properties of a type are stored as
+#         columns of one "Type" table (one row per object), multi properties
+#         and links are stored in "Type.prop" side tables as in narrow
+NARROW_LAYOUT = "narrow"
+WIDE_LAYOUT = "wide"
+STORAGE_LAYOUTS = (NARROW_LAYOUT, WIDE_LAYOUT)
+
+
+def type_name_to_str(tp: QualifiedName | str) -> str:
+    if isinstance(tp, QualifiedName):
+        return "::".join(tp.names)
+    return tp
+
+
+def str_to_type_name(tp: str) -> QualifiedName:
+    return QualifiedName(tp.split("::"))
+
+
+def property_type_of_val(v: Val) -> str:
+    match v:
+        case RefVal(_):
+            return "LINK"
+        case ScalarVal(tp=tp):
+            if tp == StrTp():
+                return "STRING"
+            elif tp == IntTp():
+                return "INT"
+    raise ValueError(f"Unknown type for {v}")
+
+
+def property_type_of_tp(tp: Tp) -> str:
+    match tp:
+        case NamedNominalLinkTp(_):
+            return "LINK"
+        case DefaultTp(tp=d_tp):
+            return property_type_of_tp(d_tp)
+    if tp == StrTp():
+        return "STRING"
+    elif tp == IntTp():
+        return "INT"
+    raise ValueError(f"Unknown type {tp}")
+
+
+def val_to_sql_value(v: Val) -> Any:
+    match v:
+        case RefVal(refid=refid):
+            return refid
+        case ScalarVal(val=val):
+            return val
+    raise ValueError(f"Unknown value {v}")
+
+
+def sql_value_to_val(value: Any, property_tp: str) -> Val:
+    match property_tp:
+        case "INT":
+            return IntVal(value)
+        case "STRING":
+            return StrVal(value)
+        case "LINK":
+            return RefVal(value, ObjectVal({}))
+    raise ValueError(f"Unknown property type {property_tp}")
+
+
+VALUE_COLUMNS = {
+    "INT": "int_value", "STRING": "string_value", "LINK": "link_value"}
+SQL_COLUMN_TYPES = {"INT": "INTEGER", "STRING": "TEXT", "LINK": "INTEGER"}
+
+
+class PropertyTypeCatalog:
+    """ In-memory copy of the property_types table.
+
+    table names are "Type.prop" for properties and links, and
+    "Type.prop.lp" for link properties. The catalog is loaded once
+    at connect time and kept up to date as property tables are created,
+    so that projections do not need to query property_types.
+    """
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self.property_types : Dict[str, str] = {}
+        # "Type" -> [prop], excludes link properties
+        self.type_properties : Dict[str, List[str]] = {}
+        # "Type.prop" -> {lp : property_type}
+        self.link_properties : Dict[str, Dict[str, str]] = {}
+        # "prop" -> ["Type.prop"] for link tables only
+        self.link_tables : Dict[str, List[str]] = {}
+        # "Type.prop" stored as the column prop of the wide table "Type"
+        self.wide_columns : Set[str] = set()
+        # "Type" -> [prop] for wide columns
+        self.wide_tables : Dict[str, List[str]] = {}
+
+    def load(self, cursor: sqlite3.Cursor) -> None:
+        self.clear()
+        cursor.execute("SELECT table_name, property_type FROM property_types")
+        for (table_name, property_type) in cursor.fetchall():
+            self.register(table_name, property_type)
+        cursor.execute("SELECT table_name FROM wide_columns")
+        for (table_name, ) in cursor.fetchall():
+            self.register_wide_column(table_name)
+
+    def register(self, table_name: str, property_type: str) -> None:
+        self.property_types[table_name] = property_type
+        components = table_name.split(".")
+        if len(components) == 2:
+            [tp, prop] = components
+            self.type_properties.setdefault(tp, []).append(prop)
+            if property_type == "LINK":
+                self.link_tables.setdefault(prop, []).append(table_name)
+        elif len(components) == 3:
+            [tp, prop, lp] = components
+            self.link_properties.setdefault(
+                tp + "." + prop, {})[lp] = property_type
+
+    def register_wide_column(self, table_name: str) -> None:
+        [tp, prop] = table_name.split(".")
+        self.wide_columns.add(table_name)
+        self.wide_tables.setdefault(tp, []).append(prop)
+
+    def get(self, table_name: str) -> Optional[str]:
+        return self.property_types.get(table_name)
+
+    def get_link_properties(self, tp: str, prop: str) -> Dict[str, str]:
+        return self.link_properties.get(tp + "." + prop, {})
+
+    def is_wide_column(self, tp: str, prop: str) -> bool:
+        return (tp + "." + prop) in self.wide_columns
+
+
 def compute_projection(cursor: sqlite3.Cursor,
+                       catalog: PropertyTypeCatalog,
                        id : EdgeID,
                        tp : str,
                        prop: str
                         )  -> MultiSetVal:
+    return compute_projection_many(cursor, catalog, [id], tp, prop)[id]
+
+
+# sqlite limits the number of host parameters in a single statement
+SQLITE_MAX_IN_PARAMS = 500
+
+
+def chunked_ids(ids: Sequence[EdgeID]) -> Iterator[Sequence[EdgeID]]:
+    for i in range(0, len(ids), SQLITE_MAX_IN_PARAMS):
+        yield ids[i:i + SQLITE_MAX_IN_PARAMS]
+
+
+def compute_projection_many(cursor: sqlite3.Cursor,
+                            catalog: PropertyTypeCatalog,
+                            ids : Sequence[EdgeID],
+                            tp : str,
+                            prop: str
+                            ) -> Dict[EdgeID, MultiSetVal]:
+    """ projects prop from all ids, all ids must be of type tp """
 
     table_name = f"{tp}.{prop}"
-    cursor.execute(f"SELECT property_type FROM property_types WHERE table_name=?", (table_name,))
-    property_tp_row  = cursor.fetchone()
-    if property_tp_row is None:
+    property_tp = catalog.get(table_name)
+    if property_tp is None:
         raise ValueError(f"Table {table_name} not found in database")
+    value_column = VALUE_COLUMNS.get(property_tp)
+    if value_column is None:
+        raise ValueError(f"Unknown property type {property_tp}")
+
+    rows : Dict[EdgeID, List[Any]] = {id: [] for id in ids}
+    if catalog.is_wide_column(tp, prop):
+        for chunk in chunked_ids(ids):
+            cursor.execute(
+                f"SELECT id, \"{prop}\" FROM \"{tp}\" "
+                f"WHERE id IN ({','.join(['?']*len(chunk))})",
+                chunk)
+            for (id, value) in cursor.fetchall():
+                if value is not None:
+                    rows[id].append(value)
     else:
-        property_tp = property_tp_row[0]
-        if property_tp == "INT":
-            cursor.execute(f"SELECT int_value FROM \"{table_name}\" WHERE id=?", (id,))
-            return e.ResultMultiSetVal([IntVal(row[0]) for row in cursor.fetchall()])
-        elif property_tp == "STRING":
-            cursor.execute(f"SELECT string_value FROM \"{table_name}\" WHERE id=?", (id,))
-            return e.ResultMultiSetVal([StrVal(row[0]) for row in cursor.fetchall()])
-        elif property_tp == "LINK":
-            cursor.execute(f"SELECT link_value FROM \"{table_name}\" WHERE id=?", (id,))
-            targets : List[Val]= []
-            for link_target_id_row in cursor.fetchall():
-                link_target_id = link_target_id_row[0]
-                link_source_id = id
-                link_props : Dict[Label, Tuple[Marker, MultiSetVal]]= {}
-
-                # search all possible link properties
-
-                prefix = tp + "." + prop + ".%"
-                cursor.execute("SELECT table_name FROM property_types WHERE table_name LIKE ?", (prefix,))
-
-                for link_property_table_name in [row[0] for row in cursor.fetchall()]:
-                    link_property_name = link_property_table_name.split(".")[2]
-
-                    cursor.execute(f"SELECT property_type FROM property_types WHERE table_name=?", (link_property_table_name,))
-                    link_property_tp_row  = cursor.fetchone()
-                    if link_property_tp_row is None:
-                        raise ValueError(f"Table {link_property_table_name} not found in property_types")
-                    else:
-                        link_property_tp = link_property_tp_row[0]
-                        if link_property_tp == "INT":
-                            cursor.execute(f"SELECT int_value FROM \"{link_property_table_name}\" WHERE source_id=? AND target_id=?", 
-                                            (link_source_id, link_target_id))
-                            link_props[LinkPropLabel(link_property_name)] = (Visible(), e.ResultMultiSetVal([IntVal(row[0]) for row in cursor.fetchall()]))
-                        elif link_property_tp == "STRING":
-                            cursor.execute(f"SELECT string_value FROM \"{link_property_table_name}\" WHERE source_id=? AND target_id=?",
-                                                (link_source_id, link_target_id))
-                            link_props[LinkPropLabel(link_property_name)] = (Visible(), e.ResultMultiSetVal([StrVal(row[0]) for row in cursor.fetchall()]))
-
-                targets.append(RefVal(link_target_id, ObjectVal(link_props)))
-            return e.ResultMultiSetVal(targets)
+        for chunk in chunked_ids(ids):
+            cursor.execute(
+                f"SELECT id, {value_column} FROM \"{table_name}\" "
+                f"WHERE id IN ({','.join(['?']*len(chunk))})",
+                chunk)
+            for (id, value) in cursor.fetchall():
+                rows[id].append(value)
+
+    if property_tp == "INT":
+        return {id: e.ResultMultiSetVal([IntVal(v) for v in values])
+                for (id, values) in rows.items()}
+    elif property_tp == "STRING":
+        return {id: e.ResultMultiSetVal([StrVal(v) for v in values])
+                for (id, values) in rows.items()}
+
+    # fetch all link properties of all (source, target) pairs at once
+    link_props : Dict[
+        Tuple[EdgeID, EdgeID], Dict[Label, Tuple[Marker, MultiSetVal]]
+    ] = {
+        (id, target): {}
+        for (id, targets) in rows.items() for target in targets}
+    link_properties = catalog.get_link_properties(tp, prop)
+    for (link_property_name, link_property_tp) in link_properties.items():
+        link_property_table_name = f"{tp}.{prop}.{link_property_name}"
+        if link_property_tp == "INT":
+            lp_column, lp_ctor = "int_value", IntVal
+        elif link_property_tp == "STRING":
+            lp_column, lp_ctor = "string_value", StrVal
         else:
-            raise ValueError(f"Unknown property type {property_tp}")
+            continue
+        lp_values : Dict[Tuple[EdgeID, EdgeID], List[Val]] = {
+            k: [] for k in link_props.keys()}
+        for chunk in chunked_ids(ids):
+            cursor.execute(
+                f"SELECT source_id, target_id, {lp_column} "
+                f"FROM \"{link_property_table_name}\" "
+                f"WHERE source_id IN ({','.join(['?']*len(chunk))})",
+                chunk)
+            for (source_id, target_id, value) in cursor.fetchall():
+                if (source_id, target_id) in lp_values:
+                    lp_values[(source_id, target_id)].append(lp_ctor(value))
+        for (k, values) in lp_values.items():
+            link_props[k][LinkPropLabel(link_property_name)] = (
+                Visible(), e.ResultMultiSetVal(values))
+
+    return {
+        id: e.ResultMultiSetVal(
+            [RefVal(target, ObjectVal(link_props[(id, target)]))
+             for target in targets])
+        for (id, targets) in rows.items()}
+
 
 class SQLiteEdgeDatabase(EdgeDatabaseInterface):
 
-    def __init__(self, conn: sqlite3.Connection, schema: DBSchema):
+    def __init__(self, conn: sqlite3.Connection, schema: DBSchema,
+                 layout: Optional[str] = None):
         self.conn = conn
         self.schema = schema
         self.cursor = conn.cursor()
@@ -87,11 +264,57 @@ class SQLiteEdgeDatabase(EdgeDatabaseInterface):
         self.cursor.execute("CREATE TABLE IF NOT EXISTS property_types (table_name TEXT PRIMARY KEY, property_type TEXT NOT NULL)")
         self.cursor.execute("CREATE INDEX IF NOT EXISTS property_types_idx1 ON property_types (table_name)")
         self.cursor.execute("CREATE INDEX IF NOT EXISTS property_types_idx2 ON property_types (property_type)")
-        
+        # properties (in property_types) that are stored as columns of a
+        # wide table
+        self.cursor.execute(
+            "CREATE TABLE IF NOT EXISTS wide_columns "
+            "(table_name TEXT PRIMARY KEY)")
+        self.catalog = PropertyTypeCatalog()
+        self.catalog.load(self.cursor)
+
+        # the layout is chosen when the database is created
+        self.cursor.execute(
+            "CREATE TABLE IF NOT EXISTS storage_layout "
+            "(layout TEXT NOT NULL)")
+        self.cursor.execute("SELECT layout FROM storage_layout LIMIT 1")
+        layout_row = self.cursor.fetchone()
+        if layout_row is not None:
+            self.layout = layout_row[0]
+            if layout is not None and layout != self.layout:
+                raise ValueError(
+                    f"Database uses the {self.layout} storage layout, "
+                    f"use migrate_storage_layout to convert it to {layout}")
+        else:
+            self.layout = layout if layout is not None else NARROW_LAYOUT
+            if self.layout not in STORAGE_LAYOUTS:
+                raise ValueError(f"Unknown storage layout {self.layout}")
+            self.cursor.execute(
+                "INSERT INTO storage_layout (layout) VALUES (?)",
+                (self.layout,))
+
         # deletes and updates are set on the side until commit
         # inserts are directly written to the database
         self.to_delete : List[EdgeID] = []
         self.to_update : Dict[EdgeID, Dict[str, MultiSetVal]]= {}
+        # objects inserted since the last commit_dml, with the properties
+        # written at insertion (other properties of these have no rows yet)
+        self.inserted_types : Dict[EdgeID, str] = {}
+        self.inserted_props : Dict[EdgeID, Set[str]] = {}
+        # whether objects table may contain rows with to_insert=1
+        self.has_uncommitted_objects = True
+
+        # under bulk loading (see begin_bulk_load), writes are buffered per
+        # statement and flushed with executemany before the next read
+        self.bulk_load = False
+        self.pending_objects : List[EdgeID] = []
+        self.pending_writes : Dict[str, List[Tuple[Any, ...]]] = {}
+        self.deferred_indexes : List[str] = []
+
+        # snapshots taken by dump_state are savepoints of one open
+        # transaction, innermost last. While there is any, nothing is committed
+        self.savepoints : List[str] = []
+        self.savepoint_counter = 0
+        self.changed_since_savepoint = False
 
         self.cursor.execute("CREATE TABLE IF NOT EXISTS next_id_to_return_gen (id INTEGER PRIMARY KEY)")
         self.cursor.execute("SELECT id FROM next_id_to_return_gen LIMIT 1")
@@ -102,39 +325,127 @@ class SQLiteEdgeDatabase(EdgeDatabaseInterface):
             self.cursor.execute("INSERT INTO next_id_to_return_gen (id) VALUES (?)", (101,))
         self.conn.commit() # I am not sure whether this is needed
 
+    def execute(self, sql : str, params : Sequence[Any] = ()) -> sqlite3.Cursor:
+        """ executes a statement that observes (or must be ordered after)
+        all previous writes """
+        self.flush_writes()
+        return self.cursor.execute(sql, params)
+
+    def execute_write(self, sql : str, params : Tuple[Any, ...]) -> None:
+        """ executes an insert, which is buffered under bulk loading.
+        Buffered rows are grouped by statement, so only statements
+        whose relative order does not matter may go through here """
+        if self.bulk_load:
+            self.pending_writes.setdefault(sql, []).append(params)
+        else:
+            self.cursor.execute(sql, params)
 
-    def dump_state(self) -> object:
-        self.conn.commit()
+    def create_index(self, sql : str) -> None:
+        if self.bulk_load:
+            self.deferred_indexes.append(sql)
+        else:
+            self.cursor.execute(sql)
+
+    def flush_writes(self) -> None:
+        if self.pending_objects:
+            self.cursor.executemany(
+                "INSERT INTO objects (id, tp, to_insert) VALUES (?, ?, 1)",
+                [(id, self.inserted_types[id]) for id in self.pending_objects])
+            self.cursor.execute("UPDATE next_id_to_return_gen SET id=?",
+                                (self.next_id_to_return,))
+            self.pending_objects = []
+            self.has_uncommitted_objects = True
+        if self.pending_writes:
+            pending_writes = self.pending_writes
+            self.pending_writes = {}
+            for (sql, rows) in pending_writes.items():
+                self.cursor.executemany(sql, rows)
+
+    def begin_bulk_load(self) -> None:
+        if self.bulk_load:
+            return
+        self.cursor.execute("SELECT id FROM next_id_to_return_gen LIMIT 1")
+        id_row = self.cursor.fetchone()
+        if id_row is None:
+            raise ValueError("Cannot fetch next id, check initialization")
+        self.next_id_to_return = id_row[0]
+        self.bulk_load = True
+
+    def end_bulk_load(self) -> None:
+        if not self.bulk_load:
+            return
+        self.flush_writes()
+        self.cursor.execute("UPDATE next_id_to_return_gen SET id=?",
+                            (self.next_id_to_return,))
+        self.bulk_load = False
+        for index_sql in self.deferred_indexes:
+            self.cursor.execute(index_sql)
+        self.deferred_indexes = []
+        self.commit()
+
+    def commit(self) -> None:
+        # committing would release the savepoints of dump_state
+        if not self.savepoints:
+            self.conn.commit()
 
-        dump_script = '\n'.join(self.conn.iterdump())
+    def dump_state(self) -> object:
+        """ takes a snapshot as an SQLite savepoint, so that restoring it
+        only rolls back the changes made since. The snapshot is only valid
+        for this connection, and changes are not committed to the database
+        file while a snapshot is held """
+        self.flush_writes()
+        if self.bulk_load:
+            self.cursor.execute("UPDATE next_id_to_return_gen SET id=?",
+                                (self.next_id_to_return,))
+            for index_sql in self.deferred_indexes:
+                self.cursor.execute(index_sql)
+            self.deferred_indexes = []
+
+        if not self.savepoints or self.changed_since_savepoint:
+            self.commit()
+            self.savepoint_counter += 1
+            savepoint = f"snapshot_{self.savepoint_counter}"
+            self.cursor.execute(f"SAVEPOINT \"{savepoint}\"")
+            self.savepoints.append(savepoint)
+            self.changed_since_savepoint = False
         return {
-            # "savepoint": save_point_name,
-            "dump": dump_script,
+            "savepoint": self.savepoints[-1],
             "to_delete": copy.copy(self.to_delete),
             "to_update": copy.copy(self.to_update),
         }
 
     def restore_state(self, dumped_state) -> None:
+        savepoint = dumped_state["savepoint"]
+        if savepoint not in self.savepoints:
+            raise ValueError(f"Snapshot {savepoint} is no longer available")
         self.to_delete = copy.copy(dumped_state["to_delete"])
         self.to_update = copy.copy(dumped_state["to_update"])
-
-        # Drop all tables
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = self.cursor.fetchall()
-        drop_statements = [f"DROP TABLE IF EXISTS \"{table[0]}\";" for table in tables]
-        drop_script = '\n'.join(drop_statements)
-
-        # Execute the drop script and the dump script
-        self.conn.executescript(drop_script + '\n' + dumped_state["dump"])
-
-    def query_ids_for_a_type(self, tp: str) -> List[EdgeID]:
+        self.inserted_types = {}
+        self.inserted_props = {}
+        self.has_uncommitted_objects = True
+        self.pending_objects = []
+        self.pending_writes = {}
+        self.deferred_indexes = []
+
+        # rolling back to a savepoint keeps it, but discards the ones after it
+        self.cursor.execute(f"ROLLBACK TO \"{savepoint}\"")
+        del self.savepoints[self.savepoints.index(savepoint) + 1:]
+        self.changed_since_savepoint = False
+        # tables created since the savepoint are gone as well
+        self.catalog.load(self.cursor)
+        if self.bulk_load:
+            self.cursor.execute("SELECT id FROM next_id_to_return_gen LIMIT 1")
+            self.next_id_to_return = self.cursor.fetchone()[0]
+
+    def query_ids_for_a_type(self, tp: QualifiedName | str) -> List[EdgeID]:
         # to insert is set to 1 if it is to insert, set to zero usually
         # check if type exists
-        self.cursor.execute(f"SELECT id FROM objects WHERE to_insert=0 AND tp=?", (tp,))
+        self.execute(f"SELECT id FROM objects WHERE to_insert=0 AND tp=?",
+                     (type_name_to_str(tp),))
         return [row[0] for row in self.cursor.fetchall()]
 
     def get_props_for_id(self, id: EdgeID) -> Dict[str, MultiSetVal]:
-        self.cursor.execute("SELECT tp, to_update FROM objects WHERE id=?", (id,))
+        self.execute("SELECT tp, to_insert FROM objects WHERE id=?", (id,))
         tp_row = self.cursor.fetchone()
         if tp_row is None:
             raise ValueError(f"ID {id} not found in database")
@@ -143,60 +454,93 @@ class SQLiteEdgeDatabase(EdgeDatabaseInterface):
             if to_insert == 1 and id in self.to_update.keys():
                 return self.to_update[id]
             else:
-                # select all table names that are potential candidates
-                prefix = tp + ".%"
-                self.cursor.execute("SELECT table_name FROM property_types WHERE table_name LIKE ?", (prefix,))
-                table_names = [row[0] for row in self.cursor.fetchall()]
                 result = {}
+                # single scalar properties of the wide layout are read in one go
+                wide_props = self.catalog.wide_tables.get(tp, [])
+                if wide_props:
+                    columns = ", ".join(f'"{p}"' for p in wide_props)
+                    self.cursor.execute(
+                        f"SELECT {columns} FROM \"{tp}\" WHERE id=?", (id,))
+                    wide_row = self.cursor.fetchone()
+                    if wide_row is None:
+                        wide_row = [None] * len(wide_props)
+                    for (property_name, value) in zip(wide_props, wide_row):
+                        result[property_name] = e.ResultMultiSetVal(
+                            [] if value is None else
+                            [sql_value_to_val(
+                                value,
+                                self.catalog.property_types[
+                                    tp + "." + property_name])])
                 # properties are stored in table with tp_property
                 # link properties are stored in table with tp_property_linkprop
-                for table_name in table_names:
-                    if table_name.count(".")>1:
+                for property_name in self.catalog.type_properties.get(tp, []):
+                    if property_name in result:
                         continue
-                    property_name = table_name.split(".")[1]
-                    result[property_name] = self.project(id, property_name)
+                    result[property_name] = compute_projection(
+                        self.cursor, self.catalog, id, tp, property_name)
                 return result
 
-
-                
-    def get_type_for_an_id(self, id: EdgeID) -> str:
-        self.cursor.execute("SELECT tp FROM objects WHERE id=?", (id,))
+    def get_type_str_for_an_id(self, id: EdgeID) -> str:
+        if id in self.inserted_types:
+            return self.inserted_types[id]
+        self.execute("SELECT tp FROM objects WHERE id=?", (id,))
         tp_row = self.cursor.fetchone()
         if tp_row is None:
             raise ValueError(f"ID {id} not found in database")
         else:
             return tp_row[0]
-    
+
+    def get_type_for_an_id(self, id: EdgeID) -> QualifiedName:
+        return str_to_type_name(self.get_type_str_for_an_id(id))
+
     def is_projectable(self, id: EdgeID, prop: str) -> bool:
-        tp_name = self.get_type_for_an_id(id)
-        self.cursor.execute("SELECT property_type FROM property_types WHERE table_name=?", 
-                                (tp_name + "." + prop,))
-        property_type_row = self.cursor.fetchone()
-        if property_type_row is None:
-            return False
-        else:
-            return True
-    
+        tp_name = self.get_type_str_for_an_id(id)
+        return self.catalog.get(tp_name + "." + prop) is not None
+
     def project(self, id: EdgeID, prop: str) -> MultiSetVal:
-        tp_name = self.get_type_for_an_id(id)
-        return compute_projection(self.cursor, id, tp_name, prop)
+        tp_name = self.get_type_str_for_an_id(id)
+        self.flush_writes()
+        return compute_projection(self.cursor, self.catalog, id, tp_name, prop)
+
+    def project_many(
+        self, ids: Sequence[EdgeID], prop: str
+    ) -> Dict[EdgeID, MultiSetVal]:
+        # group the objects by type so that each property table is read once
+        ids_by_tp : Dict[str, List[EdgeID]] = {}
+        for chunk in chunked_ids(ids):
+            self.execute(
+                f"SELECT id, tp FROM objects "
+                f"WHERE id IN ({','.join(['?']*len(chunk))})",
+                chunk)
+            for (id, tp) in self.cursor.fetchall():
+                ids_by_tp.setdefault(tp, []).append(id)
+
+        result : Dict[EdgeID, MultiSetVal] = {}
+        for (tp, tp_ids) in ids_by_tp.items():
+            if self.catalog.get(tp + "." + prop) is None:
+                # not projectable for objects of this type
+                continue
+            result.update(compute_projection_many(
+                self.cursor, self.catalog, tp_ids, tp, prop))
+        return result
 
     def reverse_project(self, subject_ids: Sequence[EdgeID], prop: str) -> MultiSetVal:
 
         # retrieve all link tables:
-        self.cursor.execute("SELECT table_name FROM property_types WHERE property_type='LINK' AND table_name LIKE ?", (f"%.{prop}",))
-        link_tables = [row[0] for row in self.cursor.fetchall() if row[0].count(".")==1] # do not allow link property table names
+        link_tables = self.catalog.link_tables.get(prop, [])
 
         result : List[Val] = []
         for link_table in link_tables:
-            self.cursor.execute(f"SELECT id, link_value FROM \"{link_table}\" WHERE link_value IN ({','.join(['?']*len(subject_ids))})", subject_ids)
+            self.execute(
+                f"SELECT id, link_value FROM \"{link_table}\" "
+                f"WHERE link_value IN ({','.join(['?']*len(subject_ids))})",
+                subject_ids)
             # retrive link proerty for each subject_id
             for (source_id, target_id) in [row for row in self.cursor.fetchall()]:
-                # fetch the link property table names
-                self.cursor.execute("SELECT table_name, property_type FROM property_types WHERE table_name LIKE ?", (f"{link_table}.%",))
                 link_props : Dict[Label, Tuple[Marker, MultiSetVal]]= {}
-                for (link_property_table, link_property_type) in [row for row in self.cursor.fetchall() if row[0].count(".")==2]:
-                    property_name = link_property_table.split(".")[2]
+                lp_types = self.catalog.link_properties.get(link_table, {})
+                for (property_name, link_property_type) in lp_types.items():
+                    link_property_table = f"{link_table}.{property_name}"
                     match link_property_type:
                         case "LINK":
                             raise ValueError("Link property cannot be a link property")
@@ -213,205 +557,255 @@ class SQLiteEdgeDatabase(EdgeDatabaseInterface):
 
     def delete(self, id: EdgeID) -> None:
         self.to_delete.append(id)
-    
+
+    def get_property_result_tp(
+        self, tp : str, prop : str
+    ) -> Optional[ResultTp]:
+        """ looks up the declared type of a property in the schema """
+        tp_name = str_to_type_name(tp)
+        if len(tp_name.names) < 2:
+            return None
+        try:
+            tp_def = mops.try_resolve_type_name(self.get_schema(), tp_name)
+        except ValueError:
+            return None
+        if not isinstance(tp_def, ObjectTp) or prop not in tp_def.val:
+            return None
+        return tp_def.val[prop]
+
+    def is_single_scalar_property(
+        self, tp : str, prop : str, property_tp : str
+    ) -> bool:
+        if property_tp == "LINK":
+            return False
+        result_tp = self.get_property_result_tp(tp, prop)
+        if result_tp is None:
+            return False
+        return result_tp.mode.upper == CardNumOne
+
     # this is a smarter way to figure out a type of an expression
     # by first looking at the passed in value, if the val is empty,
     # it tryies to retrieve the type from the schema
     def get_type_for_proprty(self, tp : str, prop : str, lp_prop : Optional[str], val : MultiSetVal) -> str:
-        # query the type from the database
+        # query the type from the catalog
         if lp_prop is None:
-            self.cursor.execute("SELECT property_type FROM property_types WHERE table_name=?", (tp + "." + prop,))
+            known_tp = self.catalog.get(tp + "." + prop)
         else:
-            self.cursor.execute("SELECT property_type FROM property_types WHERE table_name=?", (tp + "." + prop + "." + lp_prop,))
-        property_type_row = self.cursor.fetchone()
-        if property_type_row is not None:
-            return property_type_row[0]
+            known_tp = self.catalog.get(tp + "." + prop + "." + lp_prop)
+        if known_tp is not None:
+            return known_tp
 
         # retrive the type from the values and tp, and create appropriate table
         result_tp = None
         if len(val.getVals()) == 0:
-            schema = self.get_schema()
-            base_tp = schema.val[tp].val[prop].tp
+            base_tp = self.get_property_result_tp(tp, prop)
+            if base_tp is None:
+                raise ValueError(f"Cannot determine the type of {tp}.{prop}")
             if lp_prop is None:
-                match base_tp:
-                    case StrTp():
-                        result_tp =  "STRING"
-                    case IntTp():
-                        result_tp =  "INT"
-                    # case VarTp(_):
-                    #     result_tp =  "LINK"
-                    case NamedNominalLinkTp(_):
-                        result_tp =  "LINK"
-                    case _:
-                        raise ValueError(f"Unknown type {base_tp}")
+                result_tp = property_type_of_tp(base_tp.tp)
             else:
-                match base_tp:
+                match base_tp.tp:
                     case NamedNominalLinkTp(name=name, linkprop=link_props):
-                        match link_props.val[lp_prop].tp:
-                            case StrTp():
-                                result_tp =  "STRING"
-                            case IntTp():
-                                result_tp =  "INT"
-                            case _:
-                                raise ValueError(f"Unknown type {link_props.val[lp_prop]}")
+                        result_tp = property_type_of_tp(
+                            link_props.val[lp_prop].tp)
         else:
-            if all(isinstance(v, StrVal) for v in val.getVals()):
-                result_tp =  "STRING"
-            elif all(isinstance(v, IntVal) for v in val.getVals()):
-                result_tp =  "INT"
-            elif all(isinstance(v, RefVal) for v in val.getVals()):
-                result_tp =  "LINK"
-            else:
+            val_tps = {property_type_of_val(v) for v in val.getVals()}
+            if len(val_tps) != 1:
                 raise ValueError(f"Unknown type for {val}")
+            [result_tp] = val_tps
 
         assert result_tp is not None, "should be assigned a type"
+        self.create_property_table(tp, prop, lp_prop, result_tp)
+        return result_tp
 
+    def create_property_table(
+        self, tp : str, prop : str, lp_prop : Optional[str], result_tp : str
+    ) -> None:
         # create the table
+        # IF NOT EXISTS serves to rule out database anormalies (maybe previosu transaction was cutout in the middle)
         if lp_prop is None:
-            match result_tp:
-                case "STRING":
-                    self.cursor.execute(f"CREATE TABLE IF NOT EXISTS \"{tp}.{prop}\" (id INTEGER, string_value TEXT)") 
-                    self.cursor.execute(f"CREATE INDEX IF NOT EXISTS \"{tp}.{prop}_idx1\" ON \"{tp}.{prop}\" (id)")
-                    # IF NOT EXISTS serves to rule out database anormalies (maybe previosu transaction was cutout in the middle)
-                case "INT":
-                    self.cursor.execute(f"CREATE TABLE IF NOT EXISTS \"{tp}.{prop}\" (id INTEGER, int_value INTEGER)")
-                    self.cursor.execute(f"CREATE INDEX IF NOT EXISTS \"{tp}.{prop}_idx1\" ON \"{tp}.{prop}\" (id)")
-                case "LINK":
-                    self.cursor.execute(f"CREATE TABLE IF NOT EXISTS \"{tp}.{prop}\" (id INTEGER, link_value INTEGER)")
-                    self.cursor.execute(f"CREATE INDEX IF NOT EXISTS \"{tp}.{prop}_idx1\" ON \"{tp}.{prop}\" (id)")
-                case _:
-                    raise ValueError(f"Unknown type {result_tp}")
+            if result_tp not in VALUE_COLUMNS:
+                raise ValueError(f"Unknown type {result_tp}")
+            if (self.layout == WIDE_LAYOUT
+                    and self.is_single_scalar_property(tp, prop, result_tp)):
+                self.cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS \"{tp}\" "
+                    f"(id INTEGER PRIMARY KEY)")
+                self.cursor.execute(
+                    f"ALTER TABLE \"{tp}\" ADD COLUMN \"{prop}\" "
+                    f"{SQL_COLUMN_TYPES[result_tp]}")
+                self.cursor.execute(
+                    "INSERT INTO wide_columns (table_name) VALUES (?)",
+                    (tp + "." + prop,))
+                self.catalog.register_wide_column(tp + "." + prop)
+            else:
+                self.cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS \"{tp}.{prop}\" "
+                    f"(id INTEGER, "
+                    f"{VALUE_COLUMNS[result_tp]} "
+                    f"{SQL_COLUMN_TYPES[result_tp]})")
+                self.create_index(
+                    f"CREATE INDEX IF NOT EXISTS \"{tp}.{prop}_idx1\" "
+                    f"ON \"{tp}.{prop}\" (id)")
         else:
-            match result_tp:
-                case "STRING":
-                    self.cursor.execute(f"CREATE TABLE IF NOT EXISTS \"{tp}.{prop}.{lp_prop}\" (source_id INTEGER, target_id INTEGER, string_value TEXT)")
-                    self.cursor.execute(f"CREATE INDEX IF NOT EXISTS \"{tp}.{prop}.{lp_prop}_idx1\" ON \"{tp}.{prop}.{lp_prop}\" (source_id, target_id)")
-                case "INT":
-                    self.cursor.execute(f"CREATE TABLE IF NOT EXISTS \"{tp}.{prop}.{lp_prop}\" (source_id INTEGER, target_id INTEGER, int_value INTEGER)")
-                    self.cursor.execute(f"CREATE INDEX IF NOT EXISTS \"{tp}.{prop}.{lp_prop}_idx1\" ON \"{tp}.{prop}.{lp_prop}\" (source_id, target_id)")
-                case _:
-                    raise ValueError(f"Unknown type {result_tp}")
+            if result_tp not in ("STRING", "INT"):
+                raise ValueError(f"Unknown type {result_tp}")
+            self.cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS \"{tp}.{prop}.{lp_prop}\" "
+                f"(source_id INTEGER, target_id INTEGER, "
+                f"{VALUE_COLUMNS[result_tp]} "
+                f"{SQL_COLUMN_TYPES[result_tp]})")
+            self.create_index(
+                f"CREATE INDEX IF NOT EXISTS \"{tp}.{prop}.{lp_prop}_idx1\" "
+                f"ON \"{tp}.{prop}.{lp_prop}\" (source_id, target_id)")
 
         # insert into the property_types table
         if lp_prop is None:
-            self.cursor.execute("INSERT INTO property_types (table_name, property_type) VALUES (?, ?)", (tp + "." + prop, result_tp))
+            table_name = tp + "." + prop
         else:
-            self.cursor.execute("INSERT INTO property_types (table_name, property_type) VALUES (?, ?)", (tp + "." + prop + "." + lp_prop, result_tp))
-
-        return result_tp
-
-
-
-
-    def insert(self, tp: str, props : Dict[str, MultiSetVal]) -> EdgeID:
+            table_name = tp + "." + prop + "." + lp_prop
+        self.cursor.execute(
+            "INSERT INTO property_types (table_name, property_type) "
+            "VALUES (?, ?)",
+            (table_name, result_tp))
+        self.catalog.register(table_name, result_tp)
+
+    def write_property(self, id: EdgeID, tp : str, prop : str,
+                       val : MultiSetVal, replace : bool) -> None:
+        """ writes the value of a property/link (and its link properties),
+        replacing the existing value if replace is set """
+        prop_tp_str = self.get_type_for_proprty(tp, prop, None, val)
+        for v in val.getVals():
+            if property_type_of_val(v) != prop_tp_str:
+                raise ValueError("type mismatch", tp, prop, v)
+
+        if self.catalog.is_wide_column(tp, prop):
+            if len(val.getVals()) > 1:
+                raise ValueError(
+                    f"Expecting at most one value for {tp}.{prop}", val)
+            value = (
+                val_to_sql_value(val.getVals()[0]) if val.getVals() else None)
+            # under bulk loading, all row creations of a batch run before
+            # its column updates, and updates of a column keep their order
+            self.execute_write(
+                f"INSERT OR IGNORE INTO \"{tp}\" (id) VALUES (?)", (id,))
+            self.execute_write(
+                f"UPDATE \"{tp}\" SET \"{prop}\"=? WHERE id=?", (value, id))
+            return
+
+        if replace:
+            self.execute(f"DELETE FROM \"{tp}.{prop}\" WHERE id=?", (id,))
+        for v in val.getVals():
+            self.execute_write(
+                f"INSERT INTO \"{tp}.{prop}\" "
+                f"(id, {VALUE_COLUMNS[prop_tp_str]}) VALUES (?, ?)",
+                (id, val_to_sql_value(v)))
+            if isinstance(v, RefVal):
+                # replace all link properties
+                for (lp_name, (_, lp_val)) in v.val.val.items():
+                    lp_prop_tp_str = self.get_type_for_proprty(
+                        tp, prop, lp_name.label, lp_val)
+                    if replace:
+                        self.execute(
+                            f"DELETE FROM \"{tp}.{prop}.{lp_name.label}\" "
+                            f"WHERE source_id=? AND target_id=?",
+                            (id, v.refid))
+                    for lp_v in lp_val.getVals():
+                        if property_type_of_val(lp_v) != lp_prop_tp_str:
+                            raise ValueError(
+                                "type mismatch", tp, prop, lp_name, lp_v)
+                        self.execute_write(
+                            f"INSERT INTO \"{tp}.{prop}.{lp_name.label}\" "
+                            f"(source_id, target_id, "
+                            f"{VALUE_COLUMNS[lp_prop_tp_str]}) "
+                            f"VALUES (?, ?, ?)",
+                            (id, v.refid, val_to_sql_value(lp_v)))
+
+    def insert(
+        self, tp: QualifiedName | str, props : Dict[str, MultiSetVal]
+    ) -> EdgeID:
+        tp = type_name_to_str(tp)
         id = self.next_id()
         # insert the object into the objects table
-        self.cursor.execute("INSERT INTO objects (id, tp, to_insert) VALUES (?, ?, ?)", (id, tp, 1))
+        if self.bulk_load:
+            self.pending_objects.append(id)
+        else:
+            self.cursor.execute("INSERT INTO objects (id, tp, to_insert) VALUES (?, ?, ?)", (id, tp, 1))
+            self.has_uncommitted_objects = True
+        self.inserted_types[id] = tp
+        self.inserted_props[id] = set(props.keys())
+        self.changed_since_savepoint = True
 
         for (prop, val) in props.items():
+            self.write_property(id, tp, prop, val, replace=False)
 
-            target_table_tp = self.get_type_for_proprty(tp, prop, None, val)
-            
-            # insert the property value
-            for v in val.getVals():
-                match v:
-                    case StrVal(s):
-                        self.cursor.execute(f"INSERT INTO \"{tp}.{prop}\" (id, string_value) VALUES (?, ?)", (id, s))
-                    case IntVal(i):
-                        self.cursor.execute(f"INSERT INTO \"{tp}.{prop}\" (id, int_value) VALUES (?, ?)", (id, i))
-                    case RefVal(refid, linkprop):
-                        # insert the link property table if it does not exist
-                        for (lp_name, (_, val)) in linkprop.val.items():
-                            lp_tp = self.get_type_for_proprty(tp, prop, lp_name.label, val)
-
-                            # insert the link property value
-                            for v in val.getVals():
-                                match v:
-                                    case StrVal(s):
-                                        self.cursor.execute(f"INSERT INTO {tp}.{prop}.{lp_name.label} (source_id, target_id, string_value) VALUES (?, ?, ?)", (id, refid, v))
-                                    case IntVal(i):
-                                        self.cursor.execute(f"INSERT INTO {tp}.{prop}.{lp_name.label} (source_id, target_id, int_value) VALUES (?, ?, ?)", (id, refid, v))
-                                    case _:
-                                        raise ValueError(f"Unknown value {v}")
-                    case _:
-                        raise ValueError(f"Unknown type {v}")
-
-
-
-
-
-
-        
         return id
 
     def update(self, id: EdgeID, props : Dict[str, MultiSetVal]) -> None:
         self.to_update[id] = props
-    
+
     def commit_dml(self) -> None:
-        # make insert permanent
-        self.cursor.execute("UPDATE objects SET to_insert=0 WHERE to_insert=1")
+        # make insert permanent, objects still buffered are written as committed
+        if self.pending_objects:
+            for id in self.pending_objects:
+                self.execute_write(
+                    "INSERT INTO objects (id, tp, to_insert) VALUES (?, ?, 0)",
+                    (id, self.inserted_types[id]))
+            self.pending_objects = []
+        if self.has_uncommitted_objects:
+            self.execute("UPDATE objects SET to_insert=0 WHERE to_insert=1")
+            self.has_uncommitted_objects = False
 
         # perform the updates
         for (id, props) in self.to_update.items():
-            tp = self.get_type_for_an_id(id)
+            tp = self.get_type_str_for_an_id(id)
             for (prop_name, prop_val) in props.items():
-                prop_tp_str = self.get_type_for_proprty(tp, prop_name, None, prop_val)
-                match prop_tp_str:
-                    case "STRING":
-                        self.cursor.execute(f"DELETE FROM \"{tp}.{prop_name}\" WHERE id=?", (id,))
-                        for v in prop_val.getVals():
-                            assert isinstance(v, StrVal), "type mismatch"
-                            self.cursor.execute(f"INSERT INTO \"{tp}.{prop_name}\" VALUES (?, ?)", (id, v.val))
-                    case "INT":
-                        self.cursor.execute(f"DELETE FROM \"{tp}.{prop_name}\" WHERE id=?", (id,))
-                        for v in prop_val.getVals():
-                            assert isinstance(v, IntVal), "type mismatch"
-                            self.cursor.execute(f"INSERT INTO \"{tp}.{prop_name}\" VALUES (?, ?)", (id, v.val))
-                    case "LINK":
-                        self.cursor.execute(f"DELETE FROM \"{tp}.{prop_name}\" WHERE id=?", (id,))
-                        for v in prop_val.getVals():
-                            assert isinstance(v, RefVal), "type mismatch"
-                            self.cursor.execute(f"INSERT INTO \"{tp}.{prop_name}\" VALUES (?, ?)", (id, v.refid))
-                            # replace all link properties
-                            for (lp_name, (_, lp_val)) in v.val.val.items():
-                                lp_prop_tp_str = self.get_type_for_proprty(tp, prop_name, lp_name.label, lp_val)
-                                self.cursor.execute(f"DELETE FROM \"{tp}.{prop_name}.{lp_name.label}\" WHERE source_id=? AND target_id=?", (id, v.refid))
-                                match lp_prop_tp_str:
-                                    case "STRING":
-                                        for lp_v in lp_val.getVals():
-                                            assert isinstance(lp_v, StrVal), "type mismatch"
-                                            self.cursor.execute(f"INSERT INTO \"{tp}.{prop_name}.{lp_name.label}\" (source_id, target_id, string_value) VALUES (?, ?, ?)", (id, v.refid, lp_v.val))
-                                    case "INT":
-                                        for lp_v in lp_val.getVals():
-                                            assert isinstance(lp_v, IntVal), "type mismatch"
-                                            self.cursor.execute(f"INSERT INTO \"{tp}.{prop_name}.{lp_name.label}\" (source_id, target_id, int_value) VALUES (?, ?, ?)", (id, v.refid, lp_v.val))
-                                    case _:
-                                        raise ValueError(f"Unknown type {lp_v}")
+                # objects inserted in this transaction only have rows
+                # for the properties given at insertion
+                replace = (id not in self.inserted_props
+                           or prop_name in self.inserted_props[id])
+                self.write_property(
+                    id, tp, prop_name, prop_val, replace=replace)
 
         # delete objects
         for id in self.to_delete:
-            self.cursor.execute("DELETE FROM objects WHERE id=?", (id,))
+            self.execute("DELETE FROM objects WHERE id=?", (id,))
             # delete all properties and links
-            self.cursor.execute(f"SELECT table_name FROM property_types")
-            for (table_name, ) in self.cursor.fetchall():
-                if table_name.count(".") == 1:
+            for wide_table in self.catalog.wide_tables.keys():
+                self.cursor.execute(
+                    f"DELETE FROM \"{wide_table}\" WHERE id=?", (id,))
+            for table_name in list(self.catalog.property_types.keys()):
+                if table_name in self.catalog.wide_columns:
+                    continue
+                elif table_name.count(".") == 1:
                     # it is a property table
                     self.cursor.execute(f"DELETE FROM \"{table_name}\" WHERE id=?", (id,))
                 elif table_name.count(".") == 2:
                     # it is a link proeprty table
                     self.cursor.execute(f"DELETE FROM \"{table_name}\" WHERE source_id=? OR target_id=?", (id, id,))
 
-            
-        self.conn.commit() # do not commit as this may interfere with ROLLBACK, todo: figure out how to do proper checkpointing
+        self.changed_since_savepoint = True
+        # under bulk loading, everything is committed in end_bulk_load, and
+        # commit() leaves the savepoints of dump_state open
+        if not self.bulk_load:
+            self.commit()
         self.to_delete = []
         self.to_update = {}
         self.to_insert = DB({})
-        
+        self.inserted_types = {}
+        self.inserted_props = {}
+
     def get_schema(self) -> DBSchema:
         return self.schema
-    
+
     def next_id(self) -> EdgeID:
         ## XXX: This is not thread safe
+        self.changed_since_savepoint = True
+        if self.bulk_load:
+            # written back when the inserted objects are flushed
+            id = self.next_id_to_return
+            self.next_id_to_return += 1
+            return id
         self.cursor.execute("SELECT id FROM next_id_to_return_gen LIMIT 1")
         id_row = self.cursor.fetchone()
         if id_row is None:
@@ -419,18 +813,66 @@ class SQLiteEdgeDatabase(EdgeDatabaseInterface):
         id = id_row[0]
         self.cursor.execute("UPDATE next_id_to_return_gen SET id = id + 1")
         return id
-    
+
     def close(self) -> None:
+        self.end_bulk_load()
+        self.savepoints = []
+        self.commit()
         self.conn.close()
-    
-
-    
-
 
-    
 
-
-def schema_and_db_from_sqlite(sdl_file_content, sqlite_file_name):
+def migrate_storage_layout(db: SQLiteEdgeDatabase, layout: str) -> None:
+    """ Rewrites all committed objects of db in the given storage layout """
+    if layout not in STORAGE_LAYOUTS:
+        raise ValueError(f"Unknown storage layout {layout}")
+    if layout == db.layout:
+        return
+    if db.savepoints:
+        # the rewrite could not be committed, and restoring a snapshot
+        # would bring back the tables of the old layout
+        raise ValueError("Cannot migrate the storage layout while "
+                         "a snapshot is held")
+    db.commit_dml()
+    db.flush_writes()
+
+    # read everything in the current layout
+    db.cursor.execute("SELECT id, tp FROM objects WHERE to_insert=0")
+    ids_by_tp : Dict[str, List[EdgeID]] = {}
+    for (id, tp) in db.cursor.fetchall():
+        ids_by_tp.setdefault(tp, []).append(id)
+    contents : Dict[str, Dict[str, Dict[EdgeID, MultiSetVal]]] = {
+        tp: {prop: compute_projection_many(db.cursor, db.catalog, ids, tp, prop)
+             for prop in db.catalog.type_properties.get(tp, [])}
+        for (tp, ids) in ids_by_tp.items()}
+
+    old_property_types = dict(db.catalog.property_types)
+
+    # drop all property tables
+    for table_name in [*db.catalog.property_types.keys(),
+                       *db.catalog.wide_tables.keys()]:
+        if table_name not in db.catalog.wide_columns:
+            db.cursor.execute(f"DROP TABLE IF EXISTS \"{table_name}\"")
+    db.cursor.execute("DELETE FROM property_types")
+    db.cursor.execute("DELETE FROM wide_columns")
+    db.cursor.execute("UPDATE storage_layout SET layout=?", (layout,))
+    db.catalog.clear()
+    db.layout = layout
+
+    # and write them back in the new layout
+    for (table_name, property_type) in old_property_types.items():
+        [tp, prop, *lp_prop] = table_name.split(".")
+        db.create_property_table(
+            tp, prop, lp_prop[0] if lp_prop else None, property_type)
+    for (tp, props) in contents.items():
+        for (prop, vals) in props.items():
+            for (id, val) in vals.items():
+                db.write_property(id, tp, prop, val, replace=False)
+    db.commit()
+
+
+def schema_and_db_from_sqlite(sdl_file_content, sqlite_file_name,
+                              base_dbschema: DBSchema,
+                              layout: Optional[str] = None):
     # Connect to the SQLite database
     conn = sqlite3.connect(sqlite_file_name)
     c = conn.cursor()
@@ -458,7 +900,7 @@ def schema_and_db_from_sqlite(sdl_file_content, sqlite_file_name):
 
         # Read and store the content into sdl_schema table
         c.execute("INSERT INTO sdl_schema (content) VALUES (?)", (content,))
-        dbschema = add_module_from_sdl_defs(content)
+        dbschema = add_module_from_sdl_defs(base_dbschema, content)
 
         # Commit the changes
         conn.commit()
@@ -472,13 +914,11 @@ def schema_and_db_from_sqlite(sdl_file_content, sqlite_file_name):
         if db_sdl != sdl_content:
             raise ValueError("Passed in SDL file differs from SQLite Schema.", sdl_content, db_sdl)
 
-        dbschema = add_module_from_sdl_defs(db_sdl)
+        dbschema = add_module_from_sdl_defs(base_dbschema, db_sdl)
 
     # Unpickle the objects
     # dbschema_val = pickle.loads(dbschema_bytes)
     # dbschema = sqlite_dbschema(dbschema_val)
 
-    db = SQLiteEdgeDatabase(conn, dbschema)
+    db = SQLiteEdgeDatabase(conn, dbschema, layout=layout)
     return dbschema, db
-
-
@@ -218,4 +218,5 @@ def re_populate_module_inheritance(dbschema: e.DBSchema, module_name : Tuple[str
     inheritance_populate.module_inheritance_populate(dbschema, module_name)
     dbschema.modules[module_name] = dbschema.unchecked_modules[module_name]
     del dbschema.unchecked_modules[module_name]
+    e.schema_changed()
 
@@ -0,0 +1,163 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2023-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from __future__ import annotations
+
+import json
+import sys
+
+import click
+
+from edb.server.connpool import pool as pool_impl
+from edb.server.connpool import simulation
+from edb.tools.edb import edbcommands
+
+
+POOLS = {
+    'default': pool_impl.Pool,
+    'naive': pool_impl._NaivePool,
+}
+
+
+def _print_report(report: simulation.Report) -> None:
+    print(f'{report.pool}: {report.queries} queries '
+          f'in {report.duration:.1f}s')
+    print(f'  acquire latency: p50 {report.p50 * 1000:.2f}ms, '
+          f'p99 {report.p99 * 1000:.2f}ms')
+    print(f'  churn: {report.connects} connects, '
+          f'{report.disconnects} disconnects, {report.churn:.2f}/s')
+    print(f'  fairness: {report.fairness:.3f}')
+    for db in report.databases:
+        print(f'    {db.dbname}: {db.queries} queries, '
+              f'mean {db.mean * 1000:.2f}ms, '
+              f'p50 {db.p50 * 1000:.2f}ms, p99 {db.p99 * 1000:.2f}ms')
+
+
+@edbcommands.command('pool-sim')
+@click.option(
+    '--trace', type=click.File(),
+    help='replay a recorded trace, in JSON lines of '
+         '{"at": <seconds>, "dbname": <name>, "duration": <seconds>}')
+@click.option(
+    '--workload', type=click.File(),
+    help='generate the trace from a JSON list of workloads, '
+         'see edb.server.connpool.simulation.Workload')
+@click.option(
+    '--dbs', type=int, default=4, show_default=True,
+    help='number of databases of the default synthetic workload')
+@click.option(
+    '--qps', type=float, default=100, show_default=True,
+    help='queries per second of each database of the default workload')
+@click.option(
+    '--query-time', type=float, default=0.01, show_default=True,
+    help='seconds a query of the default workload holds a connection')
+@click.option(
+    '--duration', type=float, default=10, show_default=True,
+    help='seconds of the default workload')
+@click.option(
+    '--capacity', type=int, default=10, show_default=True,
+    help='max number of backend connections')
+@click.option(
+    '--connect-time', type=float, default=0.05, show_default=True,
+    help='seconds it takes to establish a backend connection')
+@click.option(
+    '--pool', 'pools', type=click.Choice(list(POOLS)), multiple=True,
+    help='pool implementation to simulate, may be specified '
+         'multiple times to compare them  [default: default]')
+@click.option(
+    '--seed', type=int, default=0, show_default=True,
+    help='random seed of the trace and the connection costs')
+@click.option(
+    '--save-trace', type=click.File('w'),
+    help='save the simulated trace for later replays')
+@click.option(
+    '--json', 'as_json', is_flag=True,
+    help='print the reports in JSON')
+def pool_sim(
+    *,
+    trace,
+    workload,
+    dbs: int,
+    qps: float,
+    query_time: float,
+    duration: float,
+    capacity: int,
+    connect_time: float,
+    pools,
+    seed: int,
+    save_trace,
+    as_json: bool,
+):
+    """Simulate the backend connection pool under virtual time.
+
+    Drives the pool with fake backend connections through a recorded or
+    synthetic trace of connection requests, and reports the latencies of
+    acquiring connections, the connection churn and the fairness across
+    databases.
+    """
+    if trace is not None and workload is not None:
+        raise click.UsageError('--trace and --workload are exclusive')
+
+    if trace is not None:
+        queries = simulation.load_trace(trace)
+    else:
+        if workload is not None:
+            workloads = [
+                simulation.Workload(**wl) for wl in json.load(workload)
+            ]
+        else:
+            workloads = [
+                simulation.Workload(
+                    dbname=f'db{i}',
+                    qps=qps,
+                    query_time=query_time,
+                    query_time_var=query_time / 2,
+                    end_at=duration,
+                )
+                for i in range(dbs)
+            ]
+        queries = simulation.generate_trace(workloads, seed=seed)
+
+    if not queries:
+        raise click.UsageError('the trace is empty')
+    if save_trace is not None:
+        simulation.dump_trace(queries, save_trace)
+
+    backend = simulation.Backend(
+        connect_time=connect_time,
+        connect_time_var=connect_time / 5,
+    )
+
+    reports = [
+        simulation.simulate(
+            queries,
+            capacity=capacity,
+            backend=backend,
+            pool_cls=POOLS[name],
+            seed=seed,
+        )
+        for name in pools or ['default']
+    ]
+
+    if as_json:
+        json.dump([r.asdict() for r in reports], sys.stdout, indent=2)
+        print()
+    else:
+        for report in reports:
+            _print_report(report)
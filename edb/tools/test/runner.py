@@ -408,6 +408,9 @@ class ExperimentalInterpreterTestSuite(unittest.TestSuite):
 
         random.seed(py_random_seed)
 
+        evaluator = os.environ.get(
+            'EDGEDB_INTERPRETER_EVALUATOR', model.TREE_WALKING_EVALUATOR)
+
         for sk, suite in self.test_suites.items():
             setup = tb.get_test_cases_setup(
                 {sk: suite},
@@ -426,11 +429,15 @@ class ExperimentalInterpreterTestSuite(unittest.TestSuite):
                                 os.remove(sqlite_file_name)
                         dbschema, db = (
                             model.dbschema_and_db_with_initial_schema_and_queries(
-                                            init_sdl, init_ql, sqlite_file_name))
+                                            init_sdl, init_ql, sqlite_file_name,
+                                            sqlite_layout=os.environ.get(
+                                                'EDGEDB_INTERPRETER_SQLITE_LAYOUT'),
+                                            evaluator=evaluator))
                     else:
                         dbschema, db = (
                             model.dbschema_and_db_with_initial_schema_and_queries(
-                                            init_sdl, init_ql))
+                                            init_sdl, init_ql,
+                                            evaluator=evaluator))
                 except (ValueError, Exception)  as e:
                     print("ERROR: Test Case Setup Failed:", e)
                     raise e
@@ -454,7 +461,7 @@ class ExperimentalInterpreterTestSuite(unittest.TestSuite):
                 async def query(self, query):
                     return model.run_single_str_get_json(
                         (dbschema, db), query,
-                        print_asts=False)
+                        print_asts=False, evaluator=evaluator)
                 async def _fetchall(self, query, __typenames__=False):
                     return await self.query(query)
 
@@ -472,6 +479,7 @@ class ExperimentalInterpreterTestSuite(unittest.TestSuite):
             for test in self.sort_test_func({sk: suite}):
                 test.use_experimental_interpreter = True
                 test.experimental_interpreter_dbschema_and_db = dbschema, db
+                test.experimental_interpreter_evaluator = evaluator
                 restore_state = db.dump_state()
                 test.run(result)
                 db.restore_state(restore_state)
@@ -71,3 +71,80 @@ class TestLRU(unittest.TestCase):
 
         l[k4] = l[k4]
         self.assertEqual(list(l), [k1, k5, k4])
+
+
+class TestTinyLFU(unittest.TestCase):
+
+    def test_tinylfu_basics(self):
+        evicted = []
+        l = lru.TinyLFUMapping(  # noqa
+            maxsize=3, on_evict=lambda k, v: evicted.append(k))
+
+        k1 = Key('1')
+        k2 = Key('2')
+
+        l[k1] = '1'
+        l[k2] = '2'
+        self.assertEqual(len(l), 2)
+        self.assertEqual(l[k1], '1')
+        self.assertEqual(l.get(Key('3')), None)
+        with self.assertRaises(KeyError):
+            l[Key('4')]
+
+        l[k1] = '10'
+        self.assertEqual(l[k1], '10')
+        self.assertEqual(len(l), 2)
+
+        for i in range(10):
+            l[Key(f'x{i}')] = i
+        self.assertEqual(len(l), 3)
+        self.assertEqual(len(evicted), 9)
+        self.assertEqual(l.stats.evictions, 9)
+        self.assertEqual(l.stats.hits, 2)
+        self.assertEqual(l.stats.misses, 2)
+
+        del l[k1]
+        self.assertNotIn(k1, l)
+        self.assertEqual(len(l), 2)
+
+        l.resize(1)
+        self.assertEqual(len(l), 1)
+
+        l.clear()
+        self.assertEqual(len(l), 0)
+
+    def test_tinylfu_scan_resistance(self):
+        l = lru.TinyLFUMapping(maxsize=100)  # noqa
+        hot = [Key(f'hot{i}') for i in range(50)]
+
+        for _ in range(10):
+            for k in hot:
+                if l.get(k) is None:
+                    l[k] = k.name
+
+        # A scan of one-off keys, which would flush an LRU cache.
+        for i in range(1000):
+            k = Key(f'scan{i}')
+            if l.get(k) is None:
+                l[k] = k.name
+
+        self.assertEqual(len(l), 100)
+        self.assertEqual(sum(k in l for k in hot), len(hot))
+
+    def test_tinylfu_frequency(self):
+        l = lru.TinyLFUMapping(maxsize=10)  # noqa
+        k1 = Key('1')
+        k2 = Key('2')
+        l[k1] = '1'
+        l[k2] = '2'
+
+        for _ in range(3):
+            l.get(k1)
+        l.get(k2)
+
+        self.assertGreater(l.frequency(k1), l.frequency(k2))
+        self.assertEqual(l.frequency(k2), 1)
+        self.assertEqual(l.frequency(Key('3')), 0)
+        # Reading the frequency is not a lookup.
+        self.assertEqual(l.stats.hits, 4)
+        self.assertEqual(l.frequency(k2), 1)
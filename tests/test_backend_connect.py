@@ -44,6 +44,7 @@ from edb.server import pgcluster
 from edb.server import pgconnparams
 from edb.server.pgconnparams import SSLMode
 from edb.server import pgcon
+from edb.server import tenant as edb_tenant
 from edb.server.pgcon import errors
 from edb.testbase import server as tb
 
@@ -1139,6 +1140,117 @@ class TestConnection(ClusterTestCase):
         with check():
             await self.con.restore(None, b'', {})
 
+    async def _prepared_statements(self):
+        return set(await self.con.sql_fetch_col(
+            b"SELECT name FROM pg_prepared_statements"
+            b" WHERE name LIKE 'test_stmt_%'"
+        ))
+
+    async def test_connection_prepare_statements(self):
+        self.assertEqual(
+            await self.con.prepare_statements([
+                (b'test_stmt_a', b'SELECT 1'),
+                (b'test_stmt_b', b'SELECT 2'),
+                (b'test_stmt_a', b'SELECT 1'),
+            ], 1),
+            2,
+        )
+        self.assertEqual(
+            await self._prepared_statements(),
+            {b'test_stmt_a', b'test_stmt_b'},
+        )
+
+        # Statements prepared for the same dbver are skipped, and those
+        # of an older dbver are prepared again.
+        self.assertEqual(
+            await self.con.prepare_statements([
+                (b'test_stmt_a', b'SELECT 1'),
+            ], 1),
+            0,
+        )
+        self.assertEqual(
+            await self.con.prepare_statements([
+                (b'test_stmt_a', b'SELECT 10'),
+                (b'test_stmt_b', b'SELECT 2'),
+            ], 2),
+            2,
+        )
+
+        # A statement failing to prepare stops the ones after it, and
+        # the connection stays usable.
+        with self.assertRaisesRegex(errors.BackendError, 'test_missing'):
+            await self.con.prepare_statements([
+                (b'test_stmt_c', b'SELECT 3'),
+                (b'test_stmt_d', b'SELECT * FROM test_missing'),
+                (b'test_stmt_e', b'SELECT 5'),
+            ], 2)
+        await self.assertConnected(self.con)
+        self.assertEqual(
+            await self._prepared_statements(),
+            {b'test_stmt_a', b'test_stmt_b', b'test_stmt_c'},
+        )
+        self.assertEqual(
+            await self.con.prepare_statements([
+                (b'test_stmt_c', b'SELECT 3'),
+                (b'test_stmt_e', b'SELECT 5'),
+            ], 2),
+            1,
+        )
+
+    async def test_connection_warm_up(self):
+        class Database:
+            dbver = 1
+
+            def __init__(self, statements):
+                self.statements = statements
+
+            def get_hot_statements(self):
+                return self.statements
+
+        class Tenant(edb_tenant.Tenant):
+            # Just enough of a tenant to connect to the test cluster.
+
+            def __init__(self, test, db, *, waiters=0):
+                self._instance_name = 'test'
+                self._dbindex = unittest.mock.Mock(
+                    maybe_get_db=lambda dbname: db)
+                self._pg_pool = unittest.mock.Mock(
+                    count_waiters=lambda dbname: waiters)
+                self._test = test
+
+            async def _pg_connect(self, dbname):
+                return await self._test.connect()
+
+        async def connect(tenant):
+            conn = await tenant._pg_pool_connect(self.dbname)
+            self.addCleanup(conn.terminate)
+            return set(await conn.sql_fetch_col(
+                b"SELECT name FROM pg_prepared_statements"
+                b" WHERE name LIKE 'test_stmt_%'"
+            ))
+
+        db = Database([
+            (b'test_stmt_a', b'SELECT 1'),
+            (b'test_stmt_b', b'SELECT 2'),
+        ])
+        self.assertEqual(
+            await connect(Tenant(self, db)),
+            {b'test_stmt_a', b'test_stmt_b'},
+        )
+
+        # A connection a query is waiting for is handed out right away.
+        self.assertEqual(await connect(Tenant(self, db, waiters=1)), set())
+
+        # A statement failing to prepare leaves the connection usable.
+        db = Database([
+            (b'test_stmt_a', b'SELECT 1'),
+            (b'test_stmt_b', b'SELECT * FROM test_missing'),
+        ])
+        self.assertEqual(
+            await connect(Tenant(self, db)),
+            {b'test_stmt_a'},
+        )
+
     async def test_connection_ssl_to_no_ssl_server(self):
         ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
         ssl_context.load_verify_locations(SSL_CA_CERT_FILE)
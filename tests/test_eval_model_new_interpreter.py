@@ -417,6 +417,17 @@ class TestNewInterpreterModelSmokeTests(tb.QueryTestCase):
             [5, 7],
         )
 
+    async def test_edgeql_select_clauses_04(self):
+        await self.assert_query_result(
+            r'''
+            SELECT Card { name }
+            FILTER .element = 'Water' OR .cost > 3
+            ORDER BY .cost DESC THEN .name
+            ''',
+            [{"name": "Dragon"}, {"name": "Djinn"},
+             {"name": "Giant turtle"}, {"name": "Bog monster"}],
+        )
+
     async def test_edgeql_for_01(self):
         await self.assert_query_result(
             r'''
@@ -408,3 +408,112 @@ class TestHttpEdgeQL(tb.EdgeQLTestCase):
                 [decimal.Decimal('1234567890123456789.01234567890123456789')]
             ]
         })
+
+    def test_http_edgeql_stream_01(self):
+        with self.http_con() as con:
+            for _ in range(2):
+                # The connection is kept alive across streamed responses.
+                data, headers, status = self.http_con_request(
+                    con,
+                    method='POST',
+                    headers={
+                        'Authorization': self.make_auth_header(),
+                        'Content-Type': 'application/json',
+                        'Accept': 'application/x-ndjson',
+                    },
+                    body=json.dumps({
+                        'query': 'select range_unpack(range(0, <int64>$n))',
+                        'variables': {'n': 10_000},
+                    }).encode(),
+                )
+
+                self.assertEqual(status, 200)
+                self.assertEqual(
+                    headers['content-type'], 'application/x-ndjson')
+                self.assertEqual(headers['transfer-encoding'], 'chunked')
+                self.assertNotIn('content-length', headers)
+                self.assertEqual(
+                    [json.loads(line) for line in data.splitlines()],
+                    list(range(10_000)),
+                )
+
+    def test_http_edgeql_stream_02(self):
+        with self.http_con() as con:
+            data, headers, status = self.http_con_request(
+                con,
+                {'query': 'select <str>{}'},
+                headers={
+                    'Authorization': self.make_auth_header(),
+                    'Accept': 'application/x-ndjson',
+                },
+            )
+
+            self.assertEqual(status, 200)
+            self.assertEqual(
+                headers['content-type'], 'application/x-ndjson')
+            self.assertEqual(data, b'')
+
+            data, headers, status = self.http_con_request(
+                con,
+                {'query': 'select 1 / 0'},
+                headers={
+                    'Authorization': self.make_auth_header(),
+                    'Accept': 'application/x-ndjson',
+                },
+            )
+
+            # Errors before any data come as regular JSON responses.
+            self.assertEqual(status, 200)
+            self.assertEqual(headers['content-type'], 'application/json')
+            self.assertEqual(
+                json.loads(data)['error']['type'], 'DivisionByZeroError')
+
+    def test_http_edgeql_batch_01(self):
+        with self.http_con() as con:
+            data, headers, status = self.http_con_json_request(
+                con,
+                headers={
+                    'Authorization': self.make_auth_header(),
+                },
+                body=[
+                    {'query': 'select {1, 2}'},
+                    {'query': 'select 1 / 0'},
+                    {'query': 'select <str>$x', 'variables': {'x': 'y'}},
+                    {'query': 'select nonexistent'},
+                    {
+                        'query': 'select global test_global_str',
+                        'globals': {'default::test_global_str': 'foo'},
+                    },
+                ],
+            )
+
+            self.assertEqual(status, 200)
+            self.assert_data_shape(data, [
+                {'data': [1, 2]},
+                {'error': {'type': 'DivisionByZeroError'}},
+                {'data': ['y']},
+                {'error': {'type': 'InvalidReferenceError'}},
+                {'data': ['foo']},
+            ])
+
+    def test_http_edgeql_batch_02(self):
+        for body, message in [
+            ([], b'the batch is empty'),
+            ([{'query': 'select 1'}, 'select 2'],
+             b'must be JSON objects'),
+            ([{'query': 'select 1'}, {'variables': {}}],
+             b'query is missing'),
+        ]:
+            with self.http_con() as con:
+                data, headers, status = self.http_con_request(
+                    con,
+                    method='POST',
+                    headers={
+                        'Authorization': self.make_auth_header(),
+                        'Content-Type': 'application/json',
+                    },
+                    body=json.dumps(body).encode(),
+                )
+
+                self.assertEqual(status, 400)
+                self.assertIn(message, data)
@@ -17,6 +17,7 @@
 #
 
 
+import hashlib
 import json
 import os
 import uuid
@@ -161,6 +162,71 @@ class TestGraphQLFunctional(tb.GraphQLTestCase):
             with self.assertRaises(OSError):
                 self.http_con_request(con, {}, path='non-existant')
 
+    def test_graphql_http_persisted_query_01(self):
+        query = """
+            query ($name: String!) {
+                Setting(filter: {name: {eq: $name}}) {
+                    value
+                }
+            }
+        """
+        extensions = {'persistedQuery': {
+            'version': 1,
+            'sha256Hash': hashlib.sha256(query.encode()).hexdigest(),
+        }}
+        variables = {'name': 'perks'}
+        headers = {'Authorization': self.make_auth_header()}
+
+        with self.http_con() as con:
+            data, _, status = self.http_con_json_request(
+                con,
+                headers=headers,
+                body={'extensions': extensions, 'variables': variables},
+            )
+            self.assertEqual(status, 200)
+            self.assertEqual(data, {'errors': [{
+                'message': 'PersistedQueryNotFound',
+                'extensions': {'code': 'PERSISTED_QUERY_NOT_FOUND'},
+            }]})
+
+            data, _, status = self.http_con_json_request(
+                con,
+                headers=headers,
+                body={
+                    'query': query + ' ',
+                    'extensions': extensions,
+                    'variables': variables,
+                },
+            )
+            self.assertEqual(status, 200)
+            self.assertIn('does not match', data['errors'][0]['message'])
+
+            for body in [
+                {
+                    'query': query,
+                    'extensions': extensions,
+                    'variables': variables,
+                },
+                {'extensions': extensions, 'variables': variables},
+            ]:
+                data, _, status = self.http_con_json_request(
+                    con, headers=headers, body=body)
+                self.assertEqual(status, 200)
+                self.assertEqual(
+                    data, {'data': {'Setting': [{'value': 'full'}]}})
+
+            data, _, status = self.http_con_request(
+                con,
+                {
+                    'extensions': json.dumps(extensions),
+                    'variables': json.dumps(variables),
+                },
+                headers=headers,
+            )
+            self.assertEqual(status, 200)
+            self.assertEqual(
+                json.loads(data), {'data': {'Setting': [{'value': 'full'}]}})
+
     def test_graphql_functional_query_01(self):
         for _ in range(10):  # repeat to test prepared pgcon statements
             self.assert_graphql_query_result(r"""
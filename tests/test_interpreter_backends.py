@@ -0,0 +1,506 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2023-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import collections
+import gc
+import os
+import tempfile
+import unittest
+import weakref
+
+from edb.edgeql import parser as ql_parser
+from edb.tools.experimental_interpreter import benchmark
+from edb.tools.experimental_interpreter import db_interface
+from edb.tools.experimental_interpreter import new_interpreter as model
+from edb.tools.experimental_interpreter import profiling
+from edb.tools.experimental_interpreter.data import data_ops
+from edb.tools.experimental_interpreter.sqlite import sqlite_adapter
+
+
+SCHEMAS_DIR = os.path.join(os.path.dirname(__file__), 'schemas')
+
+
+def _read_setup():
+    # The schema and the data of TestNewInterpreterModelSmokeTests.
+    with open(os.path.join(SCHEMAS_DIR, 'smoke_test_interp.esdl')) as f:
+        sdl = f'module default {{ {f.read()} }}'
+    with open(os.path.join(SCHEMAS_DIR,
+                           'smoke_test_interp_setup.edgeql')) as f:
+        ql = f.read()
+    return sdl, ql
+
+
+def _read_smoke_queries():
+    # The queries of TestNewInterpreterModelSmokeTests.
+    for (_, _, setup_file, queries) in benchmark.find_test_queries(
+            benchmark.default_test_file):
+        if os.path.basename(setup_file) == 'smoke_test_interp_setup.edgeql':
+            return queries
+    raise AssertionError('the smoke tests of the interpreter are missing')
+
+
+class CountingEdgeDatabase(db_interface.PrefetchedEdgeDatabase):
+    # Forwards everything to the wrapped database, counting the
+    # projections per property.
+
+    def __init__(self, db):
+        super().__init__(db, {})
+        self.projections = collections.Counter()
+        self.bulk_projections = collections.Counter()
+
+    def project(self, id, prop):
+        self.projections[prop] += 1
+        return super().project(id, prop)
+
+    def project_many(self, ids, prop):
+        self.bulk_projections[prop] += 1
+        return super().project_many(ids, prop)
+
+
+class TestInterpreterBackends(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        ql_parser.preload_spec()
+        cls.sdl, cls.setup_ql = _read_setup()
+        cls.smoke_queries = _read_smoke_queries()
+
+    def make_db(self, *, sqlite=False, **kwargs):
+        dbschema, db = model.dbschema_and_db_with_initial_schema_and_queries(
+            self.sdl,
+            self.setup_ql,
+            ':memory:' if sqlite else None,
+            **kwargs,
+        )
+        self.addCleanup(db.close)
+        return dbschema, db
+
+    def query(self, dbschema_and_db, query, **kwargs):
+        return model.run_single_str_get_json(
+            dbschema_and_db, query, **kwargs)
+
+    def run_smoke_queries(self, dbschema_and_db, **kwargs):
+        # The result (or the error class name) of every smoke query,
+        # each run against the initial data.
+        db = dbschema_and_db[1]
+        state = db.dump_state()
+        results = []
+        for query in self.smoke_queries:
+            try:
+                results.append(self.query(dbschema_and_db, query, **kwargs))
+            except Exception as ex:
+                results.append(type(ex).__name__)
+            db.restore_state(state)
+        return results
+
+    def assert_same_results(self, results, expected):
+        self.assertEqual(len(results), len(expected))
+        for query, result, exp in zip(self.smoke_queries, results, expected):
+            with self.subTest(query=query):
+                self.assertEqual(result, exp)
+
+    def test_interpreter_prefetch_filter_order_01(self):
+        # The properties that FILTER and ORDER BY project from the
+        # subject are fetched with one project_many() each, instead of
+        # one project() per element.
+        dbschema, db = self.make_db(sqlite=True)
+
+        for evaluator in model.EVALUATORS:
+            with self.subTest(evaluator=evaluator):
+                counting = CountingEdgeDatabase(db)
+                result = self.query(
+                    (dbschema, counting),
+                    '''
+                    SELECT Card { name }
+                    FILTER .cost > 1
+                    ORDER BY .element THEN .name
+                    ''',
+                    evaluator=evaluator,
+                )
+
+                self.assertEqual(
+                    [card['name'] for card in result],
+                    ['Djinn', 'Giant eagle', 'Golem', 'Dragon',
+                     'Bog monster', 'Giant turtle'],
+                )
+                for prop in ('cost', 'element'):
+                    self.assertEqual(counting.bulk_projections[prop], 1)
+                    self.assertEqual(counting.projections[prop], 0)
+
+    def catalog_contents(self, catalog):
+        # The contents of a catalog, regardless of the registration order.
+        def normalize(value):
+            if isinstance(value, dict):
+                return {k: normalize(v) for (k, v) in value.items()}
+            elif isinstance(value, (list, set)):
+                return sorted(value)
+            else:
+                return value
+        return normalize(vars(catalog))
+
+    def assert_catalog_in_sync(self, db):
+        loaded = sqlite_adapter.PropertyTypeCatalog()
+        loaded.load(db.cursor)
+        self.assertEqual(
+            self.catalog_contents(db.catalog), self.catalog_contents(loaded))
+
+    def test_interpreter_sqlite_catalog_01(self):
+        # The in-memory copy of property_types follows the property
+        # tables created by inserts and dropped by restoring a snapshot,
+        # and is loaded again when the database file is reopened.
+        insert = '''
+            INSERT Publication {
+                title := 'Decks',
+                authors := (
+                    SELECT User { @list_order := 1 } FILTER .name = 'Alice'
+                ),
+            }
+        '''
+
+        for layout in sqlite_adapter.STORAGE_LAYOUTS:
+            with self.subTest(layout=layout), \
+                    tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'interp.sqlite')
+                dbschema, db = (
+                    model.dbschema_and_db_with_initial_schema_and_queries(
+                        self.sdl, self.setup_ql, path, sqlite_layout=layout))
+                try:
+                    self.assert_catalog_in_sync(db)
+                    self.assertIsNone(db.catalog.get('Publication.title'))
+                    state = db.dump_state()
+
+                    self.query((dbschema, db), insert)
+                    self.assert_catalog_in_sync(db)
+                    self.assertEqual(
+                        db.catalog.get('Publication.title'), 'STRING')
+                    self.assertEqual(
+                        db.catalog.get('Publication.authors'), 'LINK')
+                    self.assertEqual(
+                        db.catalog.get_link_properties(
+                            'Publication', 'authors'),
+                        {'list_order': 'INT'})
+                    self.assertIn(
+                        'Publication.authors',
+                        db.catalog.link_tables['authors'])
+
+                    db.restore_state(state)
+                    self.assert_catalog_in_sync(db)
+                    self.assertIsNone(db.catalog.get('Publication.title'))
+                    self.assertEqual(
+                        db.catalog.get_link_properties(
+                            'Publication', 'authors'),
+                        {})
+
+                    self.query((dbschema, db), insert)
+                finally:
+                    db.close()
+
+                dbschema, db = sqlite_adapter.schema_and_db_from_sqlite(
+                    self.sdl, path, model.default_dbschema())
+                try:
+                    self.assert_catalog_in_sync(db)
+                    self.assertEqual(
+                        db.catalog.get_link_properties(
+                            'Publication', 'authors'),
+                        {'list_order': 'INT'})
+                    self.assertEqual(
+                        self.query(
+                            (dbschema, db),
+                            'SELECT Publication.authors@list_order'),
+                        [1])
+                finally:
+                    db.close()
+
+    def test_interpreter_sqlite_layouts_01(self):
+        expected = self.run_smoke_queries(self.make_db(
+            sqlite=True, sqlite_layout=sqlite_adapter.NARROW_LAYOUT))
+
+        for layout in sqlite_adapter.STORAGE_LAYOUTS:
+            with self.subTest(layout=layout):
+                dbschema, db = self.make_db(sqlite=True, sqlite_layout=layout)
+                self.assertEqual(db.layout, layout)
+                self.assert_same_results(
+                    self.run_smoke_queries((dbschema, db)), expected)
+
+    def test_interpreter_sqlite_layouts_02(self):
+        # Migrating a database file back and forth between the layouts
+        # keeps the results of the queries, and the file is reopened in
+        # the layout it was migrated to.
+        expected = self.run_smoke_queries(self.make_db(
+            sqlite=True, sqlite_layout=sqlite_adapter.NARROW_LAYOUT))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'interp.sqlite')
+            _, db = model.dbschema_and_db_with_initial_schema_and_queries(
+                self.sdl, self.setup_ql, path,
+                sqlite_layout=sqlite_adapter.NARROW_LAYOUT)
+            db.close()
+
+            for layout in (sqlite_adapter.WIDE_LAYOUT,
+                           sqlite_adapter.NARROW_LAYOUT):
+                with self.subTest(layout=layout):
+                    _, db = sqlite_adapter.schema_and_db_from_sqlite(
+                        self.sdl, path, model.default_dbschema())
+                    try:
+                        sqlite_adapter.migrate_storage_layout(db, layout)
+                    finally:
+                        db.close()
+
+                    dbschema, db = sqlite_adapter.schema_and_db_from_sqlite(
+                        self.sdl, path, model.default_dbschema())
+                    try:
+                        self.assertEqual(db.layout, layout)
+                        self.assert_same_results(
+                            self.run_smoke_queries((dbschema, db)), expected)
+                    finally:
+                        db.close()
+
+    def test_interpreter_sqlite_layouts_03(self):
+        dbschema, db = self.make_db(
+            sqlite=True, sqlite_layout=sqlite_adapter.NARROW_LAYOUT)
+        db.dump_state()
+        with self.assertRaisesRegex(ValueError, 'snapshot is held'):
+            sqlite_adapter.migrate_storage_layout(db, 'wide')
+        self.assertEqual(db.layout, sqlite_adapter.NARROW_LAYOUT)
+
+    def test_interpreter_sqlite_bulk_load_01(self):
+        # Loading the setup in bulk gives the same database, with the
+        # indexes that were deferred to the end of the load.
+        def indexes(db):
+            db.cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='index'")
+            return {name for (name,) in db.cursor.fetchall()}
+
+        for layout in sqlite_adapter.STORAGE_LAYOUTS:
+            with self.subTest(layout=layout):
+                expected_db = self.make_db(sqlite=True, sqlite_layout=layout)
+                expected = self.run_smoke_queries(expected_db)
+
+                dbschema, db = self.make_db(
+                    sqlite=True, sqlite_layout=layout, bulk_load=True)
+                self.assertFalse(db.bulk_load)
+                self.assertEqual(db.deferred_indexes, [])
+                self.assertEqual(indexes(db), indexes(expected_db[1]))
+                self.assert_same_results(
+                    self.run_smoke_queries((dbschema, db)), expected)
+
+    def cards(self, dbschema_and_db):
+        # The number of cards and the cost of the Imp.
+        return (
+            self.query(dbschema_and_db, 'SELECT count(Card)'),
+            self.query(
+                dbschema_and_db,
+                "SELECT (SELECT Card FILTER .name = 'Imp').cost"),
+        )
+
+    def change_cards(self, dbschema_and_db):
+        self.query(
+            dbschema_and_db,
+            "UPDATE Card FILTER .name = 'Imp' SET { cost := 7 }")
+        self.query(
+            dbschema_and_db,
+            "DELETE Card FILTER .name = 'Imp II'")
+        self.assertEqual(self.cards(dbschema_and_db), ([9], [7]))
+
+    def test_interpreter_sqlite_snapshots_01(self):
+        # SQLite snapshots are savepoints: restoring one rolls back the
+        # changes made since, and discards the snapshots taken after it.
+        dbschema, db = self.make_db(sqlite=True)
+        s0 = db.dump_state()
+        self.query(
+            (dbschema, db),
+            "INSERT Card { name := 'Imp II', element := 'Fire', cost := 1 }")
+        s1 = db.dump_state()
+        # nothing changed, the savepoint is reused
+        self.assertEqual(db.dump_state()['savepoint'], s1['savepoint'])
+        self.change_cards((dbschema, db))
+
+        db.restore_state(s1)
+        self.assertEqual(self.cards((dbschema, db)), ([10], [1]))
+        self.change_cards((dbschema, db))
+
+        db.restore_state(s0)
+        self.assertEqual(self.cards((dbschema, db)), ([9], [1]))
+
+        with self.assertRaisesRegex(ValueError, 'no longer available'):
+            db.restore_state(s1)
+
+    def test_interpreter_memory_snapshots_01(self):
+        # In memory snapshots share the immutable state, and stay valid
+        # in any order.
+        dbschema, db = self.make_db()
+        s0 = db.dump_state()
+        self.query(
+            (dbschema, db),
+            "INSERT Card { name := 'Imp II', element := 'Fire', cost := 1 }")
+        s1 = db.dump_state()
+        self.change_cards((dbschema, db))
+
+        db.restore_state(s0)
+        self.assertEqual(self.cards((dbschema, db)), ([9], [1]))
+
+        db.restore_state(s1)
+        self.assertEqual(self.cards((dbschema, db)), ([10], [1]))
+        self.change_cards((dbschema, db))
+
+        db.restore_state(s1)
+        self.assertEqual(self.cards((dbschema, db)), ([10], [1]))
+
+    def assert_indexes_consistent(self, db):
+        # The type and link indexes of InMemoryEdgeDatabase match the
+        # committed objects.
+        type_index = collections.defaultdict(set)
+        link_index = collections.defaultdict(set)
+        for (id, entry) in db.db.dbdata.items():
+            type_index[entry.tp].add(id)
+            for key in db_interface.link_index_keys(entry):
+                link_index[key].add(id)
+        self.assertEqual(
+            {tp: set(ids) for (tp, ids) in db.type_index.items()},
+            dict(type_index))
+        self.assertEqual(
+            {key: set(ids) for (key, ids) in db.link_index.items()},
+            dict(link_index))
+
+    def test_interpreter_memory_indexes_01(self):
+        dbschema, db = self.make_db()
+        self.assert_indexes_consistent(db)
+
+        def friends_of_bob():
+            return self.query(
+                (dbschema, db),
+                '''
+                SELECT (SELECT User FILTER .name = 'Bob')
+                    .<friends[IS User].name
+                ''')
+
+        self.assertEqual(sorted(friends_of_bob()), ['Alice', 'Dave'])
+        state = db.dump_state()
+
+        self.query(
+            (dbschema, db),
+            "INSERT Card { name := 'Imp II', element := 'Fire', cost := 1 }")
+        self.query(
+            (dbschema, db),
+            "UPDATE User FILTER .name = 'Dave' "
+            "SET { friends := (SELECT User FILTER .name = 'Carol') }")
+        self.assert_indexes_consistent(db)
+        self.assertEqual(self.query((dbschema, db), 'SELECT count(Card)'),
+                         [10])
+        self.assertEqual(friends_of_bob(), ['Alice'])
+
+        self.query((dbschema, db), "DELETE User FILTER .name = 'Alice'")
+        self.query((dbschema, db), "DELETE Card FILTER .name = 'Imp II'")
+        self.assert_indexes_consistent(db)
+        self.assertEqual(self.query((dbschema, db), 'SELECT count(Card)'),
+                         [9])
+        self.assertEqual(friends_of_bob(), [])
+
+        db.restore_state(state)
+        self.assert_indexes_consistent(db)
+        self.assertEqual(sorted(friends_of_bob()), ['Alice', 'Dave'])
+
+    def test_interpreter_evaluators_01(self):
+        # The compiled evaluator gives the results of the tree walking
+        # one on every backend.
+        backends = [{}, *(
+            {'sqlite': True, 'sqlite_layout': layout}
+            for layout in sqlite_adapter.STORAGE_LAYOUTS
+        )]
+        for backend in backends:
+            expected = self.run_smoke_queries(
+                self.make_db(**backend), evaluator=model.TREE_WALKING_EVALUATOR)
+            for evaluator in model.EVALUATORS:
+                with self.subTest(evaluator=evaluator, **backend):
+                    dbschema_and_db = self.make_db(
+                        evaluator=evaluator, **backend)
+                    self.assert_same_results(
+                        self.run_smoke_queries(
+                            dbschema_and_db, evaluator=evaluator),
+                        expected)
+
+    def test_interpreter_statement_cache_01(self):
+        # Statements are checked again once a schema is changed in
+        # place, and cached statements do not keep their schema alive.
+        dbschema = model.default_dbschema()
+        generation = data_ops.schema_generation()
+        dbschema = model.add_module_from_sdl_defs(dbschema, self.sdl)
+        self.assertGreater(data_ops.schema_generation(), generation)
+        db = model.empty_db(dbschema)
+
+        def cached(dbschema):
+            return [stmt for stmt in model.statement_cache.values()
+                    if stmt.dbschema() is dbschema]
+
+        query = 'SELECT Card { name } FILTER .cost = 1'
+        self.assertEqual(self.query((dbschema, db), query), [])
+        self.assertEqual(len(cached(dbschema)), 1)
+        self.assertEqual(self.query((dbschema, db), query), [])
+        self.assertEqual(len(cached(dbschema)), 1)
+
+        data_ops.schema_changed()
+        self.assertEqual(self.query((dbschema, db), query), [])
+        self.assertEqual(len(cached(dbschema)), 2)
+
+        schema_ref = weakref.ref(dbschema)
+        del dbschema, db
+        gc.collect()
+        self.assertIsNone(schema_ref())
+
+    def test_interpreter_profile_01(self):
+        dbschema, db = self.make_db()
+        profile = profiling.EvaluationProfile()
+        model.run_str(
+            db, dbschema, 'SELECT Card { name } FILTER .cost > 1',
+            profile=profile)
+
+        self.assertEqual(profile.frames, [])
+        # the statement is the only root, and its time is the sum of the
+        # self times of all the nodes
+        roots = [stack for stack in profile.stacks if len(stack) == 1]
+        self.assertEqual(len(roots), 1)
+        root = profile.stacks[roots[0]]
+        self.assertEqual(root.calls, 1)
+        self.assertEqual(root.cardinality, 6)
+        self.assertAlmostEqual(
+            sum(stats.self_time for stats in profile.stacks.values()),
+            root.total_time, delta=1e-6)
+
+        db_calls = collections.Counter()
+        for (_, stats) in profile.hotspots():
+            db_calls.update(stats.db_calls)
+        self.assertGreater(db_calls['query_ids_for_a_type'], 0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'profile.folded')
+            profile.write_folded(path)
+            with open(path) as f:
+                folded = f.read().splitlines()
+        self.assertEqual(folded, profile.folded_stacks())
+        self.assertEqual(len(folded), len(profile.stacks))
+        for line in folded:
+            self.assertRegex(line, r'^[^; ]+(;[^; ]+)* \d+$')
+
+    def test_interpreter_profile_02(self):
+        dbschema, db = self.make_db()
+        with self.assertRaisesRegex(ValueError, 'tree walking evaluator'):
+            model.run_str(
+                db, dbschema, 'SELECT Card { name }',
+                evaluator=model.COMPILED_EVALUATOR,
+                profile=profiling.EvaluationProfile())
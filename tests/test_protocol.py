@@ -18,11 +18,15 @@
 
 
 import asyncio
+import collections
 import contextlib
+import io
+import itertools
 import struct
 
 import edgedb
 
+from edb.common import binwrapper
 from edb.server import args as srv_args
 from edb.server import compiler
 from edb import protocol
@@ -35,6 +39,30 @@ def pack_i32s(*args):
     return struct.pack("!" + "i" * len(args), *args)
 
 
+# Headers of the Dump message and of the data blocks
+# (see edb/server/protocol/consts.pxi).
+DUMP_HEADER_DUMP_JOBS = 0xFF11
+DUMP_HEADER_BLOCK_ID = 110
+DUMP_HEADER_BLOCK_NUM = 111
+DUMP_HEADER_BLOCK_DATA = 112
+
+
+class DumpWithHeaders(protocol.ClientMessage):
+    # The server reads the attributes of Dump as key-value headers.
+
+    mtype = protocol.MessageType('>')
+    message_length = protocol.MessageLength
+    headers = protocol.KeyValues
+
+
+def message_data(msg):
+    # The contents of a server message, as the client sends them back
+    # in Restore and RestoreBlock.
+    iobuf = io.BytesIO()
+    type(msg).dump(msg, binwrapper.BinWrapper(iobuf))
+    return iobuf.getvalue()
+
+
 class TestProtocol(ProtocolTestCase):
 
     async def _execute(
@@ -658,6 +686,491 @@ class TestProtocol(ProtocolTestCase):
         )
 
 
+class TestProtocolPipelining(ProtocolTestCase):
+
+    # The number of queries the server sends to the backend at once
+    # (PIPELINE_MAX_QUERIES in edb/server/protocol/consts.pxi).
+    PIPELINE_MAX_QUERIES = 64
+
+    SETUP = '''
+        CREATE TYPE PipelineTest {
+            CREATE REQUIRED PROPERTY n -> int64;
+        };
+        CREATE GLOBAL pipeline_glob -> int64;
+    '''
+
+    def _make_execute(self, command_text, cc=None, **kwargs):
+        exec_args = dict(
+            annotations=[],
+            allowed_capabilities=protocol.Capability.ALL,
+            compilation_flags=protocol.CompilationFlag(0),
+            implicit_limit=0,
+            command_text=command_text,
+            output_format=protocol.OutputFormat.BINARY,
+            expected_cardinality=protocol.Cardinality.MANY,
+            input_typedesc_id=b'\0' * 16,
+            output_typedesc_id=b'\0' * 16,
+            state_typedesc_id=b'\0' * 16,
+            arguments=b'',
+            state_data=b'',
+        )
+        if cc is not None:
+            exec_args['state_typedesc_id'] = cc.state_typedesc_id
+            exec_args['state_data'] = cc.state_data
+        exec_args.update(kwargs)
+        return protocol.Execute(**exec_args)
+
+    async def _send_pipeline(self, *messages):
+        # Sends the Execute messages at once with a single Sync and
+        # returns the replies of the server up to ReadyForCommand.
+        await self.con.send(*messages, protocol.Sync())
+        replies = []
+        while True:
+            msg = await self.con.recv()
+            if isinstance(msg, protocol.ReadyForCommand):
+                return replies, msg.transaction_state
+            replies.append(msg)
+
+    async def _pipeline(self, *queries, cc=None):
+        # Returns the results of the queries as the int64 values of the
+        # Data messages, the status of the CommandComplete messages and
+        # the message of the ErrorResponse ones.
+        replies, tx_state = await self._send_pipeline(*(
+            self._make_execute(q, cc) if isinstance(q, str)
+            else self._make_execute(*q)
+            for q in queries
+        ))
+        results = []
+        for msg in replies:
+            if isinstance(msg, protocol.Data):
+                [element] = msg.data
+                results.append(struct.unpack('!q', bytes(element.data))[0])
+            elif isinstance(msg, protocol.CommandComplete):
+                results.append(msg.status)
+            elif isinstance(msg, protocol.ErrorResponse):
+                results.append(msg.message)
+            else:
+                self.assertIsInstance(
+                    msg,
+                    (
+                        protocol.CommandDataDescription,
+                        protocol.StateDataDescription,
+                    ),
+                )
+        return results, tx_state
+
+    async def _set_global(self, value):
+        await self.con.send(
+            self._make_execute(
+                f'SET GLOBAL pipeline_glob := {value}',
+                output_format=protocol.OutputFormat.NONE,
+            ),
+            protocol.Sync(),
+        )
+        cc = await self.con.recv_match(
+            protocol.CommandComplete,
+            _ignore_msg=protocol.StateDataDescription,
+        )
+        await self.con.recv_match(protocol.ReadyForCommand)
+        return cc
+
+    async def test_proto_pipeline_01(self):
+        await self.con.connect()
+
+        # The results are streamed in the order of the Execute messages.
+        self.assertEqual(
+            await self._pipeline(*(f'SELECT {i}' for i in range(5))),
+            (
+                [r for i in range(5) for r in (i, 'SELECT')],
+                protocol.TransactionState.NOT_IN_TRANSACTION,
+            ),
+        )
+
+        # Including when there are more queries than are sent to the
+        # backend at once.
+        count = 2 * self.PIPELINE_MAX_QUERIES + 1
+        self.assertEqual(
+            await self._pipeline(*(f'SELECT {i}' for i in range(count))),
+            (
+                [r for i in range(count) for r in (i, 'SELECT')],
+                protocol.TransactionState.NOT_IN_TRANSACTION,
+            ),
+        )
+
+    async def test_proto_pipeline_02(self):
+        await self.con.connect()
+
+        # Modifications outside of a transaction are executed on their
+        # own, after the queries before them.
+        self.assertEqual(
+            await self._pipeline(
+                'SELECT 1',
+                'SELECT (INSERT PipelineTest { n := 2 }).n',
+                'SELECT 3',
+                'SELECT count(PipelineTest FILTER .n = 2)',
+            ),
+            (
+                [1, 'SELECT', 2, 'SELECT', 3, 'SELECT', 1, 'SELECT'],
+                protocol.TransactionState.NOT_IN_TRANSACTION,
+            ),
+        )
+
+        # Queries running with a different state are too.
+        cc1 = await self._set_global(1)
+        cc2 = await self._set_global(2)
+        self.assertEqual(
+            await self._pipeline(
+                ('SELECT GLOBAL pipeline_glob', cc1),
+                ('SELECT GLOBAL pipeline_glob', cc2),
+                ('SELECT GLOBAL pipeline_glob', cc2),
+                ('SELECT GLOBAL pipeline_glob', cc1),
+            ),
+            (
+                [1, 'SELECT', 2, 'SELECT', 2, 'SELECT', 1, 'SELECT'],
+                protocol.TransactionState.NOT_IN_TRANSACTION,
+            ),
+        )
+
+    async def test_proto_pipeline_03(self):
+        await self.con.connect()
+
+        # An error stops the queries after it until the Sync.
+        self.assertEqual(
+            await self._pipeline(
+                'SELECT 1',
+                'SELECT 2',
+                'SELECT 1 // count(PipelineTest FILTER .n = 5)',
+                'SELECT 4',
+                'SELECT (INSERT PipelineTest { n := 5 }).n',
+            ),
+            (
+                [1, 'SELECT', 2, 'SELECT', 'division by zero'],
+                protocol.TransactionState.NOT_IN_TRANSACTION,
+            ),
+        )
+
+        self.assertEqual(
+            await self._pipeline('SELECT count(PipelineTest FILTER .n = 5)'),
+            ([0, 'SELECT'], protocol.TransactionState.NOT_IN_TRANSACTION),
+        )
+
+    async def test_proto_pipeline_04(self):
+        await self.con.connect()
+
+        self.assertEqual(
+            await self._pipeline('START TRANSACTION'),
+            (['START TRANSACTION'], protocol.TransactionState.IN_TRANSACTION),
+        )
+
+        # Modifications are pipelined in a transaction.
+        self.assertEqual(
+            await self._pipeline(
+                'SELECT (INSERT PipelineTest { n := 41 }).n',
+                'SELECT (INSERT PipelineTest { n := 42 }).n',
+                'SELECT count(PipelineTest FILTER .n > 40)',
+            ),
+            (
+                [41, 'SELECT', 42, 'SELECT', 2, 'SELECT'],
+                protocol.TransactionState.IN_TRANSACTION,
+            ),
+        )
+
+        self.assertEqual(
+            await self._pipeline(
+                'SELECT (INSERT PipelineTest { n := 43 }).n',
+                'SELECT 1 // (count(PipelineTest FILTER .n > 40) - 3)',
+                'SELECT (INSERT PipelineTest { n := 44 }).n',
+            ),
+            (
+                [43, 'SELECT', 'division by zero'],
+                protocol.TransactionState.IN_FAILED_TRANSACTION,
+            ),
+        )
+
+        self.assertEqual(
+            await self._pipeline(
+                'ROLLBACK',
+                'SELECT count(PipelineTest FILTER .n > 40)',
+            ),
+            (
+                ['ROLLBACK', 0, 'SELECT'],
+                protocol.TransactionState.NOT_IN_TRANSACTION,
+            ),
+        )
+
+    async def test_proto_pipeline_05(self):
+        await self.con.connect()
+
+        # The description sent along with the parameter type mismatch
+        # follows the results of the queries before it.
+        replies, tx_state = await self._send_pipeline(
+            self._make_execute('SELECT 1'),
+            self._make_execute('SELECT 2'),
+            self._make_execute('SELECT <int64>$0'),
+            self._make_execute('SELECT 4'),
+        )
+        self.assertEqual(
+            [type(msg) for msg in replies],
+            [
+                protocol.CommandDataDescription,
+                protocol.Data,
+                protocol.CommandComplete,
+                protocol.CommandDataDescription,
+                protocol.Data,
+                protocol.CommandComplete,
+                protocol.CommandDataDescription,
+                protocol.ErrorResponse,
+            ],
+        )
+        self.assertRegex(
+            replies[-1].message, r'specified parameter type\(s\) do not match')
+        self.assertEqual(
+            tx_state, protocol.TransactionState.NOT_IN_TRANSACTION)
+
+        self.assertEqual(
+            await self._pipeline('SELECT 5'),
+            ([5, 'SELECT'], protocol.TransactionState.NOT_IN_TRANSACTION),
+        )
+
+
+class TestDumpRestoreProtocol(ProtocolTestCase):
+
+    TRANSACTION_ISOLATION = False
+
+    # DumpJobsBig takes more than one 10MB fragment.
+    SETUP = '''
+        CREATE TYPE DumpJobsBig {
+            CREATE REQUIRED PROPERTY n -> int64;
+            CREATE REQUIRED PROPERTY s -> str;
+        };
+        CREATE TYPE DumpJobsSmall {
+            CREATE REQUIRED PROPERTY n -> int64;
+            CREATE LINK big -> DumpJobsBig;
+        };
+        CREATE TYPE DumpJobsOther {
+            CREATE REQUIRED PROPERTY name -> str;
+        };
+
+        FOR i IN {std::range_unpack(std::range(0, 1200))} UNION (
+            INSERT DumpJobsBig {
+                n := i,
+                s := std::str_repeat('x', 10000) ++ <str>i,
+            }
+        );
+        FOR i IN {std::range_unpack(std::range(0, 100))} UNION (
+            INSERT DumpJobsSmall {
+                n := i,
+                big := (SELECT DumpJobsBig FILTER .n = i),
+            }
+        );
+        FOR name IN {'a', 'b', 'c'} UNION (
+            INSERT DumpJobsOther { name := name }
+        );
+    '''
+
+    QUERIES = [
+        'SELECT DumpJobsBig { n, s } ORDER BY .n',
+        'SELECT DumpJobsSmall { n, big: { n } } ORDER BY .n',
+        'SELECT DumpJobsOther { name } ORDER BY .name',
+    ]
+
+    async def _dump(self, *, jobs):
+        await self.con.connect()
+        await self.con.send(
+            DumpWithHeaders(headers=[
+                protocol.KeyValue(
+                    code=DUMP_HEADER_DUMP_JOBS,
+                    value=struct.pack('!h', jobs),
+                ),
+            ]),
+            protocol.Sync(),
+        )
+        header = await self.con.recv_match(protocol.DumpHeader)
+        blocks = []
+        while True:
+            msg = await self.con.recv()
+            if isinstance(msg, protocol.CommandComplete):
+                break
+            self.assertIsInstance(msg, protocol.DumpBlock)
+            blocks.append(msg)
+        await self.con.recv_match(protocol.ReadyForCommand)
+        return header, blocks
+
+    def _assert_fragments_in_sequence(self, header, blocks):
+        # The fragments of every block are numbered from 0 and arrive
+        # in order, even when they interleave with other blocks.
+        fragments = collections.defaultdict(list)
+        for block in blocks:
+            attrs = {kv.code: kv.value for kv in block.attributes}
+            fragments[attrs[DUMP_HEADER_BLOCK_ID]].append(
+                int(attrs[DUMP_HEADER_BLOCK_NUM]))
+        self.assertLessEqual(
+            set(fragments),
+            {desc.object_id for desc in header.descriptors})
+        for nums in fragments.values():
+            self.assertEqual(nums, list(range(len(nums))))
+        self.assertGreater(max(map(len, fragments.values())), 1)
+
+    async def _create_database(self, suffix):
+        dbname = f'{self.get_database_name()}_{suffix}'
+        admin = await self.connect()
+        try:
+            await admin.execute(f'CREATE DATABASE {dbname}')
+        finally:
+            await admin.aclose()
+
+        async def drop():
+            admin = await self.connect()
+            try:
+                await admin.execute(f'DROP DATABASE {dbname}')
+            finally:
+                await admin.aclose()
+
+        self.addCleanup(lambda: self.loop.run_until_complete(drop()))
+        return dbname
+
+    async def _restore(self, dbname, header, blocks, *, jobs, error=None):
+        con = await protocol.protocol.new_connection(
+            **self.get_connect_args(database=dbname))
+        try:
+            await con.connect()
+            await con.send(
+                protocol.Restore(
+                    attributes=[],
+                    jobs=jobs,
+                    header_data=message_data(header),
+                ),
+            )
+            ready = await con.recv_match(protocol.RestoreReady)
+            await con.send(
+                *(protocol.RestoreBlock(block_data=message_data(block))
+                  for block in blocks),
+                protocol.RestoreEof(),
+            )
+            if error is None:
+                await con.recv_match(
+                    protocol.CommandComplete,
+                    _ignore_msg=protocol.StateDataDescription,
+                    status='RESTORE',
+                )
+            else:
+                await con.recv_match(protocol.ErrorResponse, message=error)
+            await con.send(protocol.Sync())
+            await con.recv_match(protocol.ReadyForCommand)
+            return ready.jobs
+        finally:
+            await con.aclose()
+
+    async def _query_all(self, dbname):
+        con = await self.connect(database=dbname)
+        try:
+            return [await con.query_json(q) for q in self.QUERIES]
+        finally:
+            await con.aclose()
+
+    async def test_proto_dump_jobs_01(self):
+        if not self.has_create_database:
+            self.skipTest('create database is not supported by the backend')
+
+        header, blocks = await self._dump(jobs=4)
+        self._assert_fragments_in_sequence(header, blocks)
+
+        dbname = await self._create_database('restore')
+        await self._restore(dbname, header, blocks, jobs=1)
+        self.assertEqual(
+            await self._query_all(dbname),
+            await self._query_all(self.get_database_name()))
+
+    async def test_proto_restore_jobs_01(self):
+        if not self.has_create_database:
+            self.skipTest('create database is not supported by the backend')
+
+        header, blocks = await self._dump(jobs=1)
+        dbname = await self._create_database('restore_jobs')
+        self.assertEqual(
+            await self._restore(dbname, header, blocks, jobs=4), 4)
+        self.assertEqual(
+            await self._query_all(dbname),
+            await self._query_all(self.get_database_name()))
+
+    async def test_proto_restore_jobs_02(self):
+        if not self.has_create_database:
+            self.skipTest('create database is not supported by the backend')
+
+        # Another client is connected to the database, the restore
+        # falls back to a single job.
+        header, blocks = await self._dump(jobs=1)
+        dbname = await self._create_database('restore_busy')
+        other = await self.connect(database=dbname)
+        try:
+            self.assertEqual(
+                await self._restore(dbname, header, blocks, jobs=4), 1)
+            self.assertEqual(
+                await other.query('SELECT count(DumpJobsOther)'), [3])
+        finally:
+            await other.aclose()
+        self.assertEqual(
+            await self._query_all(dbname),
+            await self._query_all(self.get_database_name()))
+
+    async def test_proto_restore_jobs_03(self):
+        if not self.has_create_database:
+            self.skipTest('create database is not supported by the backend')
+
+        # Break a block in the middle of the dump.
+        header, blocks = await self._dump(jobs=1)
+        broken = blocks[len(blocks) // 2]
+        attrs = [
+            protocol.KeyValue(code=kv.code, value=b'garbage')
+            if kv.code == DUMP_HEADER_BLOCK_DATA else kv
+            for kv in broken.attributes
+        ]
+        blocks[len(blocks) // 2] = protocol.DumpBlock(attributes=attrs)
+
+        dbname = await self._create_database('restore_broken')
+        await self._restore(
+            dbname, header, blocks, jobs=4,
+            error='(?s)parallel restore of database .* failed: .*'
+                  'partially restored and must be dropped',
+        )
+
+        # The partially restored database does not accept connections
+        # until it is dropped.
+        with self.assertRaisesRegex(
+            edgedb.AccessError, 'does not accept connections'
+        ):
+            await self.connect(database=dbname)
+
+    async def test_proto_dump_jobs_02(self):
+        # Without the header, or with one job, the dump uses a single
+        # connection and the blocks are sent one after the other.
+        header, blocks = await self._dump(jobs=1)
+        self._assert_fragments_in_sequence(header, blocks)
+        ids = [
+            {kv.code: kv.value for kv in block.attributes}[
+                DUMP_HEADER_BLOCK_ID]
+            for block in blocks
+        ]
+        runs = [block_id for block_id, _ in itertools.groupby(ids)]
+        self.assertEqual(len(runs), len(set(runs)))
+
+    async def test_proto_dump_jobs_03(self):
+        await self.con.connect()
+        for value in (b'\x00', struct.pack('!h', 0), struct.pack('!h', -1)):
+            await self.con.send(
+                DumpWithHeaders(headers=[
+                    protocol.KeyValue(
+                        code=DUMP_HEADER_DUMP_JOBS, value=value),
+                ]),
+                protocol.Sync(),
+            )
+            await self.con.recv_match(
+                protocol.ErrorResponse,
+                message='dump jobs header must be',
+            )
+            await self.con.recv_match(protocol.ReadyForCommand)
+
+
 class TestServerCancellation(tb.TestCase):
     @contextlib.asynccontextmanager
     async def _fixture(self):
@@ -25,11 +25,16 @@ import subprocess
 import sys
 import tempfile
 import time
+import types
 import unittest.mock
+import uuid
 
 import immutables
 
 from edb import edgeql
+from edb.common import lru
+from edb.graphql import compiler as gql_compiler
+from edb.schema import schema as s_schema
 from edb.testbase import lang as tb
 from edb.testbase import server as tbs
 from edb.server import args as edbargs
@@ -74,6 +79,191 @@ class TestServerCompiler(tb.BaseSchemaLoadTest):
             ''',
         )
 
+    def test_server_compiler_user_schema_delta(self):
+        compiler = tb.new_compiler()
+        context = edbcompiler.new_compiler_context(
+            compiler_state=compiler.state,
+            user_schema=self.schema,
+            modaliases={None: 'default'},
+        )
+        base_schema = context.state.current_tx().get_user_schema()
+
+        new_schema, _ = edbcompiler.compile_edgeql_script(
+            ctx=context,
+            eql='''
+                CREATE TYPE Baz {
+                    CREATE PROPERTY qux -> int64;
+                };
+                ALTER TYPE Foo DROP PROPERTY bar;
+            ''',
+        )
+
+        delta = pickle.loads(pickle.dumps(new_schema.get_delta(base_schema)))
+        schema = pickle.loads(pickle.dumps(base_schema)).apply_delta(delta)
+
+        self.assertEqual(
+            edbcompiler.get_user_schema_version(schema),
+            edbcompiler.get_user_schema_version(new_schema),
+        )
+        self.assertNotEqual(
+            edbcompiler.get_user_schema_version(schema),
+            edbcompiler.get_user_schema_version(base_schema),
+        )
+        self.assertEqual(
+            set(schema._id_to_type.items()),
+            set(new_schema._id_to_type.items()),
+        )
+        self.assertEqual(
+            set(schema._name_to_id.items()),
+            set(new_schema._name_to_id.items()),
+        )
+
+    def test_server_compiler_user_schema_fingerprint(self):
+        compiler = tb.new_compiler()
+        context = edbcompiler.new_compiler_context(
+            compiler_state=compiler.state,
+            user_schema=self.schema,
+            modaliases={None: 'default'},
+        )
+        base_schema = context.state.current_tx().get_user_schema()
+        base_fingerprint = edbcompiler.get_user_schema_fingerprint(
+            base_schema)
+
+        new_schema, _ = edbcompiler.compile_edgeql_script(
+            ctx=context,
+            eql='''
+                CREATE TYPE Baz;
+            ''',
+        )
+        self.assertNotEqual(
+            edbcompiler.get_user_schema_fingerprint(new_schema),
+            base_fingerprint,
+        )
+
+        # Only the schema version differs from the initial schema.
+        new_schema, _ = edbcompiler.compile_edgeql_script(
+            ctx=context,
+            eql='''
+                DROP TYPE Baz;
+            ''',
+        )
+        self.assertNotEqual(
+            edbcompiler.get_user_schema_version(new_schema),
+            edbcompiler.get_user_schema_version(base_schema),
+        )
+        self.assertEqual(
+            edbcompiler.get_user_schema_fingerprint(new_schema),
+            base_fingerprint,
+        )
+
+    def _compile_user_schema(self, ddl):
+        compiler = tb.new_compiler()
+        context = edbcompiler.new_compiler_context(
+            compiler_state=compiler.state,
+            user_schema=self.schema,
+            modaliases={None: 'default'},
+        )
+        user_schema, _ = edbcompiler.compile_edgeql_script(
+            ctx=context, eql=ddl)
+        return user_schema
+
+    def test_server_compiler_shared_cache(self):
+        # Databases restored from the same dump share their compiled
+        # queries.  Compiled queries refer to schema objects by id, so
+        # running the same DDL separately, which creates objects with
+        # other ids, gives schemas that don't share.
+        ddl = '''
+            CREATE TYPE Shared {
+                CREATE PROPERTY name -> str;
+            };
+        '''
+        user_schema = self._compile_user_schema(ddl)
+        restored_schema = pickle.loads(pickle.dumps(user_schema, -1))
+        separate_schema = self._compile_user_schema(ddl)
+
+        index = dbview.DatabaseIndex(
+            unittest.mock.MagicMock(
+                **{'get_instance_name.return_value': 'test'}),
+            std_schema=self._std_schema,
+            global_schema_pickle=pickle.dumps(None, -1),
+            sys_config={},
+            default_sysconfig=immutables.Map(),
+            sys_config_spec=config.load_spec_from_schema(self._std_schema),
+            shared_cache=lru.TinyLFUMapping(maxsize=100),
+        )
+
+        def register(dbname, user_schema):
+            return index.register_db(
+                dbname,
+                user_schema_pickle=pickle.dumps(user_schema, -1),
+                user_schema_fingerprint=(
+                    edbcompiler.get_user_schema_fingerprint(user_schema)),
+                db_config=immutables.Map(),
+                reflection_cache=immutables.Map(),
+                backend_ids={},
+                extensions=set(),
+                ext_config_settings=[],
+            )
+
+        db = register('db', user_schema)
+        restored_db = register('restored', restored_schema)
+        separate_db = register('separate', separate_schema)
+
+        db.cache_compiled_sql(('SELECT 1',), ['SELECT 1'])
+        restored_db.cache_compiled_sql(('SELECT 2',), ['SELECT 2'])
+        self.assertEqual(
+            restored_db.lookup_compiled_sql(('SELECT 1',)), ['SELECT 1'])
+        self.assertEqual(
+            db.lookup_compiled_sql(('SELECT 2',)), ['SELECT 2'])
+        self.assertIsNone(separate_db.lookup_compiled_sql(('SELECT 1',)))
+
+        # After a schema change, the database no longer shares the
+        # queries compiled against its former schema, which the other
+        # databases with that schema still do.
+        restored_db = register(
+            'restored', self._compile_user_schema('CREATE TYPE Other;'))
+        self.assertIsNone(restored_db.lookup_compiled_sql(('SELECT 1',)))
+        restored_db = register(
+            'restored_again', pickle.loads(pickle.dumps(user_schema, -1)))
+        self.assertEqual(
+            restored_db.lookup_compiled_sql(('SELECT 2',)), ['SELECT 2'])
+
+    def test_server_compiler_graphql_schema_reuse(self):
+        compiler = tb.new_compiler()
+        context = edbcompiler.new_compiler_context(
+            compiler_state=compiler.state,
+            user_schema=self.schema,
+            modaliases={None: 'default'},
+        )
+        global_schema = s_schema.FlatSchema()
+        base_schema = context.state.current_tx().get_user_schema()
+        base_gqlcore = gql_compiler._get_gqlcore(
+            self._std_schema, base_schema, global_schema)
+
+        # Functions are not reflected in GraphQL.
+        new_schema, _ = edbcompiler.compile_edgeql_script(
+            ctx=context,
+            eql='''
+                CREATE FUNCTION foo() -> int64 USING (1);
+            ''',
+        )
+        gqlcore = gql_compiler._get_gqlcore(
+            self._std_schema, new_schema, global_schema)
+        self.assertIs(gqlcore.graphql_schema, base_gqlcore.graphql_schema)
+        self.assertIsNot(gqlcore.edgedb_schema, base_gqlcore.edgedb_schema)
+
+        new_schema, _ = edbcompiler.compile_edgeql_script(
+            ctx=context,
+            eql='''
+                CREATE TYPE Baz;
+            ''',
+        )
+        gqlcore = gql_compiler._get_gqlcore(
+            self._std_schema, new_schema, global_schema)
+        self.assertIsNot(
+            gqlcore.graphql_schema, base_gqlcore.graphql_schema)
+        self.assertIn('Baz', gqlcore.graphql_schema.type_map)
+
 
 class ServerProtocol(amsg.ServerProtocol):
     def __init__(self):
@@ -264,6 +454,149 @@ class TestAmsg(tbs.TestCase):
                     os.kill(pid, 0)
 
 
+class SchemaDeltaPool(pool.AbstractPool):
+    _schema_deltas_supported = True
+
+    def _init(self, kwargs):
+        pass
+
+
+class TestCompilerPoolSchemaDeltas(tbs.TestCase):
+
+    def make_chain(self, compiler_pool, length, *, data=b'delta'):
+        # Registers the DDL units of a chain of user schema versions and
+        # returns the schema pickles and the deltas between them.
+        pickles = [b'schema %d' % i + b'.' * 100 for i in range(length + 1)]
+        versions = [uuid.uuid4() for _ in pickles]
+        deltas = []
+        for i in range(1, length + 1):
+            delta = edbcompiler.dbstate.UserSchemaDelta(
+                base_version=versions[i - 1],
+                version=versions[i],
+                data=data,
+            )
+            deltas.append(delta)
+            compiler_pool._register_schema_deltas(pickles[i - 1], [
+                types.SimpleNamespace(
+                    user_schema=pickles[i], user_schema_delta=delta),
+            ])
+        return pickles, deltas
+
+    def test_server_compiler_pool_schema_deltas_chain(self):
+        compiler_pool = SchemaDeltaPool(loop=self.loop)
+        pickles, deltas = self.make_chain(compiler_pool, 4)
+
+        self.assertEqual(
+            compiler_pool._get_user_schema_update(pickles[0], pickles[4]),
+            tuple(deltas))
+        self.assertEqual(
+            compiler_pool._get_user_schema_update(pickles[2], pickles[4]),
+            tuple(deltas[2:]))
+        self.assertEqual(
+            compiler_pool._get_user_schema_update(pickles[1], pickles[2]),
+            (deltas[1],))
+
+        # Unknown schemas are sent in full.
+        unknown = b'schema 0' + b'.' * 100
+        self.assertIs(
+            compiler_pool._get_user_schema_update(unknown, pickles[4]),
+            pickles[4])
+
+        with unittest.mock.patch.object(pool, 'MAX_SCHEMA_DELTA_CHAIN', 2):
+            self.assertIs(
+                compiler_pool._get_user_schema_update(pickles[0], pickles[4]),
+                pickles[4])
+            self.assertEqual(
+                compiler_pool._get_user_schema_update(pickles[2], pickles[4]),
+                tuple(deltas[2:]))
+
+        # Deltas larger than the schema are not worth sending.
+        compiler_pool = SchemaDeltaPool(loop=self.loop)
+        pickles, deltas = self.make_chain(
+            compiler_pool, 4, data=b'.' * 60)
+        self.assertIs(
+            compiler_pool._get_user_schema_update(pickles[0], pickles[4]),
+            pickles[4])
+        self.assertEqual(
+            compiler_pool._get_user_schema_update(pickles[3], pickles[4]),
+            (deltas[3],))
+
+        # Pools that do not support deltas always send the full schema.
+        compiler_pool = SchemaDeltaPool(loop=self.loop)
+        compiler_pool._schema_deltas_supported = False
+        pickles, deltas = self.make_chain(compiler_pool, 2)
+        self.assertIs(
+            compiler_pool._get_user_schema_update(pickles[1], pickles[2]),
+            pickles[2])
+
+    def test_server_compiler_pool_schema_deltas_gap(self):
+        compiler_pool = SchemaDeltaPool(loop=self.loop)
+        with unittest.mock.patch.object(pool, 'SCHEMA_DELTA_LOG_SIZE', 2):
+            pickles, deltas = self.make_chain(compiler_pool, 4)
+
+        # The first deltas were evicted, workers holding the schemas
+        # they apply to need a full sync.
+        self.assertIs(
+            compiler_pool._get_user_schema_update(pickles[0], pickles[4]),
+            pickles[4])
+        self.assertIs(
+            compiler_pool._get_user_schema_update(pickles[1], pickles[4]),
+            pickles[4])
+        self.assertEqual(
+            compiler_pool._get_user_schema_update(pickles[2], pickles[4]),
+            tuple(deltas[2:]))
+
+        # A schema compiled in a transaction has no known base pickle.
+        version = uuid.uuid4()
+        delta = edbcompiler.dbstate.UserSchemaDelta(
+            base_version=uuid.uuid4(), version=version, data=b'delta')
+        new_pickle = b'schema 5' + b'.' * 100
+        compiler_pool._register_schema_deltas(None, [
+            types.SimpleNamespace(
+                user_schema=new_pickle, user_schema_delta=delta),
+        ])
+        self.assertIs(
+            compiler_pool._get_user_schema_update(pickles[4], new_pickle),
+            new_pickle)
+
+    def test_server_compiler_pool_schema_deltas_eviction(self):
+        compiler_pool = SchemaDeltaPool(loop=self.loop)
+        size = len(b'schema 0' + b'.' * 100)
+        with unittest.mock.patch.object(
+            pool, 'SCHEMA_VERSION_LOG_BYTES', 3 * size
+        ):
+            pickles, deltas = self.make_chain(compiler_pool, 4)
+
+            # Only the most recent pickles are kept.
+            self.assertEqual(compiler_pool._schema_versions_size, 3 * size)
+            self.assertEqual(
+                [p for p, _ in compiler_pool._schema_versions.values()],
+                pickles[2:])
+            self.assertIs(
+                compiler_pool._get_user_schema_update(
+                    pickles[1], pickles[4]),
+                pickles[4])
+            self.assertEqual(
+                compiler_pool._get_user_schema_update(
+                    pickles[2], pickles[4]),
+                tuple(deltas[2:]))
+
+            # The latest schema is kept even if it is too large.
+            large = b'schema 5' + b'.' * (4 * size)
+            delta = edbcompiler.dbstate.UserSchemaDelta(
+                base_version=deltas[-1].version,
+                version=uuid.uuid4(),
+                data=b'delta')
+            compiler_pool._register_schema_deltas(pickles[4], [
+                types.SimpleNamespace(
+                    user_schema=large, user_schema_delta=delta),
+            ])
+            self.assertEqual(
+                [p for p, _ in compiler_pool._schema_versions.values()],
+                [large])
+            self.assertEqual(compiler_pool._schema_versions_size, len(large))
+
+
 class TestServerCompilerPool(tbs.TestCase):
     def _wait_pids(self, *pids, timeout=1):
         remaining = list(pids)
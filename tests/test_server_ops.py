@@ -23,6 +23,7 @@ from typing import *
 import asyncio
 import http
 import http.client
+import io
 import json
 import os.path
 import pathlib
@@ -40,6 +41,7 @@ import edgedb
 from edgedb import errors
 
 from edb import protocol
+from edb.common import binwrapper
 from edb.common import devmode
 from edb.common import taskgroup
 from edb.protocol import protocol as edb_protocol  # type: ignore
@@ -48,6 +50,10 @@ from edb.server import cluster as edbcluster
 from edb.testbase import server as tb
 
 
+# The header of the data of a dump block (see edb/server/protocol/consts.pxi).
+DUMP_HEADER_BLOCK_DATA = 112
+
+
 class TestServerApi(tb.ClusterTestCase):
     async def test_server_healthchecks(self):
         with self.http_con() as http_con:
@@ -1119,6 +1125,151 @@ class TestServerOps(tb.BaseHTTPTestCase, tb.CLITestCaseMixin):
         finally:
             await con.aclose()
 
+    async def test_server_ops_restore_jobs_interrupted(self):
+        async def test(pgdata_path):
+            backend_dsn = f'postgres:///?user=postgres&host={pgdata_path}'
+            runstate_dir = None if devmode.is_in_dev_mode() else pgdata_path
+            async with tb.start_edgedb_server(
+                max_allowed_connections=None,
+                backend_dsn=backend_dsn,
+                reset_auth=True,
+                runstate_dir=runstate_dir,
+            ) as sd1:
+                password = sd1.password
+                async with tb.start_edgedb_server(
+                    max_allowed_connections=None,
+                    backend_dsn=backend_dsn,
+                    runstate_dir=runstate_dir,
+                ) as sd2:
+                    await self._test_server_ops_restore_jobs_interrupted(
+                        sd1, sd2
+                    )
+
+            # A server started afresh doesn't accept connections to the
+            # partially restored database either, until it is dropped.
+            async with tb.start_edgedb_server(
+                max_allowed_connections=None,
+                backend_dsn=backend_dsn,
+                runstate_dir=runstate_dir,
+            ) as sd3:
+                with self.assertRaisesRegex(
+                    errors.AccessError, 'does not accept connections'
+                ):
+                    await sd3.connect(
+                        database='restore_broken', password=password)
+
+                con = await sd3.connect(password=password)
+                try:
+                    await con.execute('DROP DATABASE restore_broken;')
+                    await con.execute('CREATE DATABASE restore_broken;')
+                finally:
+                    await con.aclose()
+
+                con = await sd3.connect(
+                    database='restore_broken', password=password)
+                await con.aclose()
+
+        with tempfile.TemporaryDirectory() as td:
+            cluster = await pgcluster.get_local_pg_cluster(
+                td, max_connections=20, log_level='s'
+            )
+            cluster.set_connection_params(
+                pgconnparams.ConnectionParameters(
+                    user='postgres',
+                    database='template1',
+                ),
+            )
+            self.assertTrue(await cluster.ensure_initialized())
+            await cluster.start()
+            try:
+                await test(td)
+            finally:
+                await cluster.stop()
+
+    async def _test_server_ops_restore_jobs_interrupted(self, sd1, sd2):
+        con = await sd1.connect()
+        try:
+            await con.execute("CREATE DATABASE restore_source;")
+            await con.execute("CREATE DATABASE restore_broken;")
+        finally:
+            await con.aclose()
+
+        con = await sd1.connect(database="restore_source")
+        try:
+            await con.execute("CREATE TYPE RestoreJobs;")
+            await con.execute("INSERT RestoreJobs;")
+        finally:
+            await con.aclose()
+
+        def message_data(msg):
+            iobuf = io.BytesIO()
+            type(msg).dump(msg, binwrapper.BinWrapper(iobuf))
+            return iobuf.getvalue()
+
+        con = await sd1.connect_test_protocol(database="restore_source")
+        try:
+            await con.send(protocol.Dump(annotations=[]), protocol.Sync())
+            header = await con.recv_match(protocol.DumpHeader)
+            blocks = []
+            while True:
+                msg = await con.recv()
+                if isinstance(msg, protocol.CommandComplete):
+                    break
+                blocks.append(msg)
+            await con.recv_match(protocol.ReadyForCommand)
+        finally:
+            await con.aclose()
+
+        # Break the data of the last block, failing the restore after
+        # the schema is committed.
+        blocks[-1] = protocol.DumpBlock(attributes=[
+            protocol.KeyValue(code=kv.code, value=b'garbage')
+            if kv.code == DUMP_HEADER_BLOCK_DATA else kv
+            for kv in blocks[-1].attributes
+        ])
+
+        con = await sd1.connect_test_protocol(database="restore_broken")
+        try:
+            await con.send(
+                protocol.Restore(
+                    attributes=[],
+                    jobs=4,
+                    header_data=message_data(header),
+                ),
+            )
+            await con.recv_match(protocol.RestoreReady, jobs=4)
+            await con.send(
+                *(protocol.RestoreBlock(block_data=message_data(block))
+                  for block in blocks),
+                protocol.RestoreEof(),
+            )
+            await con.recv_match(
+                protocol.ErrorResponse,
+                message='(?s).*partially restored and must be dropped',
+            )
+            await con.send(protocol.Sync())
+            await con.recv_match(protocol.ReadyForCommand)
+        finally:
+            await con.aclose()
+
+        with self.assertRaisesRegex(
+            errors.AccessError, 'does not accept connections'
+        ):
+            await sd1.connect(database="restore_broken")
+
+        # The adjacent server learns about the restore from the schema
+        # change it signals.
+        async for tr in self.try_until_fails(
+            wait_for=errors.AccessError,
+            timeout=30,
+        ):
+            async with tr:
+                con = await sd2.connect(
+                    database="restore_broken",
+                    password=sd1.password,
+                )
+                await con.aclose()
+
     async def _init_pg_cluster(self, path):
         cluster = await pgcluster.get_local_pg_cluster(path, log_level='s')
         cluster.set_connection_params(
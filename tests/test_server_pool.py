@@ -29,7 +29,11 @@ Alternatively, run with
   $ python tests/test_server_pool.py
 
 to get interactive HTML report of all tests aggregated in one HTML
-file in `./tmp/connpool.html`.
+file in `./tmp/connpool.html`.  The recorded pool snapshots are saved
+in `./tmp/connpool.json`, which can be replayed through the demand
+forecast of the pool to tune it offline with
+
+  $ python tests/test_server_pool.py replay tmp/connpool.json
 """
 
 
@@ -39,6 +43,7 @@ import collections
 import dataclasses
 import datetime
 import functools
+import io
 import json
 import logging
 import os
@@ -54,7 +59,9 @@ import unittest.mock
 
 from edb.common import taskgroup
 from edb.server import connpool
+from edb.server.connpool import forecast
 from edb.server.connpool import pool as pool_impl
+from edb.server.connpool import simulation
 
 # TIME_SCALE is used to run the simulation for longer time, the default is 1x.
 TIME_SCALE = int(os.environ.get("TIME_SCALE", '1'))
@@ -105,6 +112,42 @@ def calc_total_percentiles(
     return calc_percentiles(acc)
 
 
+def load_snapshots(
+    stats: typing.List[dict],
+) -> typing.List[pool_impl.Snapshot]:
+    # Snapshots as recorded in the reports by simulate_once().
+    return [
+        pool_impl.Snapshot(**{
+            **stat,
+            'blocks': [
+                pool_impl.BlockSnapshot(**block) for block in stat['blocks']
+            ],
+            'log': [pool_impl.SnapshotLog(**log) for log in stat['log']],
+        })
+        for stat in stats
+    ]
+
+
+def replay_forecast(js_data: typing.List[dict]) -> None:
+    # Replay the snapshots of the pool (not the naive one) in every
+    # simulation through the demand forecast with its current smoothing
+    # factors, and find the factors that would have done best.
+    for sim in js_data:
+        snapshots = load_snapshots(sim['runs'][0]['stats'])
+        if not snapshots:
+            continue
+        errors = forecast.replay(snapshots)
+        under = sum(err.under for err in errors.values())
+        over = sum(err.over for err in errors.values())
+        samples = max(sum(err.samples for err in errors.values()), 1)
+        alpha, beta = forecast.tune(snapshots)
+        print(
+            f'{sim["test_name"]}: under {under / samples:.2f}, '
+            f'over {over / samples:.2f} per tick; '
+            f'best alpha={alpha}, beta={beta}'
+        )
+
+
 @dataclasses.dataclass
 class DBSpec:
     db: str
@@ -719,7 +762,10 @@ class SimulatedCase(unittest.TestCase, metaclass=SimulatedCaseMeta):
             now = int(datetime.datetime.now().timestamp())
             with open(f'tmp/connpool_{now}.html', 'wt') as f:
                 f.write(html)
+            with open(f'tmp/connpool.json', 'wt') as f:
+                json.dump(js_data, f)
 
+        replay_forecast(js_data)
         print('Final QoS score:', score)
         return score
 
@@ -1571,6 +1617,134 @@ class TestServerConnectionPool(unittest.TestCase):
 
         asyncio.run(main())
 
+    def test_connpool_demand_forecast(self):
+        fc = forecast.DemandForecast(alpha=0.5, beta=0.5)
+        for n in (0, 2, 4, 6, 8):
+            fc.add(n)
+        self.assertGreater(fc.trend(), 0)
+        self.assertGreater(fc.forecast(), 8)
+        self.assertGreater(fc.forecast(3), fc.forecast())
+
+        for _ in range(30):
+            fc.add(8)
+        self.assertAlmostEqual(fc.forecast(), 8, places=1)
+
+        for _ in range(30):
+            fc.add(0)
+        self.assertEqual(fc.forecast(10), 0)
+
+        with self.assertRaises(ValueError):
+            forecast.DemandForecast(alpha=0)
+
+    def test_connpool_demand_forecast_replay(self):
+        snapshots = [
+            pool_impl.Snapshot(
+                timestamp=i,
+                capacity=10,
+                blocks=[
+                    pool_impl.BlockSnapshot(
+                        dbname='ramp', nwaiters_avg=0, nconns=0,
+                        npending=0, nwaiters=i, quota=0, nacquired=i,
+                    ),
+                    pool_impl.BlockSnapshot(
+                        dbname='flat', nwaiters_avg=0, nconns=0,
+                        npending=0, nwaiters=0, quota=0, nacquired=3,
+                    ),
+                ],
+                log=[],
+                failed_connects=0,
+                failed_disconnects=0,
+                successful_connects=0,
+                successful_disconnects=0,
+            )
+            for i in range(20)
+        ]
+
+        errors = forecast.replay(snapshots, alpha=0.5, beta=0.5)
+        self.assertEqual(errors['ramp'].samples, 19)
+        self.assertEqual(errors['flat'].mean_abs_error, 0)
+
+        # Following the trend forecasts a ramp better than following
+        # the level only.
+        no_trend = forecast.replay(snapshots, alpha=0.5, beta=0)
+        self.assertLess(errors['ramp'].under, no_trend['ramp'].under)
+
+        alpha, beta = forecast.tune(snapshots)
+        self.assertGreater(beta, 0)
+
+    def test_connpool_preconnect(self):
+        async def test():
+            pool = connpool.Pool(
+                connect=self.make_fake_connect(),
+                disconnect=self.make_fake_disconnect(),
+                max_capacity=5,
+            )
+
+            ramp = pool._get_block('block_a')
+            for n in (1, 2, 3):
+                ramp.demand_forecast.add(n)
+            pool._maybe_preconnect(ramp)
+            self.assertEqual(ramp.count_pending_conns(), 4)
+
+            # The pool capacity is never exceeded.
+            for n in (10, 20, 30):
+                ramp.demand_forecast.add(n)
+            pool._maybe_preconnect(ramp)
+            self.assertEqual(ramp.count_conns(), 5)
+
+            # Nothing is pre-established for a declining demand.
+            decline = pool._get_block('block_b')
+            for n in (3, 2, 1):
+                decline.demand_forecast.add(n)
+            pool._maybe_preconnect(decline)
+            self.assertEqual(decline.count_conns(), 0)
+
+            while ramp.count_pending_conns():
+                await asyncio.sleep(0.01)
+            self.assertEqual(ramp.count_queued_conns(), 5)
+
+        async def main():
+            await asyncio.wait_for(test(), timeout=5)
+
+        asyncio.run(main())
+
+    def test_connpool_simulation(self):
+        trace = simulation.generate_trace(
+            [
+                simulation.Workload(
+                    'block_a', qps=200, query_time=0.01, end_at=60),
+                simulation.Workload(
+                    'block_b', qps=400, query_time=0.02,
+                    start_at=20, end_at=40),
+            ],
+            seed=1,
+        )
+        self.assertGreater(len(trace), 10000)
+
+        buf = io.StringIO()
+        simulation.dump_trace(trace, buf)
+        buf.seek(0)
+        self.assertEqual(simulation.load_trace(buf), trace)
+
+        # A minute of traffic is simulated in virtual time.
+        started_at = time.monotonic()
+        report = simulation.simulate(trace, capacity=10, seed=1)
+        self.assertLess(time.monotonic() - started_at, 30)
+
+        self.assertEqual(report.queries, len(trace))
+        self.assertGreater(report.duration, 59)
+        self.assertLess(report.duration, 61)
+        self.assertLessEqual(report.p50, report.p99)
+        self.assertGreater(report.connects, 0)
+        self.assertGreater(report.fairness, 0.5)
+        self.assertLessEqual(report.fairness, 1)
+        self.assertEqual(
+            [db.dbname for db in report.databases], ['block_a', 'block_b'])
+
+        # The simulation is deterministic.
+        self.assertEqual(
+            simulation.simulate(trace, capacity=10, seed=1), report)
+
 
 HTML_TPL = R'''<!DOCTYPE html>
 <html>
@@ -2303,6 +2477,12 @@ HTML_TPL = R'''<!DOCTYPE html>
 
 
 def run():
+    if len(sys.argv) > 2 and sys.argv[1] == 'replay':
+        for path in sys.argv[2:]:
+            with open(path) as f:
+                replay_forecast(json.load(f))
+        return
+
     try:
         import uvloop
     except ImportError:
@@ -0,0 +1,167 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2023-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import pathlib
+import sqlite3
+import stat
+import tempfile
+import unittest.mock
+
+from edb.server.cache import persistent
+from edb.testbase import server as tb
+
+
+def _key(n):
+    return persistent.make_key(n)
+
+
+class TestPersistentQueryCache(tb.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = pathlib.Path(tmp.name) / 'cache' / 'tenant.sqlite'
+
+    def open(self, **kwargs):
+        cache = persistent.PersistentQueryCache(self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def rows(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(
+                'SELECT dbname, schema_key, query_key, data FROM compiled'
+            ).fetchall()
+        finally:
+            conn.close()
+
+    async def test_server_persistent_cache_restart(self):
+        cache = self.open()
+        cache.set('db', _key('s1'), _key('q1'), ('compiled', 1))
+        # buffered entries are visible before they are written
+        self.assertEqual(
+            await cache.get('db', _key('s1'), _key('q1')), ('compiled', 1))
+        cache.flush()
+        self.assertEqual(
+            await cache.get('db', _key('s1'), _key('q1')), ('compiled', 1))
+        cache.set('db', _key('s1'), _key('q2'), ('compiled', 2))
+        cache.close()
+        self.assertIsNone(await cache.get('db', _key('s1'), _key('q1')))
+
+        key_file = self.path.with_suffix('.key')
+        self.assertEqual(stat.S_IMODE(os.stat(key_file).st_mode), 0o600)
+
+        cache = self.open()
+        self.assertEqual(
+            await cache.get('db', _key('s1'), _key('q1')), ('compiled', 1))
+        self.assertEqual(
+            await cache.get('db', _key('s1'), _key('q2')), ('compiled', 2))
+        self.assertIsNone(await cache.get('db', _key('s2'), _key('q1')))
+        self.assertIsNone(await cache.get('other', _key('s1'), _key('q1')))
+
+    async def test_server_persistent_cache_invalidate(self):
+        cache = self.open()
+        cache.set('db', _key('s1'), _key('q1'), 'db s1 q1')
+        cache.set('db', _key('s2'), _key('q1'), 'db s2 q1')
+        cache.set('other', _key('s1'), _key('q1'), 'other s1 q1')
+        cache.flush()
+        cache.set('db', _key('s1'), _key('q2'), 'db s1 q2')
+
+        # drops both the written and the buffered entries
+        cache.invalidate('db', keep_schema_key=_key('s2'))
+        self.assertIsNone(await cache.get('db', _key('s1'), _key('q1')))
+        self.assertIsNone(await cache.get('db', _key('s1'), _key('q2')))
+        self.assertEqual(
+            await cache.get('db', _key('s2'), _key('q1')), 'db s2 q1')
+        self.assertEqual(
+            await cache.get('other', _key('s1'), _key('q1')), 'other s1 q1')
+
+        cache.invalidate('db')
+        self.assertIsNone(await cache.get('db', _key('s2'), _key('q1')))
+        self.assertEqual(
+            await cache.get('other', _key('s1'), _key('q1')), 'other s1 q1')
+
+        cache.close()
+        self.assertEqual([row[0] for row in self.rows()], ['other'])
+
+    async def test_server_persistent_cache_trim(self):
+        with unittest.mock.patch.object(persistent, '_TRIM_INTERVAL', 10):
+            cache = self.open(maxsize=5)
+            for i in range(8):
+                cache.set('db', _key('s'), _key(i), i)
+            cache.flush()
+            for i in range(8, 12):
+                cache.set('db', _key('s'), _key(i), i)
+            cache.close()
+
+        # the 12 writes went past the trim interval, only the 5 most
+        # recent entries are left
+        self.assertEqual(len(self.rows()), 5)
+        cache = self.open()
+        for i in range(12):
+            self.assertEqual(
+                await cache.get('db', _key('s'), _key(i)),
+                i if i >= 7 else None)
+
+    async def test_server_persistent_cache_corrupted(self):
+        cache = self.open()
+        for i in range(3):
+            cache.set('db', _key('s'), _key(i), i)
+        # entries that cannot be pickled are not persisted
+        cache.set('db', _key('s'), _key('lambda'), lambda: None)
+        cache.close()
+        self.assertEqual(len(self.rows()), 3)
+
+        conn = sqlite3.connect(self.path)
+        # an entry that was tampered with
+        [(data,)] = conn.execute(
+            'SELECT data FROM compiled WHERE query_key = ?', (_key(0),))
+        conn.execute(
+            'UPDATE compiled SET data = ? WHERE query_key = ?',
+            (data[:-1] + bytes([data[-1] ^ 1]), _key(0)))
+        # an entry moved to another query
+        conn.execute(
+            'UPDATE compiled SET query_key = ? WHERE query_key = ?',
+            (_key('moved'), _key(1)))
+        conn.commit()
+        conn.close()
+
+        cache = self.open()
+        self.assertIsNone(await cache.get('db', _key('s'), _key(0)))
+        self.assertIsNone(await cache.get('db', _key('s'), _key('moved')))
+        self.assertEqual(await cache.get('db', _key('s'), _key(2)), 2)
+        cache.close()
+        # the invalid entries are dropped
+        self.assertEqual([row[2] for row in self.rows()], [_key(2)])
+
+        # entries signed with the key of another instance are rejected
+        cache = self.open(key_path=self.path.with_suffix('.other.key'))
+        self.assertIsNone(await cache.get('db', _key('s'), _key(2)))
+        cache.close()
+        self.assertEqual(self.rows(), [])
+
+    async def test_server_persistent_cache_key_file(self):
+        key_path = self.path.parent / 'tenant.key'
+        self.path.parent.mkdir(parents=True)
+        key_path.write_bytes(b'short')
+        with self.assertRaisesRegex(RuntimeError, 'invalid persistent'):
+            persistent.PersistentQueryCache(self.path)
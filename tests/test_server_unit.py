@@ -17,9 +17,11 @@
 #
 
 
+import decimal
 import unittest
 
 from edb.server import server
+from edb.server.protocol import execute
 
 
 class TestServerUnittests(unittest.TestCase):
@@ -108,3 +110,33 @@ class TestServerUnittests(unittest.TestCase):
                 (set(expected[0]), set(expected[1]))
             )
             self.assertEqual(tuple(has_wildcards), expected_wildcard)
+
+    def test_server_unittest_encode_json(self):
+        D = decimal.Decimal
+        CASES = [
+            (None, 'null'),
+            ([True, False], '[true,false]'),
+            ('"ü"\n', r'"\"\u00fc\"\n"'),
+            (123456789123456789123456789, '123456789123456789123456789'),
+            (1.5, '1.5'),
+            (float('inf'), 'Infinity'),
+            (D('1.000000000000000000000000001'),
+             '1.000000000000000000000000001'),
+            (D('1E+3'), '1000'),
+            (D('-0.00'), '-0.00'),
+            ({}, '{}'),
+            (
+                {'a': [1, D('2.50'), {'b': None}], 'c': (1, 'x'), 'd': []},
+                '{"a":[1,2.50,{"b":null}],"c":[1,"x"],"d":[]}',
+            ),
+            ({1: 'x', None: 'y'}, '{"1":"x","null":"y"}'),
+        ]
+
+        for value, expected in CASES:
+            self.assertEqual(execute.encode_json(value), expected)
+
+        with self.assertRaisesRegex(TypeError, 'not JSON serializable'):
+            execute.encode_json({'a': object()})
+
+        with self.assertRaisesRegex(TypeError, 'keys must be'):
+            execute.encode_json({(1, 2): 'x'})